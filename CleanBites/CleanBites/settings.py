@@ -51,6 +51,7 @@ INSTALLED_APPS = [
     "django.contrib.messages",
     "django.contrib.staticfiles",
     "django.contrib.gis",
+    "django.contrib.postgres",
     "django.contrib.sites",
     "allauth",
     "allauth.account",
@@ -215,6 +216,41 @@ SOCIALACCOUNT_PROVIDERS = {
     "google": {"SCOPE": ["profile", "email"], "AUTH_PARAMS": {"access_type": "online"}}
 }
 
+# Optional offline geocoding index: a CSV of NYC addresses with coordinates
+# (building/street/borough/zipcode or a PLUTO-style address column). Empty
+# means every lookup goes to Nominatim.
+GEOCODE_INDEX_PATH = env("GEOCODE_INDEX_PATH", default="")
+
+# Most restaurants the map's GeoJSON endpoint returns for one viewport
+GEOJSON_MAX_FEATURES = env.int("GEOJSON_MAX_FEATURES", default=2000)
+
+# Below this zoom level the map gets marker clusters instead of restaurants.
+# Clusters are cached per tile for MAP_CLUSTER_CACHE_SECONDS.
+MAP_CLUSTER_MAX_ZOOM = env.int("MAP_CLUSTER_MAX_ZOOM", default=15)
+MAP_CLUSTER_CACHE_SECONDS = env.int("MAP_CLUSTER_CACHE_SECONDS", default=300)
+
+# Map GeoJSON responses are cached gzipped until restaurant data changes (or
+# GEOJSON_CACHE_SECONDS pass); bigger bodies are served but not cached.
+GEOJSON_CACHE_SECONDS = env.int("GEOJSON_CACHE_SECONDS", default=3600)
+GEOJSON_CACHE_MAX_BYTES = env.int("GEOJSON_CACHE_MAX_BYTES", default=2 * 1024 * 1024)
+
+# Vector tiles are served up to MAP_TILE_MAX_ZOOM and cached until restaurant
+# data changes (or MAP_TILE_CACHE_SECONDS passes).
+MAP_TILE_MAX_ZOOM = env.int("MAP_TILE_MAX_ZOOM", default=18)
+MAP_TILE_CACHE_SECONDS = env.int("MAP_TILE_CACHE_SECONDS", default=86400)
+
+# Minimum pg_trgm word similarity (0-1) for fuzzy restaurant search matches;
+# lower values forgive more typos but return more noise
+SEARCH_SIMILARITY_THRESHOLD = env.float("SEARCH_SIMILARITY_THRESHOLD", default=0.5)
+
+# Sidebar facet counts are cached until restaurant data changes
+FACETS_CACHE_SECONDS = env.int("FACETS_CACHE_SECONDS", default=3600)
+
+# The recent violations feed is the same for every visitor; cached briefly
+RECENT_VIOLATIONS_CACHE_SECONDS = env.int("RECENT_VIOLATIONS_CACHE_SECONDS", default=60)
+
+CACHES = {"default": env.cache("CACHE_URL", default="locmemcache://")}
+
 LOGIN_URL = "/"
 LOGIN_REDIRECT_URL = "/home/"
 LOGOUT_REDIRECT_URL = "/"
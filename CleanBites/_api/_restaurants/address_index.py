@@ -0,0 +1,126 @@
+import csv
+import hashlib
+import os
+import numpy as np
+from django.conf import settings
+from django.contrib.gis.geos import Point
+from _api._restaurants.geocoding import normalize_address
+
+
+def address_hash(building, street, boro, zipcode):
+    """64-bit hash of the normalized address, used as the index key."""
+    key = normalize_address(building, street, boro, zipcode).encode("utf-8")
+    return int.from_bytes(hashlib.blake2b(key, digest_size=8).digest(), "little")
+
+
+def _csv_rows(csv_path):
+    """
+    Yield (building, street, boro, zipcode, longitude, latitude) from a CSV
+    with either building/street columns or a PLUTO-style `address` column.
+    """
+    with open(csv_path, newline="", encoding="utf-8") as f:
+        for row in csv.DictReader(f):
+            row = {
+                key.strip().lower(): (value or "").strip() for key, value in row.items()
+            }
+            if "address" in row:
+                building, _, street = row["address"].partition(" ")
+            else:
+                building, street = row.get("building", ""), row.get("street", "")
+            boro = row.get("borough") or row.get("boro", "")
+            try:
+                yield (
+                    building,
+                    street,
+                    boro,
+                    row.get("zipcode", ""),
+                    float(row["longitude"]),
+                    float(row["latitude"]),
+                )
+            except (KeyError, ValueError):
+                continue  # Lots without coordinates are useless here
+
+
+class AddressIndex:
+    """
+    Offline address -> coordinate lookup for NYC.
+
+    The index is two NumPy arrays: sorted 64-bit address hashes and the
+    matching (longitude, latitude) pairs. Both are memory-mapped from .npy
+    files, so loading is instant, the pages are shared between processes,
+    and a lookup is one binary search. A hash collision could return the
+    wrong lot, but with 64 bits and about a million addresses that is
+    vanishingly unlikely.
+    """
+
+    def __init__(self, keys, coords):
+        self.keys = keys
+        self.coords = coords
+
+    def __len__(self):
+        return len(self.keys)
+
+    @classmethod
+    def build(cls, csv_path, prefix=None):
+        """Build the .npy files for `csv_path` and return the loaded index."""
+        prefix = prefix or os.path.splitext(csv_path)[0]
+        rows = list(_csv_rows(csv_path))
+
+        keys = np.fromiter(
+            (address_hash(*row[:4]) for row in rows), dtype=np.uint64, count=len(rows)
+        )
+        coords = np.array([row[4:] for row in rows], dtype=np.float64).reshape(-1, 2)
+        order = np.argsort(keys, kind="stable")
+
+        np.save(f"{prefix}.keys.npy", keys[order])
+        np.save(f"{prefix}.coords.npy", coords[order])
+        return cls.load(prefix)
+
+    @classmethod
+    def load(cls, prefix):
+        return cls(
+            np.load(f"{prefix}.keys.npy", mmap_mode="r"),
+            np.load(f"{prefix}.coords.npy", mmap_mode="r"),
+        )
+
+    @classmethod
+    def open(cls, path):
+        """
+        Open an index from a CSV file, building (or rebuilding) its .npy files
+        next to it when they are missing or older than the CSV.
+        """
+        prefix = os.path.splitext(path)[0]
+        keys_path = f"{prefix}.keys.npy"
+        if path.endswith(".csv") and (
+            not os.path.exists(keys_path)
+            or os.path.getmtime(keys_path) < os.path.getmtime(path)
+        ):
+            return cls.build(path, prefix)
+        return cls.load(prefix)
+
+    def lookup(self, building, street, boro, zipcode):
+        """Return the Point for an address, or None if it is not indexed."""
+        key = np.uint64(address_hash(building, street, boro, zipcode))
+        i = int(np.searchsorted(self.keys, key))
+        if i < len(self.keys) and self.keys[i] == key:
+            longitude, latitude = self.coords[i]
+            return Point(float(longitude), float(latitude))
+        return None
+
+
+_index = None
+_index_path = None
+
+
+def get_address_index():
+    """
+    The index configured by settings.GEOCODE_INDEX_PATH, opened once per
+    process, or None when no index is configured.
+    """
+    global _index, _index_path
+
+    path = getattr(settings, "GEOCODE_INDEX_PATH", "")
+    if path != _index_path:
+        _index = AddressIndex.open(path) if path else None
+        _index_path = path
+    return _index
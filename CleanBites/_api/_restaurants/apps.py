@@ -4,3 +4,6 @@ from django.apps import AppConfig
 class RestaurantsConfig(AppConfig):
     default_auto_field = "django.db.models.BigAutoField"
     name = "_api._restaurants"
+
+    def ready(self):
+        from _api._restaurants import signals  # noqa: F401
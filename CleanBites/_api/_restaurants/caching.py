@@ -0,0 +1,105 @@
+import gzip
+import hashlib
+import zlib
+from django.core.cache import cache
+from django.db.models import F
+from _api._restaurants.models import DatasetVersion
+
+# The DatasetVersion row bumped whenever restaurant data changes; part of
+# every response cache key, so a bump makes all cached map responses stale at
+# once. It is kept in the database because ingest (and its shard workers)
+# bump it from other processes than the web workers that read it.
+DATASET_VERSION_ID = 1
+
+
+def dataset_version():
+    version = (
+        DatasetVersion.objects.filter(pk=DATASET_VERSION_ID)
+        .values_list("version", flat=True)
+        .first()
+    )
+    return version or 1
+
+
+def bump_dataset_version():
+    """Invalidate every cached response built from restaurant data."""
+    versions = DatasetVersion.objects.filter(pk=DATASET_VERSION_ID)
+    if not versions.update(version=F("version") + 1):
+        _, created = DatasetVersion.objects.get_or_create(
+            pk=DATASET_VERSION_ID, defaults={"version": 2}
+        )
+        if not created:  # Another process created it first
+            versions.update(version=F("version") + 1)
+
+
+def normalized_params(params, ignore=()):
+    """Query parameters as a sorted tuple, without blank or ignored values."""
+    return tuple(
+        sorted(
+            (key, value.strip())
+            for key, value in params.items()
+            if value.strip() and key not in ignore
+        )
+    )
+
+
+def response_key(prefix, params):
+    """Cache key (and ETag seed) for a response at the current dataset version."""
+    digest = hashlib.md5(repr(params).encode("utf-8")).hexdigest()
+    return f"{prefix}:v{dataset_version()}:{digest}"
+
+
+def accepts_gzip(request):
+    return "gzip" in request.META.get("HTTP_ACCEPT_ENCODING", "")
+
+
+def etag_for(key, gzipped):
+    """
+    Strong ETag for the response stored under `key`. The gzip and identity
+    bodies differ byte for byte, so each gets its own tag.
+    """
+    digest = hashlib.md5(key.encode("utf-8")).hexdigest()
+    return f'"{digest}-gz"' if gzipped else f'"{digest}"'
+
+
+def etag_matches(request, etag):
+    """True if the request's If-None-Match already names `etag`."""
+    header = request.META.get("HTTP_IF_NONE_MATCH", "")
+    return header.strip() == "*" or etag in (tag.strip() for tag in header.split(","))
+
+
+def cached_body(key, gzipped):
+    """The stored response body in the requested encoding, or None."""
+    body = cache.get(key)
+    if body is None or gzipped:
+        return body
+    return gzip.decompress(body)
+
+
+def tee_to_cache(key, chunks, gzipped, timeout, max_bytes):
+    """
+    Pass `chunks` through to the client (gzip-compressed if `gzipped`) while
+    keeping a gzip copy, which is cached under `key` once the stream ends.
+    Bodies over `max_bytes` compressed are streamed but not cached, and a
+    stream the client abandons is never cached.
+    """
+    compressor = zlib.compressobj(6, zlib.DEFLATED, 31)  # 31: gzip container
+    stored, size = [], 0
+
+    for chunk in chunks:
+        compressed = compressor.compress(chunk)
+        if stored is not None and compressed:
+            stored.append(compressed)
+            size += len(compressed)
+            if size > max_bytes:
+                stored = None
+        body = compressed if gzipped else chunk
+        if body:
+            yield body
+
+    tail = compressor.flush()
+    if gzipped:
+        yield tail
+    if stored is not None:
+        stored.append(tail)
+        cache.set(key, b"".join(stored), timeout)
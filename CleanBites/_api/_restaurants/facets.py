@@ -0,0 +1,29 @@
+import logging
+from django.db import transaction
+from django.db.models import Count
+from _api._restaurants.caching import bump_dataset_version
+from _api._restaurants.models import Restaurant, RestaurantFacet
+
+logger = logging.getLogger(__name__)
+
+
+def refresh_facets():
+    """
+    Rebuild the RestaurantFacet table from the active restaurants. Runs in
+    one transaction, so readers see either the old counts or the new ones.
+    """
+    rows = (
+        Restaurant.objects.filter(is_activated=True)
+        .order_by()
+        .values("cuisine_description", "borough", "grade")
+        .annotate(count=Count("id"))
+    )
+    with transaction.atomic():
+        RestaurantFacet.objects.all().delete()
+        facets = RestaurantFacet.objects.bulk_create(
+            RestaurantFacet(**row) for row in rows
+        )
+    # Cached facet responses were built from the old table
+    bump_dataset_version()
+    logger.info("Refreshed %d facet rows", len(facets))
+    return len(facets)
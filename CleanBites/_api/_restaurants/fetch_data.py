@@ -1,13 +1,53 @@
+import csv
+import hashlib
+import heapq
+import itertools
+import json
+import multiprocessing
+import tempfile
+import zlib
 import requests
-from datetime import datetime
+from datetime import date, datetime, timedelta
 from django.core.exceptions import ValidationError
+from django.db import DatabaseError, connections, transaction
+from django.db.models import OuterRef, Subquery
 import time
 from geopy.geocoders import Nominatim
-from _api._restaurants.models import Restaurant
+from _api._restaurants.models import (
+    Restaurant,
+    IngestCheckpoint,
+    Inspection,
+    Violation,
+    grade_for_score,
+)
+from _api._restaurants.address_index import get_address_index
+from _api._restaurants.caching import bump_dataset_version
+from _api._restaurants.facets import refresh_facets
+from _api._restaurants.geocoding import (
+    BOROUGHS,
+    borough_id,
+    cached_geocode,
+    geocode_addresses,
+    geocode_stats,
+    normalize_address,
+)
 from django.contrib.gis.geos import Point
-from geopy.exc import GeocoderTimedOut
 
 NYC_DATA_URL = "https://data.cityofnewyork.us/resource/43nn-pn8j.json"
+DEFAULT_PAGE_SIZE = 50000  # Largest page SODA serves without an app token
+PAGE_RETRIES = 3
+# Incremental runs re-request inspections this far behind the watermark:
+# results are published days or weeks after the inspection itself.
+WATERMARK_OVERLAP = timedelta(days=30)
+
+# Nominatim's usage policy allows one request per second, whatever the
+# number of workers; several workers still overlap the network latency.
+GEOCODE_WORKERS = 4
+GEOCODE_RATE = 1.0
+GEOCODE_RETRIES = 3
+
+# The feed's inspection_date for establishments not inspected yet
+NOT_INSPECTED = date(1900, 1, 1)
 
 
 def clean_int(value, default=0):
@@ -26,6 +66,11 @@ def clean_hygiene_rating(value):
         return -1
 
 
+def clean_grade(value):
+    """Normalize the feed's letter grade (A/B/C, or N/P/Z while pending)."""
+    return str(value or "").strip().upper()[:1]
+
+
 def clean_string(value, default="Unknown"):
     """Ensure the value is a valid string."""
     return str(value).strip() if value else default
@@ -46,105 +91,919 @@ def clean_email(value):
     return value if value else "Not Provided"
 
 
-# ======================================================================================================
-def fetch_and_store_data(URL):
-    """Fetch restaurant data from NYC Open Data and store it in PostgreSQL."""
-    response = requests.get(URL)
+def clean_record(item):
+    """Map one NYC Open Data row onto Restaurant field values."""
+    longitude = item.get("longitude")
+    latitude = item.get("latitude")
 
-    if response.status_code == 200:
-        data = response.json()
+    # Rows without lat/lon are geocoded later, see geocode_restaurants()
+    geo_point = None
+    if longitude and latitude:
+        geo_point = Point(float(longitude), float(latitude))
 
-        for item in data:
-            try:
-                geo_point = None
-                longitude = item.get("longitude")
-                latitude = item.get("latitude")
-
-                if longitude and latitude:
-                    geo_point = Point(float(longitude), float(latitude))
-                else:
-                    # Fall back to geocoding if lat/lon are missing
-                    geo_point = get_coords(
-                        item.get("building"),
-                        item.get("street"),
-                        item.get("boro"),
-                        item.get("zipcode"),
-                    )
-
-                restaurant, created = Restaurant.objects.update_or_create(
-                    id=clean_int(
-                        item.get("camis")
-                    ),  # NYC API uses 'camis' as unique ID
-                    defaults={
-                        "name": clean_string(item.get("dba")),
-                        "email": clean_email(item.get("email")),  # Placeholder email
-                        "phone": clean_string(item.get("phone", "000-000-0000")),
-                        "building": clean_int(item.get("building")),
-                        "street": clean_string(item.get("street")),
-                        "zipcode": clean_string(item.get("zipcode", "00000")),
-                        "hygiene_rating": clean_hygiene_rating(
-                            item.get("score")
-                        ),  # Hygiene rating is based on score
-                        "inspection_date": clean_date(item.get("record_date")),
-                        "borough": clean_int(
-                            item.get("boro")
-                        ),  # Convert borough to integer
-                        "cuisine_description": clean_string(
-                            item.get("cuisine_description")
-                        ),
-                        "violation_description": clean_string(
-                            item.get("violation_description", "No Violation")
-                        ),
-                        "geo_coords": geo_point,
-                    },
+    record = {
+        "id": clean_int(item.get("camis")),  # NYC API uses 'camis' as unique ID
+        "name": clean_string(item.get("dba")),
+        "email": clean_email(item.get("email")),  # Placeholder email
+        "phone": clean_string(item.get("phone", "000-000-0000")),
+        "building": clean_int(item.get("building")),
+        "street": clean_string(item.get("street")),
+        "zipcode": clean_string(item.get("zipcode", "00000")),
+        "hygiene_rating": clean_hygiene_rating(
+            item.get("score")
+        ),  # Hygiene rating is based on score
+        "grade": clean_grade(item.get("grade")),
+        # record_date is the extract date, the same on every row of a pull
+        "inspection_date": clean_date(item.get("inspection_date")) or NOT_INSPECTED,
+        "borough": borough_id(item.get("boro")),  # The feed names the borough
+        "cuisine_description": clean_string(item.get("cuisine_description")),
+        "violation_description": clean_string(
+            item.get("violation_description", "No Violation")
+        ),
+        "geo_coords": geo_point,
+    }
+    # Rows for ungraded inspections leave grade blank; fall back to the score
+    record["grade"] = record["grade"] or grade_for_score(record["hygiene_rating"])
+    record["source_hash"] = fingerprint(record, item)
+    return record
+
+
+def clean_inspection(item):
+    """
+    Split one feed row into (inspection key, inspection fields, violation
+    fields). Returns None for establishments that have not been inspected
+    yet, which the feed dates 1900-01-01.
+    """
+    inspection_date = clean_date(item.get("inspection_date"))
+    if inspection_date is None or inspection_date.year <= 1900:
+        return None
+
+    key = (
+        clean_int(item.get("camis")),
+        inspection_date,
+        str(item.get("inspection_type") or "").strip(),
+    )
+    inspection = {
+        "action": str(item.get("action") or "").strip(),
+        "score": clean_hygiene_rating(item.get("score")),
+        "grade": clean_grade(item.get("grade")),
+    }
+    violation = None
+    if item.get("violation_code"):
+        violation = {
+            "code": str(item["violation_code"]).strip()[:10],
+            "description": str(item.get("violation_description") or "").strip(),
+            "critical": item.get("critical_flag") == "Critical",
+        }
+    return key, inspection, violation
+
+
+# Raw feed columns hashed alongside the cleaned record: the location inputs,
+# and the inspection columns that end up in the history tables.
+FINGERPRINT_RAW_FIELDS = (
+    "longitude",
+    "latitude",
+    "building",
+    "street",
+    "boro",
+    "zipcode",
+    "inspection_date",
+    "inspection_type",
+    "action",
+    "grade",
+    "violation_code",
+    "critical_flag",
+)
+
+
+def fingerprint(record, item):
+    """
+    Hash of everything ingest would write for a row. Raw lat/lon or the
+    address stand in for geo_coords, so rows still waiting to be geocoded
+    fingerprint the same way every time.
+    """
+    parts = [
+        str(record[field])
+        for field in INGEST_FIELDS
+        if field not in ("geo_coords", "source_hash")
+    ]
+    parts += [str(item.get(key) or "") for key in FINGERPRINT_RAW_FIELDS]
+    return hashlib.blake2b(
+        "\x1f".join(parts).encode("utf-8"), digest_size=16
+    ).hexdigest()
+
+
+# Columns owned by the NYC feed. Everything else on Restaurant (username, user,
+# menu, activation state) belongs to the app and is never touched by ingest.
+INGEST_FIELDS = [
+    "name",
+    "email",
+    "phone",
+    "building",
+    "street",
+    "zipcode",
+    "hygiene_rating",
+    "grade",
+    "inspection_date",
+    "borough",
+    "cuisine_description",
+    "violation_description",
+    "geo_coords",
+    "source_hash",
+]
+
+DEFAULT_BATCH_SIZE = 1000
+# Snapshot rows sorted in memory at once; longer files are sorted in runs of
+# this many rows, spilled to temporary files and merged
+SORT_RUN_SIZE = 100000
+
+
+class IngestStats:
+    """Row counters and timing for a single ingest run."""
+
+    def __init__(self):
+        self.rows = 0
+        self.written = 0
+        self.inserted = 0
+        self.updated = 0
+        self.skipped = 0
+        self.failed = 0
+        self.geocoded = 0
+        self.started = time.monotonic()
+        # Restaurant id -> (building, street, boro, zipcode) still needing coords
+        self.geocode_queue = {}
+
+    @property
+    def elapsed(self):
+        return time.monotonic() - self.started
+
+    @property
+    def rows_per_sec(self):
+        return self.rows / self.elapsed if self.elapsed else 0.0
+
+    def merge(self, other):
+        """Fold the counters of another run (e.g. a worker process) into this one."""
+        for counter in (
+            "rows",
+            "written",
+            "inserted",
+            "updated",
+            "skipped",
+            "failed",
+            "geocoded",
+        ):
+            setattr(self, counter, getattr(self, counter) + getattr(other, counter))
+        self.geocode_queue.update(other.geocode_queue)
+        return self
+
+    def __str__(self):
+        return (
+            f"{self.rows} rows ({self.inserted} inserted, {self.updated} updated, "
+            f"{self.skipped} unchanged, "
+            f"{self.failed} failed, {self.geocoded} geocoded) "
+            f"in {self.elapsed:.1f}s, {self.rows_per_sec:.0f} rows/sec"
+        )
+
+
+def _bulk_upsert(objs, update_fields, stats):
+    """Upsert `objs`, returning the ids of any rows that could not be written."""
+    try:
+        with transaction.atomic():
+            Restaurant.objects.bulk_create(
+                objs,
+                update_conflicts=True,
+                unique_fields=["id"],
+                update_fields=update_fields,
+            )
+        stats.written += len(objs)
+        return set()
+    except DatabaseError as e:
+        print(f"⚠️ Batch of {len(objs)} rejected, retrying row by row: {e}")
+
+    failed = set()
+    for obj in objs:
+        try:
+            with transaction.atomic():
+                Restaurant.objects.bulk_create(
+                    [obj],
+                    update_conflicts=True,
+                    unique_fields=["id"],
+                    update_fields=update_fields,
                 )
+            stats.written += 1
+        except DatabaseError as e:
+            stats.failed += 1
+            failed.add(obj.id)
+            print(f"❌ Error processing record {obj.id}: {e}")
+    return failed
 
-                if created:
-                    print(f"✅ Added: {restaurant.name}")
-                else:
-                    print(f"🔄 Updated: {restaurant.name}")
 
-            except ValidationError as e:
-                print(f"⚠️ Skipping record due to validation error: {e}")
-            except Exception as e:
-                print(f"❌ Error processing record {item.get('camis')}: {e}")
+def upsert_restaurants(records, stats, fields=INGEST_FIELDS):
+    """
+    Write cleaned records with a single INSERT ... ON CONFLICT (id) DO UPDATE.
+    If the batch is rejected, fall back to one row at a time so a single bad
+    row only costs itself.
+
+    Records still waiting to be geocoded keep their stored coordinates (new
+    ones get the model default) until geocode_restaurants() fills them in.
+    Existing rows get only `fields` updated. Returns the ids that could not
+    be written.
+    """
+    located = [Restaurant(**r) for r in records if "geo_coords" in r]
+    unlocated = [Restaurant(**r) for r in records if "geo_coords" not in r]
 
+    failed = set()
+    if located:
+        failed |= _bulk_upsert(located, fields, stats)
+    if unlocated:
+        fields = [field for field in fields if field != "geo_coords"]
+        failed |= _bulk_upsert(unlocated, fields, stats)
+    return failed
+
+
+def store_inspections(groups):
+    """
+    Write the inspection history collected for a batch of restaurants and
+    point each restaurant's latest_inspection at its newest inspection.
+    """
+    restaurant_ids = [group["record"]["id"] for group in groups]
+    inspections = [
+        Inspection(
+            restaurant_id=key[0],
+            inspection_date=key[1],
+            inspection_type=key[2],
+            **fields,
+        )
+        for group in groups
+        for key, fields in group["inspections"].items()
+    ]
+    if not inspections:
+        return
+
+    with transaction.atomic():
+        Inspection.objects.bulk_create(
+            inspections,
+            update_conflicts=True,
+            unique_fields=["restaurant", "inspection_date", "inspection_type"],
+            update_fields=["action", "score", "grade"],
+        )
+
+        # bulk_create does not hand back ids for upserted rows, so read them
+        inspection_ids = {
+            (restaurant_id, inspection_date, inspection_type): pk
+            for pk, restaurant_id, inspection_date, inspection_type in (
+                Inspection.objects.filter(restaurant_id__in=restaurant_ids).values_list(
+                    "id", "restaurant_id", "inspection_date", "inspection_type"
+                )
+            )
+        }
+        Violation.objects.bulk_create(
+            [
+                Violation(inspection_id=inspection_ids[key], **fields)
+                for group in groups
+                for (key, code), fields in group["violations"].items()
+            ],
+            ignore_conflicts=True,
+        )
+
+        Restaurant.objects.filter(id__in=restaurant_ids).update(
+            latest_inspection=Subquery(
+                Inspection.objects.filter(restaurant=OuterRef("pk"))
+                .order_by("-inspection_date", "-id")
+                .values("pk")[:1]
+            )
+        )
+
+
+def _located(point):
+    """False for a missing point or the model's Point(0, 0) placeholder."""
+    return point is not None and (point.x, point.y) != (0.0, 0.0)
+
+
+def drop_unchanged(records, stats, compare=True):
+    """
+    Return (changed records, ids already stored), keeping only the records
+    whose fingerprint differs from the stored one. Only ids, hashes and
+    positions are read, so an unchanged batch costs one narrow SELECT and no
+    writes. Unchanged restaurants that were never placed on the map (say the
+    geocoder timed out last time) stay queued for geocoding. Without
+    `compare`, every record counts as changed.
+    """
+    stored = {
+        restaurant_id: (source_hash, geo_coords)
+        for restaurant_id, source_hash, geo_coords in Restaurant.objects.filter(
+            id__in=[record["id"] for record in records]
+        ).values_list("id", "source_hash", "geo_coords")
+    }
+
+    changed = []
+    for record in records:
+        source_hash, geo_coords = stored.get(record["id"], (None, None))
+        if compare and source_hash == record["source_hash"]:
+            stats.skipped += 1
+            if _located(geo_coords):
+                stats.geocode_queue.pop(record["id"], None)
+        else:
+            changed.append(record)
+    return changed, set(stored)
+
+
+def _add_row(batch, item, stats):
+    """Fold one feed row into its restaurant's group in `batch`."""
+    record = clean_record(item)
+    if record["geo_coords"] is None and not item.get("street"):
+        raise ValidationError("no coordinates and no street to geocode")
+
+    group = batch.get(record["id"])
+    if group is None:
+        group = batch[record["id"]] = {
+            "record": None,
+            "seen": None,
+            "hash": hashlib.blake2b(digest_size=16),
+            "inspections": {},
+            "violations": {},
+        }
+
+    # Every row feeds the group fingerprint, so a new or changed violation
+    # marks the restaurant as changed even if its own columns are not.
+    group["hash"].update(record["source_hash"].encode("utf-8"))
+
+    inspection = clean_inspection(item)
+    if inspection:
+        key, fields, violation = inspection
+        group["inspections"][key] = fields
+        if violation:
+            group["violations"][(key, violation["code"])] = violation
+
+    # The restaurant's own columns come from its most recent row, not from
+    # whichever row happened to arrive last, so inspection_date is the date
+    # of its latest inspection.
+    seen = record["inspection_date"]
+    if group["record"] is not None and seen < group["seen"]:
+        return
+
+    group["record"], group["seen"] = record, seen
+    if record["geo_coords"] is not None:
+        stats.geocode_queue.pop(record["id"], None)
     else:
-        print(f"❌ Failed to fetch data. Status Code: {response.status_code}")
+        del record["geo_coords"]
+        stats.geocode_queue[record["id"]] = (
+            item.get("building"),
+            item.get("street"),
+            item.get("boro"),
+            item.get("zipcode"),
+        )
+
+
+def _flush(batch, stats, fingerprints):
+    # A group's fingerprint only describes the restaurant if it covers all of
+    # its rows. Incremental runs see a window of them, so they neither
+    # compare fingerprints nor store one; the next full run hashes anew.
+    fields = INGEST_FIELDS
+    if not fingerprints:
+        fields = [field for field in INGEST_FIELDS if field != "source_hash"]
+    for group in batch.values():
+        digest = group["hash"].hexdigest() if fingerprints else None
+        group["record"]["source_hash"] = digest
+
+    records, existing = drop_unchanged(
+        [group["record"] for group in batch.values()], stats, compare=fingerprints
+    )
+    if records:
+        failed = upsert_restaurants(records, stats, fields)
+        bump_dataset_version()
+        for record in records:
+            if record["id"] in failed:
+                continue
+            if record["id"] in existing:
+                stats.updated += 1
+            else:
+                stats.inserted += 1
+        store_inspections(
+            [batch[record["id"]] for record in records if record["id"] not in failed]
+        )
 
 
-def get_coords(building, street, boro, zipcode):
+def store_records(items, stats, batch_size=DEFAULT_BATCH_SIZE, fingerprints=True):
     """
-    Return a GeoDjango Point object (longitude, latitude) for the given address,
-    constrained to New York City.
+    Clean raw feed rows in memory and write them in batches of `batch_size`
+    restaurants. The feed has one row per violation, so rows are grouped by
+    camis first: each restaurant is upserted once per batch, and its
+    inspections and violations go to the history tables in bulk. Groups
+    whose content matches the stored fingerprint are skipped.
+
+    A restaurant must be stored from all of its rows at once, so `items`
+    must keep each camis's rows together (the API's camis order, or
+    sort_by_camis()). A camis reappearing after its batch was written is
+    a ValueError rather than a partial overwrite.
+
+    Pass fingerprints=False when `items` are only some of each restaurant's
+    rows (an incremental run): every group is then written, and the stored
+    fingerprints are left alone.
     """
-    geolocator = Nominatim(user_agent="CleanBites2025")
+    batch = {}
+    written = set()
+
+    for item in items:
+        camis = clean_int(item.get("camis"))
+        if camis in written:
+            raise ValueError(
+                f"Rows for camis {camis} are not together; sort the input by camis"
+            )
+        # Only start a new batch between restaurants, so rows for one camis
+        # that arrive together are written together.
+        if len(batch) >= batch_size and camis not in batch:
+            _flush(batch, stats, fingerprints)
+            written.update(batch)
+            batch = {}
+
+        stats.rows += 1
+        try:
+            _add_row(batch, item, stats)
+        except ValidationError as e:
+            stats.failed += 1
+            print(f"⚠️ Skipping record {item.get('camis')} due to validation error: {e}")
+        except Exception as e:
+            stats.failed += 1
+            print(f"❌ Error processing record {item.get('camis')}: {e}")
+
+    if batch:
+        _flush(batch, stats, fingerprints)
+
+    return stats
+
+
+def _shard(item, shard_by, workers):
+    """Pick the worker for a row. All rows for one restaurant share a worker."""
+    if shard_by == "boro":
+        return zlib.crc32(str(item.get("boro") or "").encode("utf-8")) % workers
+    return clean_int(item.get("camis")) % workers
+
+
+def _store_worker(rows, results, batch_size):
+    """Worker process: store the row chunks sent on `rows` until a None arrives."""
+
+    def items():
+        for chunk in iter(rows.get, None):
+            yield from chunk
+
+    stats = IngestStats()
+    try:
+        store_records(items(), stats, batch_size=batch_size)
+    except Exception as e:
+        print(f"❌ Ingest worker failed: {e}")
+        for _ in items():
+            stats.failed += 1  # Drain the queue so the parent is not blocked
+    finally:
+        connections.close_all()
+        results.put(stats)
+
+
+def parallel_store_records(
+    items, workers=1, shard_by="camis", batch_size=DEFAULT_BATCH_SIZE, chunk_size=1000
+):
+    """
+    store_records() spread over `workers` processes. Rows are routed by
+    borough or by camis, so each restaurant is only ever written by one
+    process; the caller's process just parses and routes rows. Returns the
+    combined IngestStats, including every worker's geocode queue, so the
+    rate-limited geocoding stage still runs once in the caller.
+    """
+    if workers <= 1:
+        return store_records(items, IngestStats(), batch_size=batch_size)
+
+    # Forked children must open their own database connections
+    connections.close_all()
+    context = multiprocessing.get_context("fork")
+    queues = [context.Queue(maxsize=8) for _ in range(workers)]
+    results = context.Queue()
+    processes = [
+        context.Process(target=_store_worker, args=(queue, results, batch_size))
+        for queue in queues
+    ]
+    for process in processes:
+        process.start()
+
+    stats = IngestStats()
+    chunks = [[] for _ in range(workers)]
+    try:
+        for item in items:
+            shard = _shard(item, shard_by, workers)
+            chunks[shard].append(item)
+            if len(chunks[shard]) >= chunk_size:
+                queues[shard].put(chunks[shard])
+                chunks[shard] = []
+    finally:
+        for queue, chunk in zip(queues, chunks):
+            if chunk:
+                queue.put(chunk)
+            queue.put(None)
+
+        # Collect results before joining, or a worker can block on a full pipe
+        for _ in processes:
+            stats.merge(results.get())
+        for process in processes:
+            process.join()
+    return stats
+
+
+def iter_json_rows(f, chunk_size=1 << 20):
+    """
+    Yield objects from a JSON array or a JSON Lines file without loading the
+    whole file, decoding one object at a time from a sliding buffer.
+    """
+    decoder = json.JSONDecoder()
+    buffer, pos, eof = "", 0, False
+    while True:
+        while pos < len(buffer) and buffer[pos] in " \t\r\n,[]":
+            pos += 1
+        if pos < len(buffer):
+            try:
+                row, pos = decoder.raw_decode(buffer, pos)
+                yield row
+                continue
+            except json.JSONDecodeError:
+                if eof:
+                    raise  # Truncated or malformed file
+        elif eof:
+            return
 
+        chunk = f.read(chunk_size)
+        eof = not chunk
+        buffer, pos = buffer[pos:] + chunk, 0
+
+
+def _csv_date(value):
+    """Turn the CSV export's MM/DD/YYYY dates into the API's ISO format."""
+    try:
+        return datetime.strptime(value[:10], "%m/%d/%Y").strftime(
+            "%Y-%m-%dT%H:%M:%S.000"
+        )
+    except ValueError:
+        return value
+
+
+def iter_csv_rows(f):
+    """
+    Yield rows from the dataset's CSV export, renamed to match the API:
+    "CUISINE DESCRIPTION" becomes cuisine_description and dates become ISO.
+    """
+    for row in csv.DictReader(f):
+        item = {}
+        for key, value in row.items():
+            key = key.strip().lower().replace(" ", "_")
+            value = (value or "").strip()
+            if key.endswith("_date") and "/" in value:
+                value = _csv_date(value)
+            if value:
+                item[key] = value
+        yield item
+
+
+def _camis(item):
+    return clean_int(item.get("camis"))
+
+
+def sort_by_camis(items, run_size=SORT_RUN_SIZE):
+    """
+    Yield `items` ordered by camis, keeping each camis's rows in their
+    original order. At most `run_size` rows are held in memory: longer
+    inputs are sorted in runs, spilled to temporary JSON Lines files and
+    merged.
+    """
+    items = iter(items)
+    runs = []
+    try:
+        while True:
+            chunk = sorted(itertools.islice(items, run_size), key=_camis)
+            if not runs and len(chunk) < run_size:
+                yield from chunk  # Fits in one run, no need to spill
+                return
+            if not chunk:
+                break
+            run = tempfile.TemporaryFile("w+", encoding="utf-8")
+            run.writelines(json.dumps(row) + "\n" for row in chunk)
+            run.seek(0)
+            runs.append(run)
+
+        yield from heapq.merge(
+            *((json.loads(line) for line in run) for run in runs), key=_camis
+        )
+    finally:
+        for run in runs:
+            run.close()
+
+
+def _snapshot_rows(path):
+    if path.lower().endswith(".csv"):
+        with open(path, newline="", encoding="utf-8") as f:
+            yield from iter_csv_rows(f)
+    else:
+        with open(path, encoding="utf-8") as f:
+            yield from iter_json_rows(f)
+
+
+def read_snapshot(path, run_size=SORT_RUN_SIZE):
+    """
+    Stream the rows of a local .json, .jsonl or .csv snapshot of the dataset,
+    ordered by camis (exports are not) so store_records() sees each
+    restaurant's rows together.
+    """
+    return sort_by_camis(_snapshot_rows(path), run_size=run_size)
+
+
+def geocode_restaurants(
+    stats,
+    geocoder=None,
+    workers=GEOCODE_WORKERS,
+    rate=GEOCODE_RATE,
+    batch_size=DEFAULT_BATCH_SIZE,
+):
+    """
+    Second ingest stage: resolve the restaurants queued on `stats` without
+    coordinates, then write the results back to geo_coords in batches.
+    Addresses in the offline index are answered in memory; the rest go to
+    the geocoder concurrently and under a global rate limit.
+
+    Restaurants flagged needs_geocoding (addresses edited from a profile)
+    are queued too. Their flag is only cleared once a position is stored,
+    so failed lookups are retried by the next run.
+    """
+    queue = stats.geocode_queue
+    flagged = queue_flagged_restaurants(stats)
+    if not queue:
+        return stats
+
+    updates = []
+    index = get_address_index()
+    if index is not None:
+        for restaurant_id, address in list(queue.items()):
+            location = index.lookup(*address)
+            if location is not None:
+                updates.append(Restaurant(id=restaurant_id, geo_coords=location))
+                del queue[restaurant_id]
+
+    locations = geocode_addresses(
+        queue.values(),
+        geocoder or nominatim_geocode,
+        workers=workers,
+        rate=rate,
+        retries=GEOCODE_RETRIES,
+    )
+
+    for restaurant_id, address in queue.items():
+        location = locations.get(normalize_address(*address))
+        if location is not None:
+            updates.append(Restaurant(id=restaurant_id, geo_coords=location))
+
+    ingested = [update for update in updates if update.id not in flagged]
+    Restaurant.objects.bulk_update(ingested, ["geo_coords"], batch_size=batch_size)
+    geocoded = len(ingested)
+    for update in updates:
+        if update.id not in flagged:
+            continue
+        # Skipped if the address was edited again while it was being looked up
+        building, street, zipcode = flagged[update.id]
+        geocoded += Restaurant.objects.filter(
+            pk=update.id,
+            needs_geocoding=True,
+            building=building,
+            street=street,
+            zipcode=zipcode,
+        ).update(geo_coords=update.geo_coords, needs_geocoding=False)
+
+    if geocoded:
+        bump_dataset_version()
+    stats.geocoded += geocoded
+    queue.clear()
+    return stats
+
+
+def queue_flagged_restaurants(stats):
+    """
+    Add the restaurants flagged needs_geocoding to `stats.geocode_queue`.
+    Returns {id: (building, street, zipcode)}, the address each was queued
+    with.
+    """
+    flagged = {}
+    rows = Restaurant.objects.filter(needs_geocoding=True).values_list(
+        "id", "building", "street", "borough", "zipcode"
+    )
+    for restaurant_id, building, street, borough, zipcode in rows:
+        flagged[restaurant_id] = (building, street, zipcode)
+        stats.geocode_queue[restaurant_id] = (
+            building,
+            street,
+            BOROUGHS.get(str(borough), ""),
+            zipcode,
+        )
+    return flagged
+
+
+# ======================================================================================================
+def fetch_and_store_data(
+    URL, batch_size=DEFAULT_BATCH_SIZE, geocoder=None, retries=PAGE_RETRIES
+):
+    """
+    Fetch restaurant data from NYC Open Data and store it in PostgreSQL.
+    Delegates to stream_and_store_data(), so the dataset is read page by
+    page rather than in one response. Returns None if it can't be fetched.
+    """
+    try:
+        return stream_and_store_data(
+            URL, batch_size=batch_size, retries=retries, geocoder=geocoder
+        )
+    except requests.RequestException as e:
+        print(f"❌ Failed to fetch data: {e}")
+        return None
+
+
+def fetch_page(URL, params, retries=PAGE_RETRIES):
+    """GET one page of a SODA dataset, retrying with exponential backoff."""
+    for attempt in range(retries):
+        try:
+            response = requests.get(URL, params=params, timeout=60)
+            if response.status_code == 200:
+                return response.json()
+            error = f"Status Code: {response.status_code}"
+        except (requests.RequestException, ValueError) as e:
+            error = e
+
+        print(f"⚠️ Page at offset {params['$offset']} failed ({error})")
+        if attempt + 1 < retries:
+            time.sleep(2**attempt)
+
+    raise requests.RequestException(
+        f"Giving up on page at offset {params['$offset']} after {retries} attempts"
+    )
+
+
+def fetch_pages(
+    URL, page_size=DEFAULT_PAGE_SIZE, offset=0, where=None, retries=PAGE_RETRIES
+):
+    """
+    Yield (offset, rows) for each page of a SODA dataset using $limit/$offset,
+    optionally narrowed by a SoQL $where clause. Rows are ordered by camis and
+    then the row id, so paging is stable and all rows for one restaurant
+    arrive next to each other.
+    """
+    while True:
+        params = {"$limit": page_size, "$offset": offset, "$order": "camis,:id"}
+        if where:
+            params["$where"] = where
+        rows = fetch_page(URL, params, retries=retries)
+        if not rows:
+            return
+
+        yield offset, rows
+        offset += len(rows)
+
+        if len(rows) < page_size:
+            return
+
+
+def _geocode_page(stats, geocoder, batch_size, geocode):
+    if geocode:
+        geocode_restaurants(stats, geocoder=geocoder, batch_size=batch_size)
+    else:
+        stats.geocode_queue.clear()  # Don't carry the queue from page to page
+
+
+def split_last_restaurant(rows):
+    """
+    Split rows ordered by camis into (rows of complete restaurants, rows of
+    the last restaurant). The last restaurant's rows may continue on the next
+    page, and a restaurant must be stored from all of its rows at once: its
+    columns come from its most recent inspection, and its fingerprint covers
+    every row.
+    """
+    split = len(rows)
+    while split and rows[split - 1].get("camis") == rows[-1].get("camis"):
+        split -= 1
+    return rows[:split], rows[split:]
+
+
+def watermark_where(watermark):
+    """SoQL filter for the rows an incremental run after `watermark` fetches."""
+    since = datetime.fromisoformat(watermark[:10]) - WATERMARK_OVERLAP
+    return f"inspection_date > '{since:%Y-%m-%dT%H:%M:%S}.000'"
+
+
+def stream_and_store_data(
+    URL=NYC_DATA_URL,
+    page_size=DEFAULT_PAGE_SIZE,
+    batch_size=DEFAULT_BATCH_SIZE,
+    resume=True,
+    incremental=False,
+    retries=PAGE_RETRIES,
+    geocoder=None,
+    geocode=True,
+):
+    """
+    Page through NYC Open Data and store each page as it arrives, so only one
+    page is ever held in memory. The offset is checkpointed after every page;
+    an interrupted run picks up from there the next time it is called.
+    Without `geocode`, restaurants missing coordinates are left for a later
+    run.
+
+    With `incremental`, only rows inspected after the newest inspection of the
+    last completed run (less WATERMARK_OVERLAP) are requested. record_date
+    can't serve here: it is the extract date, shared by every row. Those rows
+    are only part of each restaurant's history, so they are written without
+    the fingerprint check (see store_records()).
+    """
+    checkpoint, _ = IngestCheckpoint.objects.get_or_create(source=URL)
+    start = checkpoint.offset if resume else 0
+    if start:
+        print(f"⏩ Resuming {URL} from offset {start}")
+    else:
+        checkpoint.pending_watermark = ""
+
+    where = None
+    if incremental and checkpoint.watermark:
+        where = watermark_where(checkpoint.watermark)
+        print(f"🔎 Fetching rows with {where}")
+
+    stats = IngestStats()
+    held = []  # Rows of a restaurant that may continue on the next page
+    try:
+        for offset, rows in fetch_pages(
+            URL, page_size, start, where=where, retries=retries
+        ):
+            complete, held = split_last_restaurant(held + rows)
+            store_records(
+                complete, stats, batch_size=batch_size, fingerprints=where is None
+            )
+            _geocode_page(stats, geocoder, batch_size, geocode)
+            # Held rows are not stored yet, so a resumed run fetches them again
+            checkpoint.offset = offset + len(rows) - len(held)
+            checkpoint.pending_watermark = max(
+                [checkpoint.pending_watermark]
+                + [row["inspection_date"] for row in rows if row.get("inspection_date")]
+            )
+            checkpoint.save(update_fields=["offset", "pending_watermark", "updated_at"])
+            print(f"📄 Stored page at offset {offset}: {stats}")
+    except requests.RequestException:
+        print(f"❌ Ingest interrupted at offset {checkpoint.offset}; rerun to resume")
+        raise
+
+    store_records(held, stats, batch_size=batch_size, fingerprints=where is None)
+    _geocode_page(stats, geocoder, batch_size, geocode)
+
+    # Only a finished run may move the watermark, otherwise rows from the
+    # pages that were never fetched would be skipped for good.
+    checkpoint.offset = 0
+    checkpoint.watermark = max(checkpoint.watermark, checkpoint.pending_watermark)
+    checkpoint.pending_watermark = ""
+    checkpoint.save()
+    refresh_facets()
+    print(f"✅ Ingest finished: {stats}")
+    print(f"📍 Geocode cache: {geocode_stats()}")
+    return stats
+
+
+def get_coords(building, street, boro, zipcode, geocoder=None):
+    """
+    Return a GeoDjango Point object (longitude, latitude) for the given address,
+    constrained to New York City. The offline address index is tried first;
+    other addresses go through GeocodeCache, and cache misses are resolved by
+    `geocoder` (Nominatim by default).
+    """
     if not street:
         return None  # No address available
 
+    index = get_address_index()
+    if index is not None:
+        geo_point = index.lookup(building, street, boro, zipcode)
+        if geo_point:
+            return geo_point
+
+    return cached_geocode(
+        building, street, boro, zipcode, geocoder or nominatim_geocode
+    )
+
+
+def nominatim_geocode(building, street, boro, zipcode):
+    """Look an address up with Nominatim, returning None if it is not found."""
+    geolocator = Nominatim(user_agent="CleanBites2025")
+
     q_address = (
         f"{building} {street}, {boro}, NY {zipcode}"
         if building
         else f"{street}, {boro}, NY {zipcode}"
     )
 
-    try:
-        # NYC bounding box: west, south, east, north (lon/lat)
-        nyc_bounds = [(-75.5, 39.5), (-70.5, 43.5)]
-
-        location = geolocator.geocode(
-            q_address,
-            timeout=10,
-            viewbox=nyc_bounds,
-        )
+    # NYC bounding box: west, south, east, north (lon/lat)
+    nyc_bounds = [(-75.5, 39.5), (-70.5, 43.5)]
 
-        if location:
-            return Point(location.longitude, location.latitude)  # (X=lon, Y=lat)
-        else:
-            print(f"⚠️ Could not geocode: {q_address}")
-            return None
+    location = geolocator.geocode(
+        q_address,
+        timeout=10,
+        viewbox=nyc_bounds,
+    )
 
-    except GeocoderTimedOut:
-        print(f"⚠️ Geocoding timeout for: {q_address}")
+    if location:
+        return Point(location.longitude, location.latitude)  # (X=lon, Y=lat)
+    else:
+        print(f"⚠️ Could not geocode: {q_address}")
         return None
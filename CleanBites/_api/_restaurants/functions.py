@@ -0,0 +1,49 @@
+from django.contrib.gis.db import models as GISmodels
+from django.db.models import BooleanField, FloatField, Func, Value
+from django.db.models.functions import Cast
+
+
+def geography(expression):
+    """
+    `expression` (a field name or geometry expression) cast to a WGS84
+    geography, so PostGIS measures it in metres on the spheroid. The cast
+    must be spelled the same way in queries and in the expression index on
+    Restaurant.geo_coords for the planner to match them up.
+    """
+    return Cast(expression, GISmodels.PointField(srid=4326, geography=True))
+
+
+class DWithin(Func):
+    """
+    ST_DWithin(a, b, metres) on geographies: true when `a` and `b` are within
+    `metres` of each other. Unlike a Distance(...) <= r comparison, PostGIS
+    rewrites this into a bounding-box test that can use a GiST index.
+    """
+
+    function = "ST_DWithin"
+    output_field = BooleanField()
+
+    def __init__(self, expression, point, metres):
+        point = Value(point, output_field=GISmodels.PointField(srid=4326))
+        super().__init__(
+            geography(expression),
+            geography(point),
+            Value(float(metres), output_field=FloatField()),
+        )
+
+
+class GeographyDistance(Func):
+    """
+    `a <-> b` on geographies: the distance in metres on the sphere. In an
+    ORDER BY it is a nearest-neighbour scan of the geography GiST index on
+    Restaurant.geo_coords, ranking by real distance rather than by degrees
+    (a degree of longitude is only about 0.76 of a degree of latitude here).
+    """
+
+    arg_joiner = " <-> "
+    template = "(%(expressions)s)"
+    output_field = FloatField()
+
+    def __init__(self, expression, point):
+        point = Value(point, output_field=GISmodels.PointField(srid=4326))
+        super().__init__(geography(expression), geography(point))
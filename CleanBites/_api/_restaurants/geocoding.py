@@ -0,0 +1,231 @@
+import re
+import threading
+import time
+from collections import Counter
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import timedelta
+from django.db.models import F
+from django.utils import timezone
+from geopy.exc import GeocoderTimedOut, GeopyError
+from _api._restaurants.models import GeocodeCache
+
+# How long answers stay trusted. Addresses that could not be found are
+# retried sooner, since the geocoder's data improves over time.
+FOUND_TTL = timedelta(days=365)
+NOT_FOUND_TTL = timedelta(days=30)
+
+BOROUGHS = {
+    "1": "MANHATTAN",
+    "2": "BRONX",
+    "3": "BROOKLYN",
+    "4": "QUEENS",
+    "5": "STATEN ISLAND",
+    # PLUTO's two-letter codes
+    "MN": "MANHATTAN",
+    "BX": "BRONX",
+    "BK": "BROOKLYN",
+    "QN": "QUEENS",
+    "SI": "STATEN ISLAND",
+}
+# Borough name -> the numeric id stored on Restaurant
+BOROUGH_IDS = {name: int(code) for code, name in BOROUGHS.items() if code.isdigit()}
+
+# Per-process lookup counters, see geocode_stats()
+_stats = Counter()
+
+
+def _normalize_part(value):
+    value = re.sub(r"[^\w\s-]", " ", str(value or "")).upper()
+    return " ".join(value.split())
+
+
+def normalize_address(building, street, boro, zipcode):
+    """Build the cache key for an address, ignoring case, spacing and punctuation."""
+    boro = _normalize_part(boro)
+    return "|".join(
+        [
+            _normalize_part(building),
+            _normalize_part(street),
+            BOROUGHS.get(boro, boro),
+            _normalize_part(zipcode)[:5],
+        ]
+    )
+
+
+def borough_id(value):
+    """
+    The Restaurant.borough id (1-5) for a borough name such as the feed's
+    "Manhattan", a PLUTO code or an id; 0 when it is none of those.
+    """
+    boro = _normalize_part(value)
+    return BOROUGH_IDS.get(BOROUGHS.get(boro, boro), 0)
+
+
+def lookup_cached(address_key):
+    """
+    Return (found, location) for a cached address. `found` is False when the
+    address is not cached or its entry has expired; a cached negative result
+    is (True, None).
+    """
+    entry = (
+        GeocodeCache.objects.filter(
+            address_key=address_key, expires_at__gt=timezone.now()
+        )
+        .only("id", "location")
+        .first()
+    )
+    if entry is None:
+        _stats["misses"] += 1
+        return False, None
+
+    GeocodeCache.objects.filter(id=entry.id).update(hits=F("hits") + 1)
+    _stats["hits" if entry.location else "negative_hits"] += 1
+    return True, entry.location
+
+
+def store_cached(address_key, location):
+    """Remember a geocoder answer (a Point, or None for "not found")."""
+    ttl = FOUND_TTL if location else NOT_FOUND_TTL
+    GeocodeCache.objects.update_or_create(
+        address_key=address_key,
+        defaults={"location": location, "expires_at": timezone.now() + ttl},
+    )
+
+
+def cached_geocode(building, street, boro, zipcode, geocoder):
+    """
+    Resolve an address through the cache, calling `geocoder(building, street,
+    boro, zipcode)` only on a miss. Geocoder errors such as timeouts are not
+    cached, so the address is tried again next time.
+    """
+    address_key = normalize_address(building, street, boro, zipcode)
+    found, location = lookup_cached(address_key)
+    if found:
+        return location
+
+    try:
+        location = geocoder(building, street, boro, zipcode)
+    except GeopyError as e:
+        _stats["errors"] += 1
+        print(f"⚠️ Geocoding failed for {address_key}: {e}")
+        return None
+
+    store_cached(address_key, location)
+    return location
+
+
+class TokenBucket:
+    """Thread-safe token bucket: on average `rate` acquisitions per second."""
+
+    def __init__(self, rate, capacity=1):
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = capacity
+        self.updated = time.monotonic()
+        self.lock = threading.Lock()
+
+    def acquire(self):
+        while True:
+            with self.lock:
+                now = time.monotonic()
+                self.tokens = min(
+                    self.capacity, self.tokens + (now - self.updated) * self.rate
+                )
+                self.updated = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+def _geocode_with_retry(geocoder, address, bucket, retries, backoff):
+    for attempt in range(retries):
+        if bucket:
+            bucket.acquire()
+        try:
+            return geocoder(*address)
+        except GeocoderTimedOut:
+            if attempt + 1 == retries:
+                raise
+            time.sleep(backoff * 2**attempt)
+
+
+def geocode_addresses(
+    addresses, geocoder, workers=4, rate=None, retries=3, backoff=1.0
+):
+    """
+    Resolve many (building, street, boro, zipcode) addresses at once and return
+    {address_key: Point or None} for every address that got an answer.
+
+    Cached answers are read in one query. Each remaining distinct address is
+    sent to `geocoder` from a pool of `workers` threads, all sharing one token
+    bucket of `rate` requests per second (None for no limit); timeouts are
+    retried with exponential backoff. New answers are cached in one write.
+    The worker threads never touch the database.
+    """
+    addresses = {normalize_address(*address): address for address in addresses}
+
+    locations = dict(
+        GeocodeCache.objects.filter(
+            address_key__in=list(addresses), expires_at__gt=timezone.now()
+        ).values_list("address_key", "location")
+    )
+    if locations:
+        GeocodeCache.objects.filter(address_key__in=list(locations)).update(
+            hits=F("hits") + 1
+        )
+    for location in locations.values():
+        _stats["hits" if location else "negative_hits"] += 1
+
+    misses = [key for key in addresses if key not in locations]
+    _stats["misses"] += len(misses)
+    if not misses:
+        return locations
+
+    bucket = TokenBucket(rate) if rate else None
+    now = timezone.now()
+    entries = []
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                _geocode_with_retry, geocoder, addresses[key], bucket, retries, backoff
+            ): key
+            for key in misses
+        }
+        for future in as_completed(futures):
+            key = futures[future]
+            try:
+                location = future.result()
+            except GeopyError as e:
+                _stats["errors"] += 1
+                print(f"⚠️ Geocoding failed for {key}: {e}")
+                continue
+
+            locations[key] = location
+            ttl = FOUND_TTL if location else NOT_FOUND_TTL
+            entries.append(
+                GeocodeCache(address_key=key, location=location, expires_at=now + ttl)
+            )
+
+    GeocodeCache.objects.bulk_create(
+        entries,
+        update_conflicts=True,
+        unique_fields=["address_key"],
+        update_fields=["location", "expires_at"],
+    )
+    return locations
+
+
+def geocode_stats():
+    """Cache hit/miss counters for this process, plus the overall hit rate."""
+    stats = {key: _stats[key] for key in ("hits", "negative_hits", "misses", "errors")}
+    lookups = stats["hits"] + stats["negative_hits"] + stats["misses"]
+    stats["hit_rate"] = (
+        (stats["hits"] + stats["negative_hits"]) / lookups if lookups else 0.0
+    )
+    return stats
+
+
+def reset_geocode_stats():
+    _stats.clear()
@@ -0,0 +1,474 @@
+import random
+import time
+from datetime import date, timedelta
+from itertools import islice
+from django.contrib.gis.geos import Point
+from django.core.management.base import BaseCommand, CommandError
+from django.db import transaction
+from django.db.models import (
+    Count,
+    DateTimeField,
+    DurationField,
+    ExpressionWrapper,
+    F,
+    IntegerField,
+    OuterRef,
+    Subquery,
+    Sum,
+    Value,
+)
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+from _api._restaurants.facets import refresh_facets
+from _api._restaurants.models import (
+    Comment,
+    Inspection,
+    Reply,
+    Restaurant,
+    Violation,
+    grade_for_score,
+)
+from _api._users.models import DM, Customer, FavoriteRestaurant, Moderator
+
+# Synthetic restaurants get ids far above real camis numbers (which are
+# 8 digits starting with 4 or 5), and synthetic people get emails on this
+# domain, so --clear can remove exactly what was generated.
+SYNTHETIC_ID_START = 90_000_000
+SYNTHETIC_DOMAIN = "synthetic.cleanbites.test"
+
+# Row counts at --scale 1
+VOLUMES = {
+    "restaurants": 30_000,
+    "inspections": 90_000,
+    "customers": 100_000,
+    "moderators": 50,
+    "dms": 2_000_000,
+    "comments": 1_000_000,
+    "replies": 200_000,
+    "favorites": 300_000,
+    "votes": 2_000_000,
+}
+
+# Borough id -> (name, rough land bounding box as west, south, east, north,
+# share of restaurants, zip code prefixes)
+BOROUGHS = {
+    1: ("Manhattan", (-74.019, 40.700, -73.930, 40.880), 0.38, ["100", "101", "102"]),
+    2: ("Bronx", (-73.920, 40.800, -73.780, 40.910), 0.09, ["104"]),
+    3: ("Brooklyn", (-74.040, 40.570, -73.860, 40.740), 0.26, ["112"]),
+    4: ("Queens", (-73.960, 40.540, -73.700, 40.800), 0.23, ["113", "114", "116"]),
+    5: ("Staten Island", (-74.250, 40.500, -74.060, 40.650), 0.04, ["103"]),
+}
+
+CUISINES = [
+    "American",
+    "Chinese",
+    "Coffee/Tea",
+    "Pizza",
+    "Italian",
+    "Mexican",
+    "Japanese",
+    "Latin American",
+    "Bakery Products/Desserts",
+    "Caribbean",
+    "Indian",
+    "Thai",
+    "Korean",
+    "Spanish",
+    "Mediterranean",
+    "Jewish/Kosher",
+    "Donuts",
+    "Hamburgers",
+    "Chicken",
+    "Juice, Smoothies, Fruit Salads",
+]
+NAME_WORDS = [
+    "Golden",
+    "Corner",
+    "Little",
+    "Happy",
+    "Village",
+    "Empire",
+    "Lucky",
+    "Brooklyn",
+    "Harbor",
+    "Park",
+    "Royal",
+    "Green",
+    "Sunset",
+    "Union",
+    "Liberty",
+    "Metro",
+]
+NAME_SUFFIXES = ["Cafe", "Kitchen", "Grill", "Deli", "Bistro", "House", "Express"]
+STREETS = [
+    "BROADWAY",
+    "AMSTERDAM AVENUE",
+    "BEDFORD AVENUE",
+    "ROOSEVELT AVENUE",
+    "GRAND CONCOURSE",
+    "VICTORY BOULEVARD",
+    "LEXINGTON AVENUE",
+    "ATLANTIC AVENUE",
+    "NORTHERN BOULEVARD",
+    "FORDHAM ROAD",
+    "HYLAN BOULEVARD",
+    "FLATBUSH AVENUE",
+    "2 AVENUE",
+    "WEST 4 STREET",
+    "MAIN STREET",
+]
+INSPECTION_TYPES = [
+    "Cycle Inspection / Initial Inspection",
+    "Cycle Inspection / Re-inspection",
+    "Pre-permit (Operational) / Initial Inspection",
+]
+# (code, description, critical)
+VIOLATIONS = [
+    ("02B", "Hot TCS food item not held at or above 140 °F.", True),
+    ("02G", "Cold TCS food item held above 41 °F.", True),
+    ("04L", "Evidence of mice or live mice in establishment's food areas.", True),
+    ("04N", "Filth flies or food/refuse/sewage associated flies present.", True),
+    ("06C", "Food, supplies, or equipment not protected from contamination.", True),
+    ("06D", "Food contact surface not properly washed, rinsed and sanitized.", True),
+    ("08A", "Establishment is not free of harborage or conditions conducive.", False),
+    ("09C", "Food contact surface not properly maintained.", False),
+    ("10B", "Plumbing not properly installed or maintained.", False),
+    ("10F", "Non-food contact surface or equipment improperly maintained.", False),
+]
+WORDS = (
+    "great food service slow fresh tasty clean dirty friendly rude cheap "
+    "expensive portion spicy delicious cold warm ambiance staff menu wait"
+).split()
+
+
+def _chunks(iterable, size):
+    iterator = iter(iterable)
+    while chunk := list(islice(iterator, size)):
+        yield chunk
+
+
+def _skewed(rng, n):
+    """An index in range(n) where low indexes are much more popular."""
+    return int(n * rng.random() ** 3)
+
+
+def _text(rng, words):
+    return " ".join(rng.choice(WORDS) for _ in range(words)).capitalize()
+
+
+class Command(BaseCommand):
+    help = (
+        "Bulk-insert a reproducible synthetic dataset (restaurants inside NYC, "
+        "inspections, customers, DMs, comments, replies, favorites and karma "
+        "votes) for measuring performance at production scale."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--scale",
+            type=float,
+            default=1.0,
+            help="Multiplier for the row counts; 1 is ~30k restaurants, "
+            "100k customers and millions of DMs, comments and votes",
+        )
+        parser.add_argument("--seed", type=int, default=2025)
+        parser.add_argument("--batch-size", type=int, default=10_000)
+        parser.add_argument(
+            "--clear",
+            action="store_true",
+            help="Delete previously generated synthetic data first",
+        )
+
+    def handle(self, *args, **options):
+        if options["scale"] <= 0:
+            raise CommandError("--scale must be positive")
+
+        self.rng = random.Random(options["seed"])
+        self.batch_size = options["batch_size"]
+        self.now = timezone.now()
+        counts = {
+            name: max(2, round(volume * options["scale"]))
+            for name, volume in VOLUMES.items()
+        }
+
+        if options["clear"]:
+            self.clear()
+        elif Customer.objects.filter(email__endswith=f"@{SYNTHETIC_DOMAIN}").exists():
+            raise CommandError("Synthetic data already exists; rerun with --clear")
+
+        started = time.monotonic()
+        restaurant_ids = self.step("restaurants", self.restaurants, counts)
+        self.step("inspections", self.inspections, counts, restaurant_ids)
+        customer_ids = self.step("customers", self.customers, counts)
+        self.step("moderators", self.moderators, counts)
+        self.step("dms", self.dms, counts, customer_ids)
+        comment_ids = self.step(
+            "comments", self.comments, counts, customer_ids, restaurant_ids
+        )
+        self.step("replies", self.replies, counts, customer_ids, comment_ids)
+        self.step("favorites", self.favorites, counts, customer_ids, restaurant_ids)
+        self.step("votes", self.votes, counts, customer_ids, comment_ids)
+        self.stdout.write(f"facets: {refresh_facets()} rows")
+
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Generated synthetic data in {time.monotonic() - started:.1f}s "
+                f"(seed {options['seed']}, scale {options['scale']})"
+            )
+        )
+
+    def step(self, name, generate, counts, *args):
+        started = time.monotonic()
+        with transaction.atomic():
+            result = generate(counts[name], *args)
+        self.stdout.write(
+            f"{name}: {counts[name]} rows in {time.monotonic() - started:.1f}s"
+        )
+        return result
+
+    def bulk_create(self, model, objs, **kwargs):
+        """bulk_create() a generator in batches, returning the new primary keys."""
+        ids = []
+        for chunk in _chunks(objs, self.batch_size):
+            ids += [obj.pk for obj in model.objects.bulk_create(chunk, **kwargs)]
+        return ids
+
+    def spread_timestamps(self, model, field, ids, days=365):
+        """
+        auto_now_add stamps every row with the same instant, so push each new
+        row back by a pseudo-random, id-derived number of seconds.
+        """
+        offset = ExpressionWrapper(
+            Value(timedelta(seconds=1)) * ((F("id") * 7919) % (days * 86400)),
+            output_field=DurationField(),
+        )
+        model.objects.filter(id__gte=min(ids), id__lte=max(ids)).update(
+            **{
+                field: ExpressionWrapper(
+                    Value(self.now) - offset, output_field=DateTimeField()
+                )
+            }
+        )
+
+    def clear(self):
+        with transaction.atomic():
+            # Comments, replies, DMs, favorites and votes cascade
+            Customer.objects.filter(email__endswith=f"@{SYNTHETIC_DOMAIN}").delete()
+            Moderator.objects.filter(email__endswith=f"@{SYNTHETIC_DOMAIN}").delete()
+            Restaurant.objects.filter(id__gte=SYNTHETIC_ID_START).delete()
+        self.stdout.write("Cleared previous synthetic data")
+
+    def restaurants(self, count):
+        rng = self.rng
+        boroughs = list(BOROUGHS)
+        weights = [BOROUGHS[b][2] for b in boroughs]
+
+        def generate():
+            for i in range(count):
+                borough = rng.choices(boroughs, weights)[0]
+                _, (west, south, east, north), _, zips = BOROUGHS[borough]
+                score = min(int(rng.expovariate(1 / 14)), 120)
+                yield Restaurant(
+                    id=SYNTHETIC_ID_START + i,
+                    name=f"{rng.choice(NAME_WORDS)} {rng.choice(NAME_SUFFIXES)} {i}",
+                    email=f"restaurant{i}@{SYNTHETIC_DOMAIN}",
+                    phone=f"{rng.randint(200, 999)}{rng.randint(0, 9999999):07d}",
+                    building=rng.randint(1, 2500),
+                    street=rng.choice(STREETS),
+                    zipcode=f"{rng.choice(zips)}{rng.randint(0, 99):02d}",
+                    hygiene_rating=score,
+                    grade=grade_for_score(score),
+                    inspection_date=date.today() - timedelta(days=rng.randint(0, 1095)),
+                    borough=borough,
+                    cuisine_description=rng.choice(CUISINES),
+                    violation_description=rng.choice(VIOLATIONS)[1],
+                    geo_coords=Point(
+                        rng.uniform(west, east), rng.uniform(south, north), srid=4326
+                    ),
+                )
+
+        return self.bulk_create(Restaurant, generate())
+
+    def inspections(self, count, restaurant_ids):
+        rng = self.rng
+
+        def generate():
+            for i in range(count):
+                score = min(int(rng.expovariate(1 / 14)), 120)
+                yield Inspection(
+                    restaurant_id=restaurant_ids[i % len(restaurant_ids)],
+                    inspection_date=date.today()
+                    - timedelta(days=(i // len(restaurant_ids)) * 365)
+                    - timedelta(days=rng.randint(0, 364)),
+                    inspection_type=rng.choice(INSPECTION_TYPES),
+                    action="Violations were cited in the following area(s).",
+                    score=score,
+                    grade=grade_for_score(score),
+                )
+
+        inspection_ids = self.bulk_create(Inspection, generate())
+
+        def violations():
+            for inspection_id in inspection_ids:
+                for code, description, critical in rng.sample(
+                    VIOLATIONS, rng.randint(0, 4)
+                ):
+                    yield Violation(
+                        inspection_id=inspection_id,
+                        code=code,
+                        description=description,
+                        critical=critical,
+                    )
+
+        self.bulk_create(Violation, violations())
+        Restaurant.objects.filter(id__gte=SYNTHETIC_ID_START).update(
+            latest_inspection=Subquery(
+                Inspection.objects.filter(restaurant=OuterRef("pk"))
+                .order_by("-inspection_date", "-id")
+                .values("pk")[:1]
+            )
+        )
+        return inspection_ids
+
+    def customers(self, count):
+        rng = self.rng
+        first = ["Alex", "Sam", "Jordan", "Taylor", "Casey", "Riley", "Morgan", "Avery"]
+        last = ["Smith", "Chen", "Garcia", "Patel", "Kim", "Cohen", "Rivera", "Nguyen"]
+        return self.bulk_create(
+            Customer,
+            (
+                Customer(
+                    first_name=rng.choice(first),
+                    last_name=rng.choice(last),
+                    email=f"customer{i}@{SYNTHETIC_DOMAIN}",
+                    username=f"customer{i}",
+                )
+                for i in range(count)
+            ),
+        )
+
+    def moderators(self, count):
+        return self.bulk_create(
+            Moderator,
+            (
+                Moderator(
+                    first_name="Moderator",
+                    last_name=str(i),
+                    email=f"moderator{i}@{SYNTHETIC_DOMAIN}",
+                    username=f"moderator{i}",
+                )
+                for i in range(count)
+            ),
+        )
+
+    def dms(self, count, customer_ids):
+        rng = self.rng
+        n = len(customer_ids)
+
+        def generate():
+            for _ in range(count):
+                sender = _skewed(rng, n)
+                receiver = rng.randrange(n - 1)
+                receiver += receiver >= sender  # Never a DM to oneself
+                yield DM(
+                    sender_id=customer_ids[sender],
+                    receiver_id=customer_ids[receiver],
+                    message=_text(rng, rng.randint(3, 30)).encode("utf-8"),
+                    flagged=rng.random() < 0.01,
+                    read=rng.random() < 0.8,
+                )
+
+        ids = self.bulk_create(DM, generate())
+        self.spread_timestamps(DM, "sent_at", ids)
+        return ids
+
+    def comments(self, count, customer_ids, restaurant_ids):
+        rng = self.rng
+
+        def generate():
+            for _ in range(count):
+                yield Comment(
+                    commenter_id=rng.choice(customer_ids),
+                    restaurant_id=restaurant_ids[_skewed(rng, len(restaurant_ids))],
+                    title=_text(rng, rng.randint(2, 6))[:80],
+                    comment=_text(rng, rng.randint(10, 80)),
+                    rating=rng.randint(1, 5),
+                    health_rating=rng.randint(1, 5),
+                    flagged=rng.random() < 0.01,
+                )
+
+        ids = self.bulk_create(Comment, generate())
+        self.spread_timestamps(Comment, "posted_at", ids)
+        return ids
+
+    def replies(self, count, customer_ids, comment_ids):
+        rng = self.rng
+        ids = self.bulk_create(
+            Reply,
+            (
+                Reply(
+                    commenter_id=rng.choice(customer_ids),
+                    comment_id=comment_ids[_skewed(rng, len(comment_ids))],
+                    reply=_text(rng, rng.randint(5, 40)).encode("utf-8"),
+                )
+                for _ in range(count)
+            ),
+        )
+        self.spread_timestamps(Reply, "posted_at", ids)
+        return ids
+
+    def favorites(self, count, customer_ids, restaurant_ids):
+        rng = self.rng
+        self.bulk_create(
+            FavoriteRestaurant,
+            (
+                FavoriteRestaurant(
+                    customer_id=rng.choice(customer_ids),
+                    restaurant_id=restaurant_ids[_skewed(rng, len(restaurant_ids))],
+                )
+                for _ in range(count)
+            ),
+            ignore_conflicts=True,
+        )
+
+    def votes(self, count, customer_ids, comment_ids):
+        rng = self.rng
+        Vote = Comment.k_voters.through
+        self.bulk_create(
+            Vote,
+            (
+                Vote(
+                    comment_id=comment_ids[_skewed(rng, len(comment_ids))],
+                    customer_id=rng.choice(customer_ids),
+                )
+                for _ in range(count)
+            ),
+            ignore_conflicts=True,
+        )
+
+        # Keep karma consistent with the votes, as toggle_karma does
+        comments = Comment.objects.filter(id__gte=min(comment_ids))
+        comments.update(
+            karma=Coalesce(
+                Subquery(
+                    Vote.objects.filter(comment_id=OuterRef("pk"))
+                    .values("comment_id")
+                    .annotate(n=Count("*"))
+                    .values("n"),
+                    output_field=IntegerField(),
+                ),
+                0,
+            )
+        )
+        Customer.objects.filter(id__gte=min(customer_ids)).update(
+            karmatotal=Coalesce(
+                Subquery(
+                    Comment.objects.filter(commenter_id=OuterRef("pk"))
+                    .values("commenter_id")
+                    .annotate(total=Sum("karma"))
+                    .values("total"),
+                    output_field=IntegerField(),
+                ),
+                0,
+            )
+        )
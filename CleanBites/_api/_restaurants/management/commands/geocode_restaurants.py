@@ -0,0 +1,28 @@
+from django.core.management.base import BaseCommand
+from _api._restaurants.fetch_data import (
+    DEFAULT_BATCH_SIZE,
+    IngestStats,
+    geocode_restaurants,
+)
+from _api._restaurants.geocoding import geocode_stats
+from _api._restaurants.models import Restaurant
+
+
+class Command(BaseCommand):
+    help = (
+        "Geocode the restaurants whose address was edited from their profile "
+        "(flagged needs_geocoding). Run it on a schedule between ingests."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+
+    def handle(self, *args, **options):
+        stats = geocode_restaurants(IngestStats(), batch_size=options["batch_size"])
+        pending = Restaurant.objects.filter(needs_geocoding=True).count()
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Geocoded {stats.geocoded} restaurants, {pending} still pending"
+            )
+        )
+        self.stdout.write(f"Geocode cache: {geocode_stats()}")
@@ -0,0 +1,126 @@
+import os
+import time
+from django.core.management.base import BaseCommand, CommandError
+from _api._restaurants.fetch_data import (
+    DEFAULT_BATCH_SIZE,
+    DEFAULT_PAGE_SIZE,
+    NYC_DATA_URL,
+    fetch_pages,
+    geocode_restaurants,
+    parallel_store_records,
+    read_snapshot,
+    stream_and_store_data,
+)
+from _api._restaurants.facets import refresh_facets
+from _api._restaurants.geocoding import geocode_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Ingest NYC restaurant inspection results from the Open Data API or "
+        "from a local .json, .jsonl or .csv snapshot of the dataset."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "source",
+            nargs="?",
+            default=NYC_DATA_URL,
+            help="Dataset URL or path to a local snapshot (default: the NYC API)",
+        )
+        parser.add_argument(
+            "--workers",
+            type=int,
+            default=1,
+            help="Worker processes that write to the database (default: 1)",
+        )
+        parser.add_argument(
+            "--shard-by",
+            choices=["camis", "boro"],
+            help="How rows are split between workers (default: camis)",
+        )
+        parser.add_argument("--batch-size", type=int, default=DEFAULT_BATCH_SIZE)
+        parser.add_argument("--page-size", type=int, default=DEFAULT_PAGE_SIZE)
+        parser.add_argument(
+            "--incremental",
+            action="store_true",
+            help="Only fetch rows newer than the last completed run (URL only)",
+        )
+        parser.add_argument(
+            "--no-resume",
+            action="store_true",
+            help="Ignore the checkpoint of an interrupted run (URL only)",
+        )
+        parser.add_argument(
+            "--no-geocode",
+            action="store_true",
+            help="Leave restaurants without coordinates for a later run",
+        )
+
+    def handle(self, *args, **options):
+        source = options["source"]
+        workers = options["workers"]
+        is_url = source.startswith(("http://", "https://"))
+
+        if workers < 1:
+            raise CommandError("--workers must be at least 1")
+        if options["shard_by"] and workers == 1:
+            raise CommandError("--shard-by needs --workers 2 or more")
+        if not is_url and not os.path.exists(source):
+            raise CommandError(f"No such file: {source}")
+
+        started = time.monotonic()
+        if is_url and workers == 1:
+            # The checkpointed path: resumable and incremental
+            stats = stream_and_store_data(
+                source,
+                page_size=options["page_size"],
+                batch_size=options["batch_size"],
+                resume=not options["no_resume"],
+                incremental=options["incremental"],
+                geocode=not options["no_geocode"],
+            )
+            self.report(stats, time.monotonic() - started, 0.0)
+            return
+
+        if is_url and options["incremental"]:
+            raise CommandError("--incremental needs --workers 1 for URL sources")
+
+        if is_url:
+            rows = (
+                row
+                for _, page in fetch_pages(source, options["page_size"])
+                for row in page
+            )
+        else:
+            rows = read_snapshot(source)
+
+        stats = parallel_store_records(
+            rows,
+            workers=workers,
+            shard_by=options["shard_by"] or "camis",
+            batch_size=options["batch_size"],
+        )
+        store_time = time.monotonic() - started
+
+        if not options["no_geocode"]:
+            geocode_restaurants(stats, batch_size=options["batch_size"])
+        self.stdout.write(f"Facets: {refresh_facets()} rows")
+        self.report(stats, store_time, time.monotonic() - started - store_time)
+
+    def report(self, stats, store_time, geocode_time):
+        total = store_time + geocode_time
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Ingested {stats.rows} rows in {total:.1f}s: "
+                f"{stats.inserted} inserted, {stats.updated} updated, "
+                f"{stats.skipped} unchanged, {stats.failed} failed"
+            )
+        )
+        if geocode_time:
+            self.stdout.write(
+                f"Store: {store_time:.1f}s "
+                f"({stats.rows / store_time if store_time else 0:.0f} rows/sec), "
+                f"geocode: {geocode_time:.1f}s ({stats.geocoded} geocoded)"
+            )
+        self.stdout.write(f"Geocode cache: {geocode_stats()}")
@@ -0,0 +1,23 @@
+# Generated by Django 4.2.20 on 2026-10-16 12:30
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("_restaurants", "0017_ingestcheckpoint"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="ingestcheckpoint",
+            name="pending_watermark",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+        migrations.AddField(
+            model_name="ingestcheckpoint",
+            name="watermark",
+            field=models.CharField(blank=True, default="", max_length=32),
+        ),
+    ]
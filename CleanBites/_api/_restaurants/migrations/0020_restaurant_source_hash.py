@@ -0,0 +1,18 @@
+# Generated by Django 4.2.20 on 2026-10-16 23:58
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("_restaurants", "0019_geocodecache"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="source_hash",
+            field=models.CharField(blank=True, max_length=32, null=True),
+        ),
+    ]
@@ -0,0 +1,93 @@
+# Generated by Django 4.2.20 on 2026-10-16 23:59
+
+from django.db import migrations, models
+import django.db.models.deletion
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("_restaurants", "0020_restaurant_source_hash"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="Inspection",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("inspection_date", models.DateField()),
+                (
+                    "inspection_type",
+                    models.CharField(blank=True, default="", max_length=255),
+                ),
+                ("action", models.TextField(blank=True, default="")),
+                ("score", models.IntegerField(default=-1)),
+                ("grade", models.CharField(blank=True, default="", max_length=1)),
+                (
+                    "restaurant",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="inspections",
+                        to="_restaurants.restaurant",
+                    ),
+                ),
+            ],
+        ),
+        migrations.CreateModel(
+            name="Violation",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("code", models.CharField(max_length=10)),
+                ("description", models.TextField(blank=True, default="")),
+                ("critical", models.BooleanField(default=False)),
+                (
+                    "inspection",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="violations",
+                        to="_restaurants.inspection",
+                    ),
+                ),
+            ],
+        ),
+        migrations.AddField(
+            model_name="restaurant",
+            name="latest_inspection",
+            field=models.ForeignKey(
+                blank=True,
+                null=True,
+                on_delete=django.db.models.deletion.SET_NULL,
+                related_name="+",
+                to="_restaurants.inspection",
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="violation",
+            constraint=models.UniqueConstraint(
+                fields=("inspection", "code"), name="uniq_violation_per_inspection"
+            ),
+        ),
+        migrations.AddConstraint(
+            model_name="inspection",
+            constraint=models.UniqueConstraint(
+                fields=("restaurant", "inspection_date", "inspection_type"),
+                name="uniq_inspection_per_restaurant_date_type",
+            ),
+        ),
+    ]
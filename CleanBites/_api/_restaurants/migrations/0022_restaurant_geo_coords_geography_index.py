@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-17 00:15
+
+import django.contrib.gis.db.models.fields
+import django.contrib.postgres.indexes
+from django.db import migrations
+import django.db.models.functions.comparison
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("_restaurants", "0021_inspection_violation"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=django.contrib.postgres.indexes.GistIndex(
+                django.db.models.functions.comparison.Cast(
+                    "geo_coords",
+                    django.contrib.gis.db.models.fields.PointField(
+                        geography=True, srid=4326
+                    ),
+                ),
+                name="restaurant_geo_coords_geog",
+            ),
+        ),
+    ]
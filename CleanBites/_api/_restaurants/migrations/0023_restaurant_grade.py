@@ -0,0 +1,40 @@
+# Generated by Django 4.2.20 on 2026-10-17 00:16
+
+from django.db import migrations, models
+
+
+def backfill_grades(apps, schema_editor):
+    # Derived from the score for now; the next ingest stores the feed's grade
+    Restaurant = apps.get_model("_restaurants", "Restaurant")
+    Restaurant.objects.update(
+        grade=models.Case(
+            models.When(hygiene_rating__lt=0, then=models.Value("")),
+            models.When(hygiene_rating__lte=13, then=models.Value("A")),
+            models.When(hygiene_rating__lte=27, then=models.Value("B")),
+            default=models.Value("C"),
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("_restaurants", "0022_restaurant_geo_coords_geography_index"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="grade",
+            field=models.CharField(blank=True, default="", max_length=1),
+        ),
+        migrations.RunPython(backfill_grades, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=models.Index(
+                condition=models.Q(("is_activated", True)),
+                fields=["grade", "cuisine_description"],
+                name="restaurant_active_grade_cuis",
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.20 on 2026-10-17 00:17
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("_restaurants", "0023_restaurant_grade"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="RestaurantFacet",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("cuisine_description", models.CharField(max_length=255)),
+                ("borough", models.IntegerField()),
+                ("grade", models.CharField(blank=True, default="", max_length=1)),
+                ("count", models.IntegerField()),
+            ],
+        ),
+        migrations.AddConstraint(
+            model_name="restaurantfacet",
+            constraint=models.UniqueConstraint(
+                fields=("cuisine_description", "borough", "grade"),
+                name="uniq_restaurant_facet",
+            ),
+        ),
+    ]
@@ -0,0 +1,38 @@
+# Generated by Django 4.2.20 on 2026-10-17 00:20
+
+import django.contrib.postgres.indexes
+from django.contrib.postgres.operations import TrigramExtension
+from django.db import migrations
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("_restaurants", "0024_restaurantfacet"),
+    ]
+
+    operations = [
+        TrigramExtension(),
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["name"], name="restaurant_name_trgm", opclasses=["gin_trgm_ops"]
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["street"],
+                name="restaurant_street_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=django.contrib.postgres.indexes.GinIndex(
+                fields=["cuisine_description"],
+                name="restaurant_cuisine_trgm",
+                opclasses=["gin_trgm_ops"],
+            ),
+        ),
+    ]
@@ -0,0 +1,21 @@
+# Generated by Django 4.2.20 on 2026-10-17 00:29
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("_restaurants", "0025_restaurant_trigram_indexes"),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=models.Index(
+                condition=models.Q(("is_activated", True)),
+                fields=["-inspection_date", "-id"],
+                name="restaurant_active_recent",
+            ),
+        ),
+    ]
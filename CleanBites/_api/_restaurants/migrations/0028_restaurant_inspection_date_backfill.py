@@ -0,0 +1,28 @@
+# Generated by Django 4.2.20 on 2026-10-17 00:52
+
+from django.db import migrations, models
+
+
+def backfill_inspection_dates(apps, schema_editor):
+    # inspection_date used to hold the feed's record_date (the extract date);
+    # restaurants with an inspection history get their latest inspection's
+    Restaurant = apps.get_model("_restaurants", "Restaurant")
+    Inspection = apps.get_model("_restaurants", "Inspection")
+    Restaurant.objects.filter(latest_inspection__isnull=False).update(
+        inspection_date=models.Subquery(
+            Inspection.objects.filter(pk=models.OuterRef("latest_inspection")).values(
+                "inspection_date"
+            )[:1]
+        )
+    )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("_restaurants", "0027_dataset_version"),
+    ]
+
+    operations = [
+        migrations.RunPython(backfill_inspection_dates, migrations.RunPython.noop),
+    ]
@@ -0,0 +1,26 @@
+# Generated by Django 4.2.20 on 2026-10-17 00:57
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ("_restaurants", "0028_restaurant_inspection_date_backfill"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="restaurant",
+            name="needs_geocoding",
+            field=models.BooleanField(default=False),
+        ),
+        migrations.AddIndex(
+            model_name="restaurant",
+            index=models.Index(
+                condition=models.Q(("needs_geocoding", True)),
+                fields=["id"],
+                name="restaurant_needs_geocoding",
+            ),
+        ),
+    ]
@@ -4,9 +4,45 @@ from django.contrib.gis.geos import Point
 from django.contrib.auth import get_user_model
 from django.contrib.contenttypes.models import ContentType
 from django.contrib.contenttypes.fields import GenericForeignKey
+from django.contrib.postgres.indexes import GinIndex, GistIndex
+from _api._restaurants.functions import geography
 
 User = get_user_model()
 
+# Grades the map filters on; the feed also uses N, P and Z for pending ones
+GRADES = ("A", "B", "C")
+
+
+def grade_for_score(score):
+    """
+    The letter grade the DOHMH scale gives an inspection score: A for 0-13,
+    B for 14-27 and C for 28 and up. Blank for unscored (negative) scores.
+    """
+    if score is None or score < 0:
+        return ""
+    if score <= 13:
+        return "A"
+    return "B" if score <= 27 else "C"
+
+
+# Restaurant columns the cached map, tile, facet and feed responses are built
+# from. Saving a restaurant only bumps the dataset version (which retires all
+# of those caches) when one of them changed.
+CACHED_FIELDS = (
+    "name",
+    "building",
+    "street",
+    "zipcode",
+    "hygiene_rating",
+    "grade",
+    "inspection_date",
+    "borough",
+    "cuisine_description",
+    "violation_description",
+    "geo_coords",
+    "is_activated",
+)
+
 
 # Create your models here.
 class Restaurant(models.Model):
@@ -22,6 +58,8 @@ class Restaurant(models.Model):
     street = models.CharField(max_length=255)  # Street name
     zipcode = models.CharField(max_length=10)  # Zip code
     hygiene_rating = models.IntegerField()  # Hygiene rating
+    # Letter grade: the feed's, else derived from hygiene_rating
+    grade = models.CharField(max_length=1, blank=True, default="")
     inspection_date = models.DateField()  # Inspection date
     borough = models.IntegerField()  # Borough ID
     cuisine_description = models.CharField(max_length=255)  # Cuisine type
@@ -33,10 +71,169 @@ class Restaurant(models.Model):
     is_activated = models.BooleanField(default=True)
     deactivation_reason = models.TextField(null=True, blank=True)
     deactivated_until = models.DateField(null=True, blank=True)
+    # Fingerprint of the feed rows this was last ingested from
+    source_hash = models.CharField(max_length=32, null=True, blank=True)
+    # Address edited from the profile; geocode_restaurants() picks it up
+    needs_geocoding = models.BooleanField(default=False)
+    latest_inspection = models.ForeignKey(
+        "Inspection",
+        on_delete=models.SET_NULL,
+        related_name="+",
+        null=True,
+        blank=True,
+    )
+
+    class Meta:
+        indexes = [
+            # Radius searches run ST_DWithin on geo_coords::geography; the
+            # default GiST index on the geometry column can't serve those.
+            GistIndex(geography("geo_coords"), name="restaurant_geo_coords_geog"),
+            # The map only ever shows active restaurants, filtered by grade.
+            # Its cuisine filter is a substring match, which this btree can't
+            # serve; restaurant_cuisine_trgm below answers it and the planner
+            # ANDs the two bitmaps.
+            models.Index(
+                fields=["grade", "cuisine_description"],
+                condition=models.Q(is_activated=True),
+                name="restaurant_active_grade_cuis",
+            ),
+            # The recent violations feed reads active restaurants newest first
+            models.Index(
+                fields=["-inspection_date", "-id"],
+                condition=models.Q(is_activated=True),
+                name="restaurant_active_recent",
+            ),
+            # The profile edits still waiting for geocode_restaurants()
+            models.Index(
+                fields=["id"],
+                condition=models.Q(needs_geocoding=True),
+                name="restaurant_needs_geocoding",
+            ),
+            # Trigram indexes behind search_filter()'s ILIKE and %> matches
+            GinIndex(
+                fields=["name"], opclasses=["gin_trgm_ops"], name="restaurant_name_trgm"
+            ),
+            GinIndex(
+                fields=["street"],
+                opclasses=["gin_trgm_ops"],
+                name="restaurant_street_trgm",
+            ),
+            GinIndex(
+                fields=["cuisine_description"],
+                opclasses=["gin_trgm_ops"],
+                name="restaurant_cuisine_trgm",
+            ),
+        ]
 
     def __str__(self):
         return f"{self.name} ({self.street}, {self.zipcode})"
 
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        instance._remember_cached_fields()
+        return instance
+
+    def _remember_cached_fields(self):
+        self._loaded = {field: self.__dict__.get(field) for field in CACHED_FIELDS}
+
+    def cached_fields_changed(self, update_fields=None):
+        """
+        True if saving this instance (only `update_fields`, if given) changes
+        a column in CACHED_FIELDS since it was loaded or last saved.
+        """
+        fields = CACHED_FIELDS
+        if update_fields is not None:
+            fields = [field for field in fields if field in update_fields]
+        loaded = getattr(self, "_loaded", None)
+        if loaded is None:  # Not loaded from the database
+            return bool(fields)
+        return any(self.__dict__.get(field) != loaded[field] for field in fields)
+
+    def save(self, *args, **kwargs):
+        # Re-derive the grade whenever the score changes. Ingest writes the
+        # feed's own grade with bulk_create, which skips this.
+        if self._state.adding:
+            regrade = not self.grade
+        else:
+            loaded = getattr(self, "_loaded", {})
+            regrade = "hygiene_rating" in self.__dict__ and self.hygiene_rating != (
+                loaded.get("hygiene_rating")
+            )
+        if regrade:
+            self.grade = grade_for_score(self.hygiene_rating)
+            update_fields = kwargs.get("update_fields")
+            if update_fields is not None and "hygiene_rating" in update_fields:
+                kwargs["update_fields"] = {*update_fields, "grade"}
+        super().save(*args, **kwargs)
+        self._remember_cached_fields()
+
+
+class Inspection(models.Model):
+    restaurant = models.ForeignKey(
+        Restaurant, on_delete=models.CASCADE, related_name="inspections"
+    )
+    inspection_date = models.DateField()
+    inspection_type = models.CharField(max_length=255, blank=True, default="")
+    action = models.TextField(blank=True, default="")
+    score = models.IntegerField(default=-1)  # -1 when the inspection is unscored
+    grade = models.CharField(max_length=1, blank=True, default="")
+
+    class Meta:
+        constraints = [
+            # Also serves as the (restaurant, inspection_date) index
+            models.UniqueConstraint(
+                fields=["restaurant", "inspection_date", "inspection_type"],
+                name="uniq_inspection_per_restaurant_date_type",
+            )
+        ]
+
+    def __str__(self):
+        return f"Inspection of {self.restaurant_id} on {self.inspection_date}"
+
+
+class Violation(models.Model):
+    inspection = models.ForeignKey(
+        Inspection, on_delete=models.CASCADE, related_name="violations"
+    )
+    code = models.CharField(max_length=10)
+    description = models.TextField(blank=True, default="")
+    critical = models.BooleanField(default=False)
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["inspection", "code"], name="uniq_violation_per_inspection"
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.code} ({self.inspection})"
+
+
+class RestaurantFacet(models.Model):
+    """
+    Number of active restaurants per (cuisine, borough, grade), rebuilt by
+    refresh_facets() at the end of every ingest. The sidebar's facet counts
+    are sums over this table instead of GROUP BYs over Restaurant.
+    """
+
+    cuisine_description = models.CharField(max_length=255)
+    borough = models.IntegerField()
+    grade = models.CharField(max_length=1, blank=True, default="")
+    count = models.IntegerField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["cuisine_description", "borough", "grade"],
+                name="uniq_restaurant_facet",
+            )
+        ]
+
+    def __str__(self):
+        return f"{self.cuisine_description}/{self.borough}/{self.grade}: {self.count}"
+
 
 class Comment(models.Model):
     id = models.AutoField(primary_key=True)
@@ -111,3 +308,38 @@ class Reply(models.Model):
 
     def __str__(self):
         return f"Reply {self.id} to Comment {self.comment.id}"
+
+
+class IngestCheckpoint(models.Model):
+    source = models.CharField(max_length=255, unique=True)  # Dataset URL
+    offset = models.IntegerField(default=0)  # Rows stored so far in the current run
+    # inspection_date high-water marks, kept in the feed's ISO format so they
+    # sort as strings: everything up to `watermark` has been ingested, and
+    # `pending_watermark` is the newest row seen by the run in progress.
+    watermark = models.CharField(max_length=32, blank=True, default="")
+    pending_watermark = models.CharField(max_length=32, blank=True, default="")
+    updated_at = models.DateTimeField(auto_now=True)
+
+    def __str__(self):
+        return f"{self.source} @ {self.offset}"
+
+
+class DatasetVersion(models.Model):
+    # A single row counting changes to restaurant data. Response caches key
+    # on it, and every process (web workers, ingest, shards) sees the same
+    # value because it lives in the database rather than a local cache.
+    version = models.BigIntegerField(default=1)
+
+    def __str__(self):
+        return f"dataset v{self.version}"
+
+
+class GeocodeCache(models.Model):
+    address_key = models.CharField(max_length=255, unique=True)  # normalize_address()
+    location = GISmodels.PointField(null=True, blank=True)  # Null = address not found
+    hits = models.IntegerField(default=0)  # Lookups answered from this entry
+    created_at = models.DateTimeField(auto_now_add=True)
+    expires_at = models.DateTimeField(db_index=True)
+
+    def __str__(self):
+        return f"{self.address_key} -> {self.location}"
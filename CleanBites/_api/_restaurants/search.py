@@ -0,0 +1,73 @@
+from django.db.models import BooleanField, Func, Q, Value
+from django.db.models.functions import Greatest
+from django.contrib.postgres.search import TrigramWordSimilarity
+from rest_framework import filters
+
+# Restaurant columns searched by default, each with a pg_trgm GIN index
+SEARCH_FIELDS = ("name", "street", "cuisine_description")
+
+
+class ILike(Func):
+    """`expression ILIKE pattern`, which a gin_trgm_ops index can answer."""
+
+    arg_joiner = " ILIKE "
+    template = "%(expressions)s"
+    output_field = BooleanField()
+
+
+def _like_pattern(query):
+    escaped = query.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_")
+    return f"%{escaped}%"
+
+
+def contains(field, query):
+    """
+    Q for `field` containing `query`, ignoring case. Unlike __icontains,
+    which compiles to UPPER(field) LIKE, the ILIKE can use the field's
+    gin_trgm_ops index.
+    """
+    return Q(ILike(field, Value(_like_pattern(query))))
+
+
+def search_filter(query, fields=SEARCH_FIELDS):
+    """
+    Q matching rows where any of `fields` contains `query` or is close to it
+    by trigram word similarity (`%>`), which forgives typos like "shak
+    shack". The cutoff is pg_trgm.word_similarity_threshold, set from
+    settings.SEARCH_SIMILARITY_THRESHOLD when each connection is opened.
+    Both operators are served by the gin_trgm_ops indexes on Restaurant.
+    """
+    condition = Q()
+    for field in fields:
+        condition |= contains(field, query) | Q(
+            **{f"{field}__trigram_word_similar": query}
+        )
+    return condition
+
+
+def search_restaurants(queryset, query, fields=SEARCH_FIELDS):
+    """
+    Filter `queryset` to restaurants matching `query` in any of `fields`,
+    best match first. The score is on each row as `search_rank`.
+    """
+    ranks = [TrigramWordSimilarity(query, field) for field in fields]
+    return (
+        queryset.filter(search_filter(query, fields))
+        .annotate(search_rank=Greatest(*ranks) if len(ranks) > 1 else ranks[0])
+        .order_by("-search_rank")
+    )
+
+
+class TrigramSearchFilter(filters.SearchFilter):
+    """
+    SearchFilter backed by search_restaurants(): ?search= terms are matched
+    as one fuzzy query against the view's search_fields and ranked by
+    similarity. An explicit ?ordering= still wins over the ranking.
+    """
+
+    def filter_queryset(self, request, queryset, view):
+        fields = getattr(view, "search_fields", None)
+        terms = self.get_search_terms(request)
+        if not fields or not terms:
+            return queryset
+        return search_restaurants(queryset, " ".join(terms), fields)
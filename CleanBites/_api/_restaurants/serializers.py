@@ -1,24 +1,81 @@
+from django.urls import reverse
 from rest_framework import serializers
+from _api.mixins import SparseFieldsMixin
 from .models import Restaurant, Comment, Reply
 
 
-class RestaurantSerializer(serializers.ModelSerializer):
+class RestaurantSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Restaurant
         fields = "__all__"  # Include all fields in serialization
 
 
-class RestaurantAddressSerializer(serializers.ModelSerializer):
+class RestaurantListSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    List profile: the columns a results page shows. The menu is left out and
+    the violation text is cut down to `violation_summary` in the database.
+    """
+
+    violation_summary = serializers.CharField(read_only=True)
+
+    class Meta:
+        model = Restaurant
+        fields = [
+            "id",
+            "name",
+            "building",
+            "street",
+            "zipcode",
+            "borough",
+            "cuisine_description",
+            "hygiene_rating",
+            "grade",
+            "inspection_date",
+            "violation_summary",
+        ]
+
+
+class RestaurantDetailSerializer(SparseFieldsMixin, serializers.ModelSerializer):
+    """
+    Detail profile: every column except the menu, which is linked instead and
+    downloaded from its own endpoint.
+    """
+
+    menu_url = serializers.SerializerMethodField()
+
+    class Meta:
+        model = Restaurant
+        exclude = ["menu"]
+        sparse_sources = {"menu_url": []}  # Reads the has_menu annotation
+
+    def get_menu_url(self, restaurant):
+        if not restaurant.has_menu:
+            return None
+        url = reverse("restaurant-menu", kwargs={"pk": restaurant.pk})
+        request = self.context.get("request")
+        return request.build_absolute_uri(url) if request else url
+
+
+def model_columns(serializer_class):
+    """The model columns named in a serializer profile's Meta.fields."""
+    meta = serializer_class.Meta
+    names = {field.name for field in meta.model._meta.concrete_fields}
+    return [name for name in meta.fields if name in names]
+
+
+class RestaurantAddressSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Restaurant
         fields = ["id", "name", "building", "street", "zipcode", "borough"]
 
 
-class CommentSerializer(serializers.ModelSerializer):
+class CommentSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     commenter_name = serializers.CharField(
         source="commenter.first_name", read_only=True
     )
     restaurant_name = serializers.CharField(source="restaurant.name", read_only=True)
+    # A customer or a moderator, through a generic relation
+    flagged_by = serializers.StringRelatedField()
 
     class Meta:
         model = Comment
@@ -34,9 +91,13 @@ class CommentSerializer(serializers.ModelSerializer):
             "flagged_by",
             "posted_at",
         ]
+        expandable_fields = {
+            "commenter": "_api._users.serializers.CustomerSerializer",
+            "restaurant": RestaurantAddressSerializer,
+        }
 
 
-class ReplySerializer(serializers.ModelSerializer):
+class ReplySerializer(SparseFieldsMixin, serializers.ModelSerializer):
     commenter_name = serializers.CharField(
         source="commenter.first_name", read_only=True
     )
@@ -56,3 +117,7 @@ class ReplySerializer(serializers.ModelSerializer):
             "flagged_by",
             "posted_at",
         ]
+        expandable_fields = {
+            "commenter": "_api._users.serializers.CustomerSerializer",
+            "comment": CommentSerializer,
+        }
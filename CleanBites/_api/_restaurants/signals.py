@@ -0,0 +1,31 @@
+from django.conf import settings
+from django.db.backends.signals import connection_created
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+from _api._restaurants.caching import bump_dataset_version
+from _api._restaurants.models import Restaurant
+
+
+@receiver(post_save, sender=Restaurant)
+def restaurant_saved(sender, instance, created, update_fields=None, **kwargs):
+    # Bulk ingest bypasses signals and bumps the version itself. Edits to
+    # columns no cached response shows (phone, email, menu...) don't bump it.
+    if created or instance.cached_fields_changed(update_fields):
+        bump_dataset_version()
+
+
+@receiver(post_delete, sender=Restaurant)
+def restaurant_deleted(sender, **kwargs):
+    bump_dataset_version()
+
+
+@receiver(connection_created)
+def set_search_threshold(sender, connection, **kwargs):
+    # Session setting read by pg_trgm's %> operator in search_filter(). Set
+    # once per connection so searches stay single, index-backed queries.
+    if connection.vendor == "postgresql":
+        with connection.cursor() as cursor:
+            cursor.execute(
+                "SELECT set_config('pg_trgm.word_similarity_threshold', %s, false)",
+                [str(settings.SEARCH_SIMILARITY_THRESHOLD)],
+            )
@@ -1,15 +1,61 @@
+import gzip
+import json
+import os
+import tempfile
+import threading
+import time
 import unittest
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+from io import StringIO
 from unittest.mock import patch, MagicMock
 import requests
+from django.core.cache import cache
+from django.core.management import call_command
 from django.test import TestCase
+from django.test.utils import CaptureQueriesContext
 from django.core.exceptions import ValidationError
-from _api._restaurants.fetch_data import NYC_DATA_URL
-from _api._restaurants.models import Restaurant, Comment, Reply
-from _api._users.models import Customer
+from _api._restaurants.facets import refresh_facets
+from _api._restaurants.fetch_data import NYC_DATA_URL, clean_record
+from _api._restaurants.views import filter_restaurants, recent_violations
+from _api._restaurants.models import (
+    Restaurant,
+    Comment,
+    Reply,
+    IngestCheckpoint,
+    GeocodeCache,
+    Inspection,
+    RestaurantFacet,
+    Violation,
+    DatasetVersion,
+)
+from _api._users.models import Customer, Moderator
 from django.contrib.gis.geos import Point
 from rest_framework.test import APIClient, APITestCase
 from rest_framework import status
 from django.urls import reverse
+from django.db import connection
+from django.db.models import F
+from django.utils import timezone
+from geopy.exc import GeocoderTimedOut
+
+
+def make_restaurant(**fields):
+    """Create a Restaurant, with placeholders for the required fields not given."""
+    defaults = {
+        "name": "Test Restaurant",
+        "email": "test@example.com",
+        "phone": "1234567890",
+        "building": 1,
+        "street": "Main St",
+        "zipcode": "10001",
+        "hygiene_rating": 10,
+        "inspection_date": "2025-01-01",
+        "borough": 1,
+        "cuisine_description": "Pizza",
+        "violation_description": "None",
+    }
+    return Restaurant.objects.create(**{**defaults, **fields})
 
 
 class TestAPIEndpoint(TestCase):
@@ -75,6 +121,46 @@ class RestaurantModelTests(TestCase):
                 hygiene_rating=None
             )  # hygiene_rating should be required
 
+    def test_only_cached_fields_bump_the_dataset_version(self):
+        from _api._restaurants.caching import dataset_version
+
+        restaurant = Restaurant.objects.get(pk=make_restaurant().pk)
+        version = dataset_version()
+
+        restaurant.phone = "5550000000"
+        restaurant.save()
+        self.assertEqual(dataset_version(), version)
+
+        restaurant.name = "Renamed"
+        restaurant.save()
+        self.assertEqual(dataset_version(), version + 1)
+
+        # Unchanged once saved, and update_fields limits what is compared
+        restaurant.save()
+        restaurant.cuisine_description = "Thai"
+        restaurant.save(update_fields=["phone"])
+        self.assertEqual(dataset_version(), version + 1)
+
+    def test_grade_follows_score(self):
+        """The stored grade is derived from the score and re-derived on change"""
+        restaurant = make_restaurant(
+            name="Graded",
+            hygiene_rating=12,
+        )
+        self.assertEqual(restaurant.grade, "A")
+
+        restaurant = Restaurant.objects.get(pk=restaurant.pk)
+        restaurant.hygiene_rating = 30
+        restaurant.save(update_fields=["hygiene_rating"])
+        self.assertEqual(Restaurant.objects.get(pk=restaurant.pk).grade, "C")
+
+        # Saves that leave the score alone keep a grade set by ingest
+        Restaurant.objects.filter(pk=restaurant.pk).update(grade="Z")
+        restaurant = Restaurant.objects.get(pk=restaurant.pk)
+        restaurant.name = "Renamed"
+        restaurant.save()
+        self.assertEqual(Restaurant.objects.get(pk=restaurant.pk).grade, "Z")
+
     def test_comment_required_fields(self):
         """Test Comment model required fields"""
         # Create a test restaurant and customer
@@ -139,6 +225,10 @@ class RestaurantModelTests(TestCase):
             Reply.objects.create(comment=comment, replier=None)
 
 
+# The viewset's list route; reverse("restaurant-list") names the older list/
+RESTAURANTS_URL = "/api/restaurants/restaurants/"
+
+
 class RestaurantViewSetTests(APITestCase):
     def setUp(self):
         self.client = APIClient()
@@ -176,8 +266,55 @@ class RestaurantViewSetTests(APITestCase):
         self.assertGreaterEqual(len(response.data), 1)
 
 
+class RestaurantSerializerProfileTests(APITestCase):
+    """List pages stay lean; the menu has its own streaming download."""
+
+    def setUp(self):
+        self.menu = b"%PDF-1.4 " + bytes(range(256)) * 2048  # Spans chunks
+        self.restaurant = make_restaurant(
+            name="Menu Place",
+            violation_description="x" * 1000,
+            menu=self.menu,
+        )
+
+    def test_list_skips_large_columns(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(RESTAURANTS_URL)
+        row = response.data["results"][0]
+        self.assertNotIn("menu", row)
+        self.assertNotIn("violation_description", row)
+        self.assertEqual(row["violation_summary"], "x" * 200)
+        self.assertEqual(row["grade"], "A")
+        for query in queries:
+            self.assertNotIn('"menu"', query["sql"])
+
+    def test_detail_links_the_menu(self):
+        url = reverse("restaurant-detail", kwargs={"pk": self.restaurant.pk})
+        data = self.client.get(url).data
+        self.assertNotIn("menu", data)
+        self.assertEqual(data["violation_description"], "x" * 1000)
+        self.assertTrue(data["menu_url"].endswith(f"/{self.restaurant.pk}/menu/"))
+
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(menu=None)
+        self.assertIsNone(self.client.get(url).data["menu_url"])
+
+    def test_menu_is_streamed_in_chunks(self):
+        url = reverse("restaurant-menu", kwargs={"pk": self.restaurant.pk})
+        response = self.client.get(url)
+        self.assertTrue(response.streaming)
+        self.assertEqual(response["Content-Type"], "application/pdf")
+        self.assertEqual(int(response["Content-Length"]), len(self.menu))
+        self.assertEqual(b"".join(response.streaming_content), self.menu)
+
+    def test_missing_menu_is_404(self):
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(menu=None)
+        url = reverse("restaurant-menu", kwargs={"pk": self.restaurant.pk})
+        self.assertEqual(self.client.get(url).status_code, 404)
+
+
 class RestaurantGeoJSONViewTests(APITestCase):
     def setUp(self):
+        cache.clear()  # Cached responses outlive each test's rolled-back data
         self.restaurant1 = Restaurant.objects.create(
             name="Test Restaurant A",
             email="testa@example.com",
@@ -207,35 +344,154 @@ class RestaurantGeoJSONViewTests(APITestCase):
             geo_coords=Point(-73.965, 40.79),
         )
 
+    def geojson(self, response):
+        """Decode a GeoJSON response, which is streamed unless clustered."""
+        if response.streaming:
+            return json.loads(b"".join(response.streaming_content))
+        return response.json()
+
     def test_geojson_basic(self):
         url = reverse("restaurant-geojson")
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.json()["features"]), 1)  # Changed to >= 1
+        self.assertTrue(response.streaming)
+        self.assertGreaterEqual(
+            len(self.geojson(response)["features"]), 1
+        )  # Changed to >= 1
 
     def test_geojson_filter_by_name(self):
         url = reverse("restaurant-geojson") + "?name=A"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.json()["features"]), 1)  # Changed to >= 1
+        self.assertGreaterEqual(
+            len(self.geojson(response)["features"]), 1
+        )  # Changed to >= 1
 
     def test_geojson_filter_by_rating(self):
         url = reverse("restaurant-geojson") + "?rating=A"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.json()["features"]), 1)  # Changed to >= 1
+        self.assertGreaterEqual(
+            len(self.geojson(response)["features"]), 1
+        )  # Changed to >= 1
 
     def test_geojson_filter_by_cuisine(self):
         url = reverse("restaurant-geojson") + "?cuisine=American"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.json()["features"]), 1)  # Changed to >= 1
+        self.assertGreaterEqual(
+            len(self.geojson(response)["features"]), 1
+        )  # Changed to >= 1
 
     def test_geojson_filter_by_distance(self):
         url = reverse("restaurant-geojson") + "?lat=40.78&lng=-73.966&distance=1"
         response = self.client.get(url)
         self.assertEqual(response.status_code, status.HTTP_200_OK)
-        self.assertGreaterEqual(len(response.json()["features"]), 1)  # Changed to >= 1
+        self.assertGreaterEqual(
+            len(self.geojson(response)["features"]), 1
+        )  # Changed to >= 1
+
+    def test_geojson_filter_by_bbox(self):
+        url = (
+            reverse("restaurant-geojson") + "?bbox=-73.97,40.775,-73.96,40.785&zoom=15"
+        )
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        data = self.geojson(response)
+        self.assertEqual(
+            [f["properties"]["id"] for f in data["features"]], [self.restaurant1.id]
+        )
+        # The bbox is snapped outwards to the cluster grid
+        minx, miny, maxx, maxy = data["bbox"]
+        self.assertTrue(minx <= -73.97 and miny <= 40.775)
+        self.assertTrue(maxx >= -73.96 and maxy >= 40.785)
+        self.assertEqual(data["zoom"], 15)
+        self.assertFalse(data["truncated"])
+
+    def test_geojson_ignores_malformed_bbox(self):
+        url = reverse("restaurant-geojson") + "?bbox=-73.9,40.7,oops&zoom=99"
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self.geojson(response)["features"]), 2)
+        self.assertNotIn("zoom", self.geojson(response))
+
+    def test_geojson_clusters_at_low_zoom(self):
+        cache.clear()
+        url = reverse("restaurant-geojson") + "?bbox=-74.1,40.6,-73.8,40.9&zoom=6"
+        data = self.geojson(self.client.get(url))
+
+        self.assertTrue(data["clustered"])
+        self.assertEqual(len(data["features"]), 1)
+        cluster = data["features"][0]["properties"]
+        self.assertEqual(cluster["count"], 2)
+        self.assertEqual(cluster["grades"], {"A": 1, "B": 1, "C": 0})
+
+        # The tile is cached, so the same view only reads the dataset version
+        with self.assertNumQueries(1):
+            self.assertEqual(self.geojson(self.client.get(url)), data)
+
+        # Filters get their own cache entries
+        filtered = self.geojson(self.client.get(url + "&rating=A"))
+        self.assertEqual(filtered["features"][0]["properties"]["count"], 1)
+
+    def test_geojson_clusters_only_inside_nyc(self):
+        # The whole world at zoom 14 is clamped to the city's few hundred tiles
+        url = reverse("restaurant-geojson") + "?bbox=-180,-90,180,90&zoom=14"
+        data = self.geojson(self.client.get(url))
+        self.assertTrue(data["clustered"])
+        self.assertEqual(sum(f["properties"]["count"] for f in data["features"]), 2)
+
+        url = reverse("restaurant-geojson") + "?bbox=2.2,48.8,2.4,48.9&zoom=10"
+        self.assertEqual(self.geojson(self.client.get(url))["features"], [])
+
+    def test_geojson_refuses_too_many_cluster_tiles(self):
+        url = reverse("restaurant-geojson") + "?bbox=-74.1,40.6,-73.8,40.9&zoom=19"
+        with self.settings(MAP_CLUSTER_MAX_ZOOM=20):
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST)
+
+    def test_geojson_returns_restaurants_at_high_zoom(self):
+        url = reverse("restaurant-geojson") + "?bbox=-74.1,40.6,-73.8,40.9&zoom=16"
+        data = self.geojson(self.client.get(url))
+        self.assertNotIn("clustered", data)
+        self.assertEqual(len(data["features"]), 2)
+
+    def test_geojson_etag_and_version(self):
+        cache.clear()
+        url = reverse("restaurant-geojson") + "?rating=A"
+        first = self.client.get(url)
+        body = self.geojson(first)
+        etag = first["ETag"]
+
+        # Revalidation is a 304 after a single read of the dataset version
+        with self.assertNumQueries(1):
+            revalidated = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(revalidated.status_code, status.HTTP_304_NOT_MODIFIED)
+
+        # Repeat loads come from the cache, gzipped if the client accepts it
+        with self.assertNumQueries(1):
+            zipped = self.client.get(url, HTTP_ACCEPT_ENCODING="gzip, br")
+        self.assertEqual(zipped["Content-Encoding"], "gzip")
+        self.assertNotEqual(zipped["ETag"], etag)
+        self.assertEqual(json.loads(gzip.decompress(zipped.content)), body)
+
+        # Saving a restaurant bumps the dataset version
+        self.restaurant2.hygiene_rating = 5
+        self.restaurant2.save()
+        changed = self.client.get(url, HTTP_IF_NONE_MATCH=etag)
+        self.assertEqual(changed.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(self.geojson(changed)["features"]), 2)
+
+        # Ingest bumps it from another process, so only the database knows
+        DatasetVersion.objects.update(version=F("version") + 1)
+        self.assertNotEqual(self.client.get(url)["ETag"], changed["ETag"])
+
+    def test_geojson_caps_feature_count(self):
+        with self.settings(GEOJSON_MAX_FEATURES=1):
+            response = self.client.get(reverse("restaurant-geojson"))
+        data = self.geojson(response)
+        self.assertEqual(len(data["features"]), 1)
+        self.assertTrue(data["truncated"])
 
 
 class CommentViewSetTests(APITestCase):
@@ -426,8 +682,10 @@ class RestaurantDataFetchingTests(TestCase):
 
         fetch_and_store_data(test_url)
 
-        # Verify mock was called with our test URL
-        mock_get.assert_called_once_with(test_url)
+        # Verify our test URL was read a page at a time
+        mock_get.assert_called_once()
+        self.assertEqual(mock_get.call_args.args, (test_url,))
+        self.assertEqual(mock_get.call_args.kwargs["params"]["$offset"], 0)
 
         # Verify restaurant was created
         restaurant = Restaurant.objects.get(id=123)
@@ -444,10 +702,180 @@ class RestaurantDataFetchingTests(TestCase):
 
         from _api._restaurants.fetch_data import fetch_and_store_data
 
-        fetch_and_store_data(test_url)  # Should handle gracefully
+        # Should handle gracefully
+        self.assertIsNone(fetch_and_store_data(test_url, retries=1))
 
         # Verify mock was called with our test URL
-        mock_get.assert_called_once_with(test_url)
+        mock_get.assert_called_once()
+        self.assertEqual(mock_get.call_args.args, (test_url,))
+        self.assertFalse(Restaurant.objects.filter(id=123).exists())
+
+    def test_store_records_batches_and_keeps_last_row(self):
+        """Repeated camis rows collapse to the last one and batches are flushed."""
+        from _api._restaurants.fetch_data import IngestStats, store_records
+
+        def row(camis, score):
+            return {
+                "camis": camis,
+                "dba": f"Restaurant {camis}",
+                "building": "1",
+                "street": "Main St",
+                "zipcode": "10001",
+                "score": score,
+                "record_date": "2025-01-01T12:00:00.000",
+                "boro": "1",
+                "longitude": "-73.9857",
+                "latitude": "40.7484",
+            }
+
+        items = [row("1", "5"), row("2", "12"), row("1", "30"), row("3", "")]
+        stats = store_records(items, IngestStats(), batch_size=2)
+
+        self.assertEqual(stats.rows, 4)
+        self.assertEqual(stats.failed, 0)
+        self.assertEqual(Restaurant.objects.count(), 3)
+        self.assertEqual(Restaurant.objects.get(id=1).hygiene_rating, 30)
+        self.assertEqual(Restaurant.objects.get(id=3).hygiene_rating, -1)
+        self.assertGreater(stats.rows_per_sec, 0)
+
+    def test_store_records_preserves_app_owned_fields(self):
+        """Ingest upserts never overwrite account or activation columns."""
+        from _api._restaurants.fetch_data import IngestStats, store_records
+
+        make_restaurant(
+            id=77,
+            username="owner",
+            name="Old Name",
+            hygiene_rating=5,
+            inspection_date="2024-01-01",
+            is_activated=False,
+        )
+        store_records(
+            [
+                {
+                    "camis": "77",
+                    "dba": "New Name",
+                    "street": "Main St",
+                    "score": "9",
+                    "record_date": "2025-01-01T12:00:00.000",
+                    "longitude": "-73.9857",
+                    "latitude": "40.7484",
+                }
+            ],
+            IngestStats(),
+        )
+
+        restaurant = Restaurant.objects.get(id=77)
+        self.assertEqual(restaurant.name, "New Name")
+        self.assertEqual(restaurant.username, "owner")
+        self.assertFalse(restaurant.is_activated)
+
+    def test_store_records_keeps_inspection_history(self):
+        """Each inspection and violation is kept; the newest one is linked."""
+        from _api._restaurants.fetch_data import IngestStats, store_records
+
+        def row(inspection_date, score, code, critical="Not Critical"):
+            return {
+                "camis": "1",
+                "dba": f"Restaurant {inspection_date}",
+                "street": "Main St",
+                "score": score,
+                "grade": "A",
+                "inspection_date": f"{inspection_date}T00:00:00.000",
+                "inspection_type": "Cycle Inspection / Initial Inspection",
+                "action": "Violations were cited in the following area(s).",
+                "violation_code": code,
+                "violation_description": f"Violation {code}",
+                "critical_flag": critical,
+                "longitude": "-73.9857",
+                "latitude": "40.7484",
+            }
+
+        items = [
+            row("2024-05-01", "12", "04L", "Critical"),
+            row("2025-01-10", "7", "10F"),
+            row("2024-05-01", "12", "08A"),
+            row("1900-01-01", "", ""),
+        ]
+        store_records(items, IngestStats())
+
+        self.assertEqual(Inspection.objects.filter(restaurant_id=1).count(), 2)
+        self.assertEqual(Violation.objects.count(), 3)
+        self.assertTrue(Violation.objects.get(code="04L").critical)
+
+        restaurant = Restaurant.objects.get(id=1)
+        self.assertEqual(
+            str(restaurant.latest_inspection.inspection_date), "2025-01-10"
+        )
+        self.assertEqual(restaurant.latest_inspection.violations.count(), 1)
+        self.assertEqual(restaurant.name, "Restaurant 2025-01-10")
+        self.assertEqual(restaurant.hygiene_rating, 7)
+        self.assertEqual(str(restaurant.inspection_date), "2025-01-10")
+
+        # Replaying the same rows changes nothing
+        stats = store_records(items, IngestStats())
+        self.assertEqual(stats.skipped, 1)
+        self.assertEqual(Violation.objects.count(), 3)
+
+    def test_store_records_stores_feed_grade(self):
+        """The feed's grade wins; rows without one fall back to the score."""
+        from _api._restaurants.fetch_data import IngestStats, store_records
+
+        def row(camis, score, grade):
+            return {
+                "camis": camis,
+                "dba": f"Restaurant {camis}",
+                "building": "1",
+                "street": "Main St",
+                "zipcode": "10001",
+                "score": score,
+                "grade": grade,
+                "record_date": "2025-01-01T12:00:00.000",
+                "boro": "1",
+                "longitude": "-73.9857",
+                "latitude": "40.7484",
+            }
+
+        items = [row("1", "20", "z"), row("2", "20", ""), row("3", "", "")]
+        store_records(items, IngestStats())
+
+        grades = dict(Restaurant.objects.values_list("id", "grade"))
+        self.assertEqual(grades, {1: "Z", 2: "B", 3: ""})
+
+    def test_store_records_maps_borough_names(self):
+        """The feed names boroughs; they are stored, and faceted, as ids."""
+        from _api._restaurants.fetch_data import IngestStats, store_records
+
+        items = [
+            {
+                "camis": camis,
+                "dba": f"Restaurant {camis}",
+                "street": "Main St",
+                "record_date": "2025-01-01T12:00:00.000",
+                "boro": boro,
+            }
+            for camis, boro in [("1", "Manhattan"), ("2", "Staten Island"), ("3", "0")]
+        ]
+        store_records(items, IngestStats())
+
+        boroughs = dict(Restaurant.objects.values_list("id", "borough"))
+        self.assertEqual(boroughs, {1: 1, 2: 5, 3: 0})
+        refresh_facets()
+        self.assertEqual(
+            sorted(RestaurantFacet.objects.values_list("borough", flat=True)), [0, 1, 5]
+        )
+
+    def test_clean_record_dates_the_inspection_not_the_extract(self):
+        from _api._restaurants.fetch_data import NOT_INSPECTED
+
+        item = {
+            "camis": "1",
+            "record_date": "2025-03-01T00:00:00.000",
+            "inspection_date": "2024-11-05T00:00:00.000",
+        }
+        self.assertEqual(str(clean_record(item)["inspection_date"]), "2024-11-05")
+        del item["inspection_date"]
+        self.assertEqual(clean_record(item)["inspection_date"], NOT_INSPECTED)
 
     def test_clean_int(self):
         """Test the clean_int utility function."""
@@ -480,3 +908,1122 @@ class RestaurantDataFetchingTests(TestCase):
         result = get_coords("123", "Main St", "Manhattan", "10001")
         self.assertEqual(result.x, -73.9857)
         self.assertEqual(result.y, 40.7484)
+
+
+class PagedFixtureHandler(BaseHTTPRequestHandler):
+    """Serves `rows` as a SODA-style dataset honouring $limit, $offset, an
+    `inspection_date > '...'` $where clause and ordering by camis."""
+
+    rows = []
+    fail_offsets = set()
+    requests_seen = []
+
+    def do_GET(self):
+        query = parse_qs(urlparse(self.path).query)
+        offset = int(query["$offset"][0])
+        limit = int(query["$limit"][0])
+        self.requests_seen.append(query)
+
+        if offset in self.fail_offsets:
+            self.send_response(500)
+            self.end_headers()
+            return
+
+        rows = self.rows
+        if "$where" in query:
+            since = query["$where"][0].split("'")[1]
+            rows = [row for row in rows if row.get("inspection_date", "") > since]
+        if "$order" in query:  # camis,:id; the sort is stable
+            rows = sorted(rows, key=lambda row: int(row["camis"]))
+
+        body = json.dumps(rows[offset : offset + limit]).encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, *args):
+        pass  # Keep test output quiet
+
+
+def fixture_row(
+    camis, score="10", record_date="2025-01-01T12:00:00.000", inspection_date=None
+):
+    row = {
+        "camis": str(camis),
+        "dba": f"Restaurant {camis}",
+        "building": "1",
+        "street": "Main St",
+        "zipcode": "10001",
+        "score": score,
+        "record_date": record_date,
+        "boro": "1",
+        "cuisine_description": "American",
+        "longitude": "-73.9857",
+        "latitude": "40.7484",
+    }
+    if inspection_date:
+        row["inspection_date"] = f"{inspection_date}T00:00:00.000"
+    return row
+
+
+class StreamingIngestTests(TestCase):
+    """Paged ingest against a local HTTP server serving fixture JSON."""
+
+    @classmethod
+    def setUpClass(cls):
+        super().setUpClass()
+        cls.server = ThreadingHTTPServer(("127.0.0.1", 0), PagedFixtureHandler)
+        cls.url = f"http://127.0.0.1:{cls.server.server_port}/resource.json"
+        threading.Thread(target=cls.server.serve_forever, daemon=True).start()
+
+    @classmethod
+    def tearDownClass(cls):
+        cls.server.shutdown()
+        cls.server.server_close()
+        super().tearDownClass()
+
+    def setUp(self):
+        PagedFixtureHandler.rows = [fixture_row(camis) for camis in range(1, 6)]
+        PagedFixtureHandler.fail_offsets = set()
+        PagedFixtureHandler.requests_seen = []
+
+    def test_pages_through_dataset(self):
+        from _api._restaurants.fetch_data import stream_and_store_data
+
+        stats = stream_and_store_data(self.url, page_size=2)
+
+        self.assertEqual(stats.rows, 5)
+        self.assertEqual(Restaurant.objects.count(), 5)
+        offsets = [q["$offset"][0] for q in PagedFixtureHandler.requests_seen]
+        self.assertEqual(offsets, ["0", "2", "4"])
+        self.assertEqual(IngestCheckpoint.objects.get(source=self.url).offset, 0)
+
+    def test_interrupted_run_resumes_from_checkpoint(self):
+        from _api._restaurants.fetch_data import stream_and_store_data
+
+        PagedFixtureHandler.fail_offsets = {4}
+        with self.assertRaises(requests.RequestException):
+            stream_and_store_data(self.url, page_size=2, retries=1)
+
+        # Restaurant 4 was held back in case its rows continued on the next page
+        self.assertEqual(Restaurant.objects.count(), 3)
+        self.assertEqual(IngestCheckpoint.objects.get(source=self.url).offset, 3)
+
+        PagedFixtureHandler.fail_offsets = set()
+        PagedFixtureHandler.requests_seen = []
+        stats = stream_and_store_data(self.url, page_size=2, retries=1)
+
+        self.assertEqual(stats.rows, 2)
+        self.assertEqual(Restaurant.objects.count(), 5)
+        offsets = [q["$offset"][0] for q in PagedFixtureHandler.requests_seen]
+        self.assertEqual(offsets, ["3", "5"])
+        self.assertEqual(IngestCheckpoint.objects.get(source=self.url).offset, 0)
+
+    @patch("_api._restaurants.fetch_data.nominatim_geocode")
+    def test_command_honours_no_geocode_for_urls(self, geocoder):
+        row = fixture_row(1)
+        del row["longitude"], row["latitude"]
+        PagedFixtureHandler.rows = [row, fixture_row(2)]
+
+        out = StringIO()
+        call_command(
+            "ingest_inspections", self.url, "--no-geocode", "--page-size=2", stdout=out
+        )
+
+        self.assertIn("2 inserted", out.getvalue())
+        geocoder.assert_not_called()
+        self.assertEqual(Restaurant.objects.get(id=1).geo_coords.coords, (0.0, 0.0))
+
+    def test_restaurant_split_across_pages_is_stored_whole(self):
+        from _api._restaurants.fetch_data import stream_and_store_data
+
+        PagedFixtureHandler.rows = [
+            fixture_row(1, inspection_date="2024-06-01"),
+            fixture_row(2, "20", inspection_date="2025-01-01"),
+            # Page two: an older inspection of restaurant 2
+            fixture_row(2, "30", inspection_date="2024-01-01"),
+            fixture_row(3, inspection_date="2024-06-01"),
+        ]
+        stats = stream_and_store_data(self.url, page_size=2)
+
+        self.assertEqual(stats.written, 3)
+        restaurant = Restaurant.objects.get(id=2)
+        self.assertEqual(restaurant.hygiene_rating, 20)  # The latest inspection
+        self.assertEqual(restaurant.inspections.count(), 2)
+
+        # One fingerprint over both pages, so nothing changed the second time
+        stats = stream_and_store_data(self.url, page_size=2)
+        self.assertEqual((stats.written, stats.skipped), (0, 3))
+
+    def test_incremental_run_fetches_and_writes_only_changes(self):
+        from _api._restaurants.fetch_data import stream_and_store_data
+
+        PagedFixtureHandler.rows = [
+            fixture_row(camis, inspection_date="2024-06-01") for camis in range(1, 5)
+        ] + [fixture_row(5, inspection_date="2025-01-01")]
+        stream_and_store_data(self.url, page_size=2, incremental=True)
+        checkpoint = IngestCheckpoint.objects.get(source=self.url)
+        self.assertEqual(checkpoint.watermark, "2025-01-01T00:00:00.000")
+
+        # Every row carries the same record_date, which must not matter
+        later = "2025-02-01T12:00:00.000"
+        PagedFixtureHandler.rows = [
+            fixture_row(camis, record_date=later, inspection_date="2024-06-01")
+            for camis in range(1, 5)
+        ] + [
+            fixture_row(5, record_date=later, inspection_date="2025-01-01"),
+            # Published late, but inside the overlap window
+            fixture_row(6, record_date=later, inspection_date="2024-12-20"),
+            # A new inspection with a new score
+            fixture_row(2, "40", record_date=later, inspection_date="2025-01-15"),
+        ]
+        PagedFixtureHandler.requests_seen = []
+        stats = stream_and_store_data(self.url, page_size=2, incremental=True)
+
+        where = PagedFixtureHandler.requests_seen[0]["$where"][0]
+        self.assertEqual(where, "inspection_date > '2024-12-02T00:00:00.000'")
+        self.assertEqual(stats.rows, 3)
+        # Restaurant 5 is re-read by the overlap. With only part of each
+        # restaurant's rows, fingerprints are neither compared nor stored.
+        self.assertEqual((stats.written, stats.skipped), (3, 0))
+        self.assertEqual(Restaurant.objects.get(id=2).hygiene_rating, 40)
+        self.assertEqual(Restaurant.objects.count(), 6)
+        self.assertIsNone(Restaurant.objects.get(id=6).source_hash)
+        checkpoint.refresh_from_db()
+        self.assertEqual(checkpoint.watermark, "2025-01-15T00:00:00.000")
+
+        # So the next full run still skips restaurants the window left as
+        # they were, and rewrites the ones it changed
+        stats = stream_and_store_data(self.url, page_size=2)
+        self.assertEqual((stats.written, stats.skipped), (2, 4))
+
+    def test_unchanged_rows_are_not_rewritten(self):
+        from _api._restaurants.fetch_data import stream_and_store_data
+
+        first = stream_and_store_data(self.url, page_size=2)
+        self.assertEqual(first.written, 5)
+        self.assertFalse(Restaurant.objects.filter(source_hash__isnull=True).exists())
+
+        # Local edits survive a refresh whose source rows did not change
+        Restaurant.objects.filter(id=2).update(name="Edited Locally")
+        PagedFixtureHandler.rows[0] = fixture_row(1, score="33")
+        second = stream_and_store_data(self.url, page_size=2)
+
+        self.assertEqual((second.written, second.skipped), (1, 4))
+        self.assertEqual(Restaurant.objects.get(id=1).hygiene_rating, 33)
+        self.assertEqual(Restaurant.objects.get(id=2).name, "Edited Locally")
+
+
+class StubGeocoder:
+    """Deterministic geocoder that records every address it is asked for."""
+
+    def __init__(self, location=Point(-73.9857, 40.7484)):
+        self.location = location
+        self.calls = []
+
+    def __call__(self, building, street, boro, zipcode):
+        self.calls.append((building, street, boro, zipcode))
+        return self.location
+
+
+class GeocodeCacheTests(TestCase):
+    def setUp(self):
+        from _api._restaurants.geocoding import reset_geocode_stats
+
+        reset_geocode_stats()
+
+    def test_repeat_lookups_hit_the_cache(self):
+        from _api._restaurants.fetch_data import get_coords
+        from _api._restaurants.geocoding import geocode_stats
+
+        geocoder = StubGeocoder()
+        first = get_coords("123", "Main St", "1", "10001", geocoder=geocoder)
+        second = get_coords("123", " main  st. ", "Manhattan", "10001", geocoder)
+
+        self.assertEqual(len(geocoder.calls), 1)
+        self.assertEqual(first.coords, second.coords)
+        stats = geocode_stats()
+        self.assertEqual((stats["hits"], stats["misses"]), (1, 1))
+        self.assertEqual(stats["hit_rate"], 0.5)
+        self.assertEqual(GeocodeCache.objects.get().hits, 1)
+
+    def test_negative_results_are_cached(self):
+        from _api._restaurants.fetch_data import get_coords
+
+        geocoder = StubGeocoder(location=None)
+        self.assertIsNone(get_coords("1", "Nowhere Rd", "1", "10001", geocoder))
+        self.assertIsNone(get_coords("1", "Nowhere Rd", "1", "10001", geocoder))
+        self.assertEqual(len(geocoder.calls), 1)
+
+    def test_expired_entries_are_geocoded_again(self):
+        from _api._restaurants.fetch_data import get_coords
+
+        geocoder = StubGeocoder()
+        get_coords("123", "Main St", "1", "10001", geocoder)
+        GeocodeCache.objects.update(expires_at=timezone.now())
+        get_coords("123", "Main St", "1", "10001", geocoder)
+        self.assertEqual(len(geocoder.calls), 2)
+
+    def test_timeouts_are_not_cached(self):
+        from _api._restaurants.fetch_data import get_coords
+
+        def timing_out(*address):
+            raise GeocoderTimedOut("slow")
+
+        self.assertIsNone(get_coords("123", "Main St", "1", "10001", timing_out))
+        self.assertFalse(GeocodeCache.objects.exists())
+
+
+class GeocodingStageTests(TestCase):
+    """The concurrent geocoding stage that runs after rows are stored."""
+
+    def row_without_coords(self, camis, street):
+        row = fixture_row(camis)
+        del row["longitude"], row["latitude"]
+        row["street"] = street
+        return row
+
+    def test_rows_without_coords_are_geocoded_after_storing(self):
+        from _api._restaurants.fetch_data import (
+            IngestStats,
+            geocode_restaurants,
+            store_records,
+        )
+
+        items = [
+            self.row_without_coords(1, "Main St"),
+            self.row_without_coords(2, "Main St"),  # Same address as camis 1
+            self.row_without_coords(3, "Broadway"),
+            fixture_row(4),
+        ]
+        stats = store_records(items, IngestStats())
+        self.assertEqual(Restaurant.objects.count(), 4)
+        self.assertEqual(sorted(stats.geocode_queue), [1, 2, 3])
+
+        geocoder = StubGeocoder(location=Point(-73.99, 40.73))
+        geocode_restaurants(stats, geocoder=geocoder, workers=3, rate=None)
+
+        self.assertEqual(len(geocoder.calls), 2)  # One call per distinct address
+        self.assertEqual(stats.geocoded, 3)
+        self.assertEqual(stats.geocode_queue, {})
+        for restaurant in Restaurant.objects.filter(id__in=[1, 2, 3]):
+            self.assertEqual(restaurant.geo_coords.coords, (-73.99, 40.73))
+        self.assertEqual(GeocodeCache.objects.count(), 2)
+
+    def test_unchanged_rows_stay_queued_until_located(self):
+        from _api._restaurants.fetch_data import (
+            IngestStats,
+            geocode_restaurants,
+            store_records,
+        )
+        from geopy.exc import GeocoderUnavailable
+
+        def unavailable(building, street, boro, zipcode):
+            raise GeocoderUnavailable("Nominatim is down")  # Not cached
+
+        items = [self.row_without_coords(1, "Main St")]
+        stats = store_records(items, IngestStats())
+        geocode_restaurants(stats, geocoder=unavailable, workers=1, rate=None)
+        self.assertEqual(Restaurant.objects.get(id=1).geo_coords.coords, (0.0, 0.0))
+
+        # The feed row did not change, but the restaurant still has no position
+        stats = store_records(items, IngestStats())
+        self.assertEqual((stats.skipped, list(stats.geocode_queue)), (1, [1]))
+        geocode_restaurants(stats, geocoder=StubGeocoder(), workers=1, rate=None)
+        self.assertEqual(
+            Restaurant.objects.get(id=1).geo_coords.coords, (-73.9857, 40.7484)
+        )
+
+        stats = store_records(items, IngestStats())
+        self.assertEqual((stats.skipped, stats.geocode_queue), (1, {}))
+
+    def test_command_geocodes_flagged_restaurants(self):
+        from _api._restaurants.fetch_data import IngestStats, store_records
+
+        store_records([fixture_row(1), fixture_row(2)], IngestStats())
+        Restaurant.objects.filter(id=1).update(needs_geocoding=True)
+        Restaurant.objects.filter(id=2).update(
+            street="Nowhere Rd", needs_geocoding=True
+        )
+
+        def geocoder(building, street, boro, zipcode):
+            return Point(-73.99, 40.73) if street != "Nowhere Rd" else None
+
+        out = StringIO()
+        with patch("_api._restaurants.fetch_data.nominatim_geocode", geocoder):
+            call_command("geocode_restaurants", stdout=out)
+
+        self.assertIn("Geocoded 1 restaurants, 1 still pending", out.getvalue())
+        self.assertEqual(
+            Restaurant.objects.get(id=1).geo_coords.coords, (-73.99, 40.73)
+        )
+        self.assertEqual(
+            list(Restaurant.objects.filter(needs_geocoding=True).values_list("id")),
+            [(2,)],
+        )
+
+    def test_timeouts_are_retried(self):
+        from _api._restaurants.geocoding import geocode_addresses, normalize_address
+
+        attempts = []
+
+        def flaky(*address):
+            attempts.append(address)
+            if len(attempts) == 1:
+                raise GeocoderTimedOut("slow")
+            return Point(-73.99, 40.73)
+
+        address = ("1", "Main St", "1", "10001")
+        locations = geocode_addresses([address], flaky, retries=2, backoff=0)
+
+        self.assertEqual(len(attempts), 2)
+        self.assertEqual(locations[normalize_address(*address)].coords, (-73.99, 40.73))
+
+    def test_token_bucket_limits_rate(self):
+        from _api._restaurants.geocoding import TokenBucket
+
+        bucket = TokenBucket(rate=20)
+        started = time.monotonic()
+        for _ in range(3):
+            bucket.acquire()
+        # The first token is free, the next two each wait 1/20s
+        self.assertGreaterEqual(time.monotonic() - started, 0.09)
+
+
+class AddressIndexTests(TestCase):
+    """Offline lookups from a PLUTO-style CSV, with the geocoder as fallback."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+        self.csv_path = os.path.join(self.tmpdir.name, "pluto.csv")
+        with open(self.csv_path, "w") as f:
+            f.write(
+                "Address,Borough,ZipCode,Latitude,Longitude\n"
+                "123 MAIN STREET,MN,10001,40.75,-73.99\n"
+                "9 BROADWAY,BK,11211,40.71,-73.96\n"
+            )
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def test_lookup_matches_normalized_addresses(self):
+        from _api._restaurants.address_index import AddressIndex
+
+        index = AddressIndex.open(self.csv_path)
+
+        self.assertEqual(len(index), 2)
+        point = index.lookup("123", "Main Street", "1", "10001")
+        self.assertEqual(point.coords, (-73.99, 40.75))
+        self.assertIsNone(index.lookup("124", "Main Street", "1", "10001"))
+        self.assertTrue(os.path.exists(self.csv_path[:-4] + ".keys.npy"))
+
+    def test_get_coords_uses_index_before_geocoder(self):
+        from _api._restaurants.fetch_data import get_coords
+
+        geocoder = StubGeocoder()
+        with self.settings(GEOCODE_INDEX_PATH=self.csv_path):
+            hit = get_coords("9", "BROADWAY", "Brooklyn", "11211", geocoder)
+            miss = get_coords("1", "Elsewhere Ave", "1", "10001", geocoder)
+
+        self.assertEqual(hit.coords, (-73.96, 40.71))
+        self.assertIsNotNone(miss)
+        self.assertEqual(geocoder.calls, [("1", "Elsewhere Ave", "1", "10001")])
+
+
+class IngestCommandTests(TestCase):
+    """manage.py ingest_inspections against local snapshot files."""
+
+    def setUp(self):
+        self.tmpdir = tempfile.TemporaryDirectory()
+
+    def tearDown(self):
+        self.tmpdir.cleanup()
+
+    def write(self, name, text):
+        path = os.path.join(self.tmpdir.name, name)
+        with open(path, "w") as f:
+            f.write(text)
+        return path
+
+    def ingest(self, path):
+        out = StringIO()
+        call_command("ingest_inspections", path, "--no-geocode", stdout=out)
+        return out.getvalue()
+
+    def test_json_and_jsonl_snapshots(self):
+        rows = [fixture_row(camis) for camis in range(1, 4)]
+        json_path = self.write("snapshot.json", json.dumps(rows, indent=2))
+        out = self.ingest(json_path)
+        self.assertIn("3 inserted, 0 updated, 0 unchanged, 0 failed", out)
+
+        rows[0]["score"] = "40"
+        jsonl_path = self.write(
+            "snapshot.jsonl", "\n".join(json.dumps(row) for row in rows)
+        )
+        out = self.ingest(jsonl_path)
+        self.assertIn("0 inserted, 1 updated, 2 unchanged, 0 failed", out)
+        self.assertEqual(Restaurant.objects.get(id=1).hygiene_rating, 40)
+
+    def test_snapshot_with_interleaved_camis_is_stored_whole(self):
+        from _api._restaurants.fetch_data import IngestStats, store_records
+
+        rows = [
+            fixture_row(1, "20", inspection_date="2025-01-01"),
+            fixture_row(2, inspection_date="2024-06-01"),
+            # Restaurant 1 again, past a batch boundary: an older inspection
+            fixture_row(1, "30", inspection_date="2024-01-01"),
+        ]
+        rows[2]["violation_code"] = "04L"
+
+        # Unsorted rows would store restaurant 1 from a partial group
+        with self.assertRaises(ValueError):
+            store_records(rows, IngestStats(), batch_size=1)
+
+        path = self.write("snapshot.json", json.dumps(rows))
+        out = StringIO()
+        call_command(
+            "ingest_inspections", path, "--no-geocode", "--batch-size=1", stdout=out
+        )
+        self.assertIn("1 inserted, 1 updated, 0 unchanged, 0 failed", out.getvalue())
+        restaurant = Restaurant.objects.get(id=1)
+        self.assertEqual(restaurant.hygiene_rating, 20)  # The latest inspection
+        self.assertEqual(restaurant.inspections.count(), 2)
+
+        # The fingerprint covers both rows, so a rerun changes nothing
+        out = StringIO()
+        call_command(
+            "ingest_inspections", path, "--no-geocode", "--batch-size=1", stdout=out
+        )
+        self.assertIn("0 inserted, 0 updated, 2 unchanged", out.getvalue())
+
+    def test_sort_by_camis_spills_long_inputs(self):
+        from _api._restaurants.fetch_data import sort_by_camis
+
+        rows = [
+            {"camis": str(camis), "n": n} for n, camis in enumerate([3, 1, 2, 1, 3])
+        ]
+        ordered = list(sort_by_camis(rows, run_size=2))
+        self.assertEqual(
+            [(row["camis"], row["n"]) for row in ordered],
+            [("1", 1), ("1", 3), ("2", 2), ("3", 0), ("3", 4)],
+        )
+
+    def test_csv_snapshot(self):
+        path = self.write(
+            "snapshot.csv",
+            "CAMIS,DBA,BORO,BUILDING,STREET,ZIPCODE,SCORE,INSPECTION DATE,"
+            "RECORD DATE,VIOLATION CODE,Latitude,Longitude\n"
+            "5,Corner Cafe,Manhattan,1,Main St,10001,12,01/10/2025,"
+            "02/01/2025,10F,40.7484,-73.9857\n",
+        )
+        out = self.ingest(path)
+
+        self.assertIn("1 inserted", out)
+        restaurant = Restaurant.objects.get(id=5)
+        self.assertEqual(restaurant.name, "Corner Cafe")
+        # The inspection's date, not the extract's RECORD DATE
+        self.assertEqual(str(restaurant.inspection_date), "2025-01-10")
+        self.assertEqual(
+            str(restaurant.latest_inspection.inspection_date), "2025-01-10"
+        )
+
+    def test_json_rows_are_decoded_incrementally(self):
+        from _api._restaurants.fetch_data import iter_json_rows
+
+        rows = [{"camis": str(i), "dba": "A [b], {c}"} for i in range(20)]
+        self.assertEqual(list(iter_json_rows(StringIO(json.dumps(rows)), 7)), rows)
+        with self.assertRaises(json.JSONDecodeError):
+            list(iter_json_rows(StringIO(json.dumps(rows)[:-10]), 7))
+
+    def test_shard_by_needs_several_workers(self):
+        from django.core.management.base import CommandError
+
+        path = self.write("snapshot.json", json.dumps([fixture_row(1)]))
+        with self.assertRaises(CommandError):
+            call_command("ingest_inspections", path, "--shard-by=boro")
+
+    def test_missing_file_is_an_error(self):
+        from django.core.management.base import CommandError
+
+        with self.assertRaises(CommandError):
+            self.ingest(os.path.join(self.tmpdir.name, "missing.json"))
+
+
+class SyntheticDataCommandTests(TestCase):
+    """manage.py generate_synthetic_data at a tiny scale."""
+
+    def generate(self, *args):
+        call_command(
+            "generate_synthetic_data", "--scale", "0.001", *args, stdout=StringIO()
+        )
+        return list(Restaurant.objects.order_by("id").values_list("name", "geo_coords"))
+
+    def test_generates_reproducible_data_inside_nyc(self):
+        from _api._users.models import DM
+
+        first = self.generate("--seed", "7")
+
+        self.assertEqual(len(first), 30)
+        self.assertEqual(Customer.objects.count(), 100)
+        self.assertEqual(DM.objects.count(), 2000)
+        self.assertEqual(Comment.objects.count(), 1000)
+        self.assertFalse(DM.objects.filter(sender=F("receiver")).exists())
+        for _, point in first:
+            self.assertTrue(-74.3 < point.x < -73.7 and 40.5 < point.y < 40.92)
+        self.assertFalse(
+            Restaurant.objects.filter(latest_inspection__isnull=True).exists()
+        )
+
+        # Karma matches the votes cast
+        comment = Comment.objects.order_by("-karma").first()
+        self.assertEqual(comment.karma, comment.k_voters.count())
+
+        # Same seed, same data; --clear replaces rather than duplicates
+        self.assertEqual(self.generate("--seed", "7", "--clear"), first)
+        self.assertNotEqual(self.generate("--seed", "8", "--clear"), first)
+        self.assertEqual(Customer.objects.count(), 100)
+
+
+class RestaurantTileViewTests(APITestCase):
+    """Vector tiles built by PostGIS and cached until restaurant data changes."""
+
+    def setUp(self):
+        cache.clear()
+        self.restaurant = make_restaurant(
+            name="Tile Diner",
+            cuisine_description="American",
+            geo_coords=Point(-73.966, 40.78),
+        )
+
+    def tile_url(self, z, x, y):
+        return reverse("restaurant-tile", kwargs={"z": z, "x": x, "y": y})
+
+    def test_tile_contains_restaurants_and_is_cached(self):
+        from _api._restaurants.tiles import lonlat_to_tile
+
+        x, y = lonlat_to_tile(-73.966, 40.78, 12)
+        response = self.client.get(self.tile_url(12, x, y))
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/vnd.mapbox-vector-tile")
+        self.assertIn(b"Tile Diner", response.content)
+
+        with self.assertNumQueries(1):  # The dataset version
+            self.assertEqual(
+                self.client.get(self.tile_url(12, x, y)).content, response.content
+            )
+
+        # A tile elsewhere is empty
+        empty = self.client.get(self.tile_url(12, 0, 0))
+        self.assertEqual(empty.content, b"")
+
+    def test_ingest_invalidates_old_and_new_tiles(self):
+        from _api._restaurants.fetch_data import IngestStats, store_records
+        from _api._restaurants.tiles import lonlat_to_tile
+
+        old = lonlat_to_tile(-73.966, 40.78, 14)
+        new = lonlat_to_tile(-73.90, 40.70, 14)
+        self.assertIn(b"Tile Diner", self.client.get(self.tile_url(14, *old)).content)
+        self.assertEqual(self.client.get(self.tile_url(14, *new)).content, b"")
+
+        store_records(
+            [
+                {
+                    "camis": str(self.restaurant.id),
+                    "dba": "Tile Diner",
+                    "street": "Main St",
+                    "longitude": "-73.90",
+                    "latitude": "40.70",
+                }
+            ],
+            IngestStats(),
+        )
+
+        # Ingest may run in another process; the new version reaches every one
+        self.assertEqual(self.client.get(self.tile_url(14, *old)).content, b"")
+        self.assertIn(b"Tile Diner", self.client.get(self.tile_url(14, *new)).content)
+
+    def test_out_of_range_tile_is_404(self):
+        self.assertEqual(self.client.get(self.tile_url(3, 8, 0)).status_code, 404)
+        self.assertEqual(self.client.get(self.tile_url(30, 0, 0)).status_code, 404)
+
+
+class RestaurantNearestViewTests(APITestCase):
+    """Nearest-N search ordered by the PostGIS KNN operator."""
+
+    def setUp(self):
+        for i, (lng, rating) in enumerate([(-73.99, 30), (-73.98, 10), (-73.95, 5)]):
+            make_restaurant(
+                id=900 + i,
+                name=f"Nearby {i}",
+                hygiene_rating=rating,
+                geo_coords=Point(lng, 40.75),
+            )
+
+    def nearest(self, query):
+        return self.client.get(reverse("restaurant-nearest") + query)
+
+    def test_results_are_ordered_by_distance(self):
+        response = self.nearest("?lat=40.75&lng=-74.0&limit=2")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+
+        features = response.json()["features"]
+        self.assertEqual([f["properties"]["id"] for f in features], [900, 901])
+        distances = [f["properties"]["distance_m"] for f in features]
+        self.assertAlmostEqual(distances[0], 843, delta=10)  # 0.01° of longitude
+        self.assertLess(distances[0], distances[1])
+
+    def test_ranks_by_metres_not_degrees(self):
+        # 0.010° east is about 843 m and 0.008° north about 890 m: the eastern
+        # restaurant is nearer, though it is further away in degrees
+        make_restaurant(id=910, name="East", geo_coords=Point(-73.97, 40.70))
+        make_restaurant(id=911, name="North", geo_coords=Point(-73.98, 40.708))
+        response = self.nearest("?lat=40.70&lng=-73.98&limit=2")
+
+        features = response.json()["features"]
+        self.assertEqual([f["properties"]["id"] for f in features], [910, 911])
+        distances = [f["properties"]["distance_m"] for f in features]
+        self.assertAlmostEqual(distances[0], 843, delta=10)
+        self.assertAlmostEqual(distances[1], 890, delta=10)
+
+    def test_combines_with_map_filters(self):
+        response = self.nearest("?lat=40.75&lng=-74.0&rating=A&limit=1")
+        self.assertEqual(response.json()["features"][0]["properties"]["id"], 901)
+
+    def test_requires_coordinates(self):
+        self.assertEqual(self.nearest("?lat=40.75").status_code, 400)
+        self.assertEqual(self.nearest("?lat=x&lng=y").status_code, 400)
+
+
+class RestaurantRadiusSearchTests(TestCase):
+    """Radius searches run ST_DWithin against the geography index."""
+
+    def setUp(self):
+        # 0.01° of longitude is about 843 m at this latitude
+        for i, lng in enumerate([-74.0, -73.99, -73.98]):
+            make_restaurant(
+                id=950 + i,
+                name=f"Radius {i}",
+                geo_coords=Point(lng, 40.75),
+            )
+
+    def radius(self, distance):
+        return filter_restaurants(
+            {"lat": "40.75", "lng": "-74.0", "distance": distance}
+        )
+
+    def test_radius_is_measured_in_metres(self):
+        self.assertEqual(
+            sorted(self.radius("1").values_list("id", flat=True)), [950, 951]
+        )
+        self.assertEqual(list(self.radius("0.5").values_list("id", flat=True)), [950])
+
+    def test_radius_filter_uses_geography_index(self):
+        # A handful of rows is always cheaper to scan, so take that option
+        # away and check the planner can answer the query from the index.
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = self.radius("1").explain()
+        self.assertIn("restaurant_geo_coords_geog", plan)
+        self.assertNotIn("Seq Scan", plan)
+
+
+class RestaurantFacetsViewTests(APITestCase):
+    """Sidebar facet counts served from the RestaurantFacet table."""
+
+    def setUp(self):
+        cache.clear()
+        rows = [
+            ("Joe's Pizza", "Pizza", 1, 5, True),
+            ("Pizza Palace", "Pizza", 1, 10, True),
+            ("Lucali", "Pizza", 2, 20, True),
+            ("Thai Villa", "Thai", 2, 30, True),
+            ("Pok Pok", "Thai", 2, 5, False),  # Deactivated, never counted
+        ]
+        for i, (name, cuisine, borough, rating, active) in enumerate(rows):
+            make_restaurant(
+                id=970 + i,
+                name=name,
+                hygiene_rating=rating,
+                borough=borough,
+                cuisine_description=cuisine,
+                is_activated=active,
+            )
+        refresh_facets()
+
+    def facets(self, query=""):
+        response = self.client.get(reverse("restaurant-facets") + query)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return {
+            facet: {row["value"]: row["count"] for row in rows}
+            for facet, rows in response.json().items()
+        }
+
+    def test_refresh_aggregates_active_restaurants(self):
+        self.assertEqual(RestaurantFacet.objects.count(), 4)
+        self.assertEqual(
+            self.facets(),
+            {
+                "cuisine": {"Pizza": 3, "Thai": 1},
+                "borough": {1: 2, 2: 2},
+                "grade": {"A": 2, "B": 1, "C": 1},
+            },
+        )
+
+    def test_each_facet_ignores_its_own_filter(self):
+        facets = self.facets("?rating=A&cuisine=pizza&lat=40.7&lng=-74.0")
+        self.assertEqual(facets["cuisine"], {"Pizza": 2})
+        self.assertEqual(facets["grade"], {"A": 2, "B": 1})
+        self.assertEqual(facets["borough"], {1: 2})
+
+    def test_facets_come_from_the_aggregate_table(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.facets("?rating=A,B&cuisine=thai")
+        # The dataset version, then one query per facet
+        self.assertEqual(len(queries), 4)
+        for query in queries:
+            self.assertNotIn('"_restaurants_restaurant"', query["sql"])
+
+    def test_name_search_counts_matching_restaurants(self):
+        facets = self.facets("?name=villa")
+        self.assertEqual(facets["cuisine"], {"Thai": 1})
+        self.assertEqual(facets["grade"], {"C": 1})
+
+    def test_refresh_invalidates_cached_counts(self):
+        self.assertEqual(self.facets()["cuisine"]["Thai"], 1)
+        Restaurant.objects.filter(id=974).update(is_activated=True)
+        refresh_facets()
+        self.assertEqual(self.facets()["cuisine"]["Thai"], 2)
+
+
+class RestaurantSearchTests(APITestCase):
+    """Fuzzy search over the pg_trgm indexes."""
+
+    def setUp(self):
+        rows = [
+            ("Shake Shack", "Madison Ave", "Burgers"),
+            ("Shanghai Cafe", "Mott St", "Chinese"),
+            ("Joe's Pizza", "Carmine St", "Pizza"),
+        ]
+        for i, (name, street, cuisine) in enumerate(rows):
+            make_restaurant(
+                id=990 + i,
+                name=name,
+                street=street,
+                cuisine_description=cuisine,
+            )
+
+    def search(self, query):
+        response = self.client.get(RESTAURANTS_URL, {"search": query})
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return [row["name"] for row in response.data["results"]]
+
+    def test_typos_match_and_rank_first(self):
+        self.assertEqual(self.search("shak shack")[0], "Shake Shack")
+        self.assertNotIn("Joe's Pizza", self.search("shak shack"))
+
+    def test_substrings_and_other_fields_match(self):
+        self.assertEqual(self.search("pizz"), ["Joe's Pizza"])
+        self.assertEqual(self.search("mott"), ["Shanghai Cafe"])
+        self.assertEqual(self.search("100%"), [])
+
+    def test_explicit_ordering_overrides_rank(self):
+        Restaurant.objects.filter(name="Shanghai Cafe").update(hygiene_rating=20)
+        response = self.client.get(
+            RESTAURANTS_URL, {"search": "sha", "ordering": "-hygiene_rating"}
+        )
+        names = [row["name"] for row in response.data["results"]]
+        self.assertEqual(names, ["Shanghai Cafe", "Shake Shack"])
+
+    def test_map_name_filter_is_fuzzy(self):
+        ids = filter_restaurants({"name": "shake shak"}).values_list("id", flat=True)
+        self.assertEqual(list(ids), [990])
+
+    def test_grade_and_cuisine_filters_use_indexes(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = filter_restaurants({"rating": "A", "cuisine": "burg"}).explain()
+        self.assertIn("restaurant_cuisine_trgm", plan)
+        self.assertNotIn("Seq Scan", plan)
+        self.assertEqual(
+            list(
+                filter_restaurants({"rating": "A", "cuisine": "BURG"}).values_list(
+                    "id", flat=True
+                )
+            ),
+            [990],
+        )
+
+    def test_search_uses_trigram_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = filter_restaurants({"name": "shak shack"}).explain()
+        self.assertIn("restaurant_name_trgm", plan)
+        self.assertNotIn("Seq Scan", plan)
+
+
+class KeysetPaginationTests(APITestCase):
+    """Page numbers on the restaurant viewset, or cursors with ?cursor=."""
+
+    def setUp(self):
+        for i in range(5):
+            make_restaurant(
+                id=1010 + i,
+                name=f"Paged {i}",
+                # Two restaurants share each date, so pages split ties
+                inspection_date=f"2025-01-0{1 + i // 2}",
+            )
+
+    def pages(self, query):
+        url, ids = f"{RESTAURANTS_URL}?cursor=&{query}", []
+        while url:
+            data = self.client.get(url).json()
+            ids.append([row["id"] for row in data["results"]])
+            url = data["next"]
+        return ids
+
+    def test_pages_follow_the_cursor_without_counting(self):
+        with CaptureQueriesContext(connection) as queries:
+            pages = self.pages("limit=2")
+        self.assertEqual(pages, [[1010, 1011], [1012, 1013], [1014]])
+        self.assertFalse(any("COUNT(" in q["sql"] for q in queries))
+
+    def test_ordering_with_ties_is_stable(self):
+        pages = self.pages("limit=2&ordering=-inspection_date")
+        self.assertEqual(pages, [[1014, 1013], [1012, 1011], [1010]])
+
+    def test_page_numbers_are_the_default(self):
+        data = self.client.get(f"{RESTAURANTS_URL}?limit=2").json()
+        self.assertEqual(data["count"], 5)
+        self.assertEqual([row["id"] for row in data["results"]], [1010, 1011])
+        self.assertIn("page=2", data["next"])
+        self.assertIsNone(data["previous"])
+
+        data = self.client.get(data["next"]).json()
+        self.assertEqual([row["id"] for row in data["results"]], [1012, 1013])
+
+    def test_approximate_count_is_opt_in(self):
+        data = self.client.get(f"{RESTAURANTS_URL}?cursor=&limit=2").json()
+        self.assertNotIn("count", data)
+
+        url = f"{RESTAURANTS_URL}?cursor=&limit=2&count=approx"
+        data = self.client.get(url).json()
+        self.assertIsInstance(data["count"], int)
+        data = self.client.get(f"{url}&cuisine_description=Pizza").json()
+        self.assertGreaterEqual(data["count"], 1)  # Planner estimates are >= 1
+
+
+class SparseFieldsetTests(APITestCase):
+    """?fields=, ?exclude= and ?expand= narrow the SQL, not just the JSON."""
+
+    def setUp(self):
+        self.customer = Customer.objects.create(
+            username="sparse",
+            email="sparse@example.com",
+            first_name="Sparse",
+            last_name="User",
+        )
+        self.restaurant = make_restaurant(
+            id=1030,
+            name="Katz's Delicatessen",
+            building=205,
+            street="E Houston St",
+            zipcode="10002",
+            cuisine_description="Delicatessen",
+        )
+        for text in (b"Pastrami", b"Rye"):
+            Comment.objects.create(
+                commenter=self.customer, restaurant=self.restaurant, comment=text
+            )
+
+    def get(self, url):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        return response.json(), [q["sql"] for q in queries]
+
+    def test_fields_narrow_the_column_list(self):
+        data, queries = self.get(f"{RESTAURANTS_URL}?fields=id,name")
+        self.assertEqual(set(data["results"][0]), {"id", "name"})
+        select = next(q for q in queries if "_restaurants_restaurant" in q)
+        self.assertNotIn('"street"', select)
+        self.assertNotIn("violation_description", select)
+
+    def test_exclude_drops_fields(self):
+        url = reverse("restaurant-detail", args=[1030])
+        data, queries = self.get(f"{url}?exclude=violation_description,menu_url")
+        self.assertNotIn("violation_description", data)
+        self.assertNotIn("menu_url", data)
+        self.assertEqual(data["name"], "Katz's Delicatessen")
+        self.assertFalse(any("violation_description" in q for q in queries))
+
+    def test_expand_joins_in_one_query(self):
+        url = reverse("comment-list")
+        data, queries = self.get(f"{url}?expand=restaurant,commenter")
+        for row in data["results"]:
+            self.assertEqual(row["restaurant"]["name"], "Katz's Delicatessen")
+            self.assertEqual(row["commenter"]["username"], "sparse")
+        comment_queries = [q for q in queries if "_restaurants_comment" in q]
+        self.assertEqual(len(comment_queries), 1)
+        self.assertIn("JOIN", comment_queries[0])
+
+    def test_unknown_names_are_ignored(self):
+        url = reverse("comment-list")
+        data, _ = self.get(f"{url}?fields=id,nope&expand=karma")
+        self.assertEqual([set(row) for row in data["results"]], [{"id"}, {"id"}])
+
+
+class QueryBudgetTests(APITestCase):
+    """A keyset page of comments or replies costs the same queries at any size."""
+
+    def setUp(self):
+        restaurant = make_restaurant(
+            id=1040,
+            name="Russ & Daughters",
+            building=179,
+            street="E Houston St",
+            zipcode="10002",
+            cuisine_description="Jewish/Kosher",
+        )
+        moderator = Moderator.objects.create(email="mod@example.com", username="mod")
+        for i in range(6):
+            customer = Customer.objects.create(
+                username=f"budget{i}",
+                email=f"budget{i}@example.com",
+                first_name=f"Budget {i}",
+                last_name="User",
+            )
+            comment = Comment.objects.create(
+                commenter=customer,
+                restaurant=restaurant,
+                comment=b"Lox",
+                flagged=True,
+                flagged_by=moderator,  # A generic relation, prefetched per page
+            )
+            Reply.objects.create(commenter=customer, comment=comment, reply=b"Bagels")
+
+    def page_queries(self, url, limit):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(f"{url}?cursor=&limit={limit}")
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(len(response.json()["results"]), limit)
+        return len(queries)
+
+    def assertQueryBudget(self, url, budget):
+        self.client.get(url)  # Warm the content type cache
+        small, large = self.page_queries(url, 1), self.page_queries(url, 6)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, budget)
+
+    def test_comment_pages(self):
+        self.assertQueryBudget(reverse("comment-list"), 2)  # Page, moderators
+
+    def test_reply_pages(self):
+        self.assertQueryBudget(reverse("reply-list"), 1)
+
+    def test_expanded_reply_pages(self):
+        url = reverse("reply-list") + "?expand=comment,commenter"
+        self.client.get(url)
+        with CaptureQueriesContext(connection) as small:
+            self.client.get(f"{url}&cursor=&limit=1")
+        with CaptureQueriesContext(connection) as large:
+            self.client.get(f"{url}&cursor=&limit=6")
+        # Page, comment moderators, blocked customers of the commenters
+        self.assertEqual(len(small), len(large))
+        self.assertLessEqual(len(large), 3)
+
+
+class RecentViolationsViewTests(APITestCase):
+    """The home page's recent violations feed."""
+
+    def setUp(self):
+        cache.clear()
+        # Stored the way ingest stores feed rows; None leaves the violation
+        # column out of the row
+        rows = [
+            ("Peter Luger", "2025-03-01", "Evidence of mice.", True),
+            ("Di Fara", "2025-02-01", "Food not held hot.", True),
+            ("Old Shop", "2025-04-01", "Closed by order.", False),  # Deactivated
+            ("Clean Slate", "2025-05-01", None, True),  # Nothing to show
+            ("Blank Slate", "2025-05-02", "", True),  # Nor here
+            ("Lombardi's", "2025-01-01", "Wiping cloths.", True),
+        ]
+        for i, (name, date, violation, active) in enumerate(rows):
+            item = {
+                "camis": str(1050 + i),
+                "dba": name,
+                "score": "20",
+                "inspection_date": f"{date}T00:00:00.000",
+            }
+            if violation is not None:
+                item["violation_description"] = violation
+            Restaurant.objects.create(**clean_record(item), is_activated=active)
+        self.url = reverse("restaurant-recent-violations")
+
+    def test_newest_active_violations_first(self):
+        response = self.client.get(self.url)
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        results = response.json()["results"]
+        self.assertEqual(
+            [row["name"] for row in results], ["Peter Luger", "Di Fara", "Lombardi's"]
+        )
+        self.assertEqual(
+            set(results[0]),
+            {"id", "name", "hygiene_rating", "grade", "inspection_date"}
+            | {"violation_summary"},
+        )
+        self.assertEqual(results[0]["inspection_date"], "2025-03-01")
+        self.assertEqual(results[0]["violation_summary"], "Evidence of mice.")
+
+    def test_feed_follows_inspection_dates_within_one_extract(self):
+        from _api._restaurants.fetch_data import IngestStats, store_records
+
+        Restaurant.objects.all().delete()
+        cache.clear()
+        # One pull: every row has the same record_date, and camis order is
+        # not inspection order
+        items = [
+            {
+                "camis": camis,
+                "dba": f"Restaurant {camis}",
+                "street": "Main St",
+                "record_date": "2025-06-01T00:00:00.000",
+                "inspection_date": f"{inspected}T00:00:00.000",
+                "violation_code": "04L",
+                "violation_description": "Evidence of mice.",
+                "longitude": "-73.9857",
+                "latitude": "40.7484",
+            }
+            for camis, inspected in [
+                ("1", "2025-02-01"),
+                ("2", "2025-05-01"),
+                ("3", "2025-01-01"),
+            ]
+        ]
+        store_records(items, IngestStats())
+
+        results = self.client.get(self.url).json()["results"]
+        self.assertEqual([row["id"] for row in results], [2, 1, 3])
+        self.assertEqual(results[0]["inspection_date"], "2025-05-01")
+
+    def test_feed_is_cached(self):
+        self.client.get(self.url)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(self.url)
+        self.assertEqual(len(queries), 1)  # The dataset version
+        self.assertIn("max-age", response["Cache-Control"])
+
+        restaurant = Restaurant.objects.get(pk=1051)
+        restaurant.inspection_date = "2025-06-01"
+        restaurant.save()  # Invalidates the cached feed
+        names = [row["name"] for row in self.client.get(self.url).json()["results"]]
+        self.assertEqual(names[0], "Di Fara")
+
+    def test_feed_reads_the_recent_index(self):
+        with connection.cursor() as cursor:
+            cursor.execute("SET LOCAL enable_seqscan = off")
+        plan = recent_violations(limit=2).explain()
+        self.assertIn("restaurant_active_recent", plan)
+        self.assertNotIn("Sort", plan)
@@ -0,0 +1,68 @@
+import math
+from django.conf import settings
+from django.core.cache import cache
+from django.db import connection
+from _api._restaurants.caching import dataset_version
+from _api._restaurants.models import Restaurant
+
+# Tile extent and clipping buffer, in tile pixels, as ST_AsMVTGeom expects
+TILE_EXTENT = 4096
+TILE_BUFFER = 64
+TILE_LAYER = "restaurants"
+
+
+def tile_cache_key(z, x, y):
+    # Keyed on the dataset version, so any change to restaurant data (from
+    # ingest, a profile edit or the admin) retires every cached tile
+    return f"mvt:v{dataset_version()}:{z}:{x}:{y}"
+
+
+def lonlat_to_tile(lon, lat, z):
+    """The Web Mercator (XYZ) tile containing a lon/lat point at zoom `z`."""
+    n = 2**z
+    lat = max(min(lat, 85.0511), -85.0511)  # Mercator's usable latitude range
+    x = int((lon + 180.0) / 360.0 * n)
+    y = int((1.0 - math.asinh(math.tan(math.radians(lat))) / math.pi) / 2.0 * n)
+    return min(max(x, 0), n - 1), min(max(y, 0), n - 1)
+
+
+def render_tile(z, x, y):
+    """
+    Build the Mapbox Vector Tile for tile z/x/y with ST_AsMVT. Each active
+    restaurant is a point feature carrying its id, name, hygiene_rating and
+    cuisine. Returns the tile bytes (empty when no restaurant is in it).
+    """
+    table = connection.ops.quote_name(Restaurant._meta.db_table)
+    sql = f"""
+        WITH bounds AS (SELECT ST_TileEnvelope(%s, %s, %s) AS geom)
+        SELECT ST_AsMVT(features, %s, %s, 'geom')
+        FROM (
+            SELECT
+                ST_AsMVTGeom(
+                    ST_Transform(r.geo_coords, 3857), bounds.geom, %s, %s, true
+                ) AS geom,
+                r.id,
+                r.name,
+                r.hygiene_rating,
+                r.cuisine_description AS cuisine
+            FROM {table} r, bounds
+            WHERE r.is_activated
+              AND r.geo_coords && ST_Transform(bounds.geom, 4326)
+        ) AS features
+    """
+    with connection.cursor() as cursor:
+        cursor.execute(
+            sql, [z, x, y, TILE_LAYER, TILE_EXTENT, TILE_EXTENT, TILE_BUFFER]
+        )
+        tile = cursor.fetchone()[0]
+    return bytes(tile or b"")
+
+
+def get_tile(z, x, y):
+    """The cached tile z/x/y, rendering and caching it on a miss."""
+    key = tile_cache_key(z, x, y)
+    tile = cache.get(key)
+    if tile is None:
+        tile = render_tile(z, x, y)
+        cache.set(key, tile, settings.MAP_TILE_CACHE_SECONDS)
+    return tile
@@ -5,6 +5,10 @@ from .views import (
     RestaurantListView,
     RestaurantAddressListView,
     RestaurantGeoJSONView,
+    RestaurantNearestView,
+    RestaurantFacetsView,
+    RestaurantRecentViolationsView,
+    RestaurantTileView,
     DynamicNYCMapView,
     CommentViewSet,
     ReplyViewSet,
@@ -22,5 +26,17 @@ urlpatterns = [
         "addresses/", RestaurantAddressListView.as_view(), name="restaurant-addresses"
     ),
     path("geojson/", RestaurantGeoJSONView.as_view(), name="restaurant-geojson"),
+    path("nearest/", RestaurantNearestView.as_view(), name="restaurant-nearest"),
+    path("facets/", RestaurantFacetsView.as_view(), name="restaurant-facets"),
+    path(
+        "recent-violations/",
+        RestaurantRecentViolationsView.as_view(),
+        name="restaurant-recent-violations",
+    ),
+    path(
+        "tiles/<int:z>/<int:x>/<int:y>.mvt",
+        RestaurantTileView.as_view(),
+        name="restaurant-tile",
+    ),
     path("dynamic/", DynamicNYCMapView.as_view(), name="restaurant-dynamic-map"),
 ]
@@ -1,47 +1,228 @@
+import itertools
+import json
+import math
+from asgiref.sync import sync_to_async
 from django.shortcuts import render
 from rest_framework import viewsets, generics, filters
 from .serializers import (
     RestaurantSerializer,
+    RestaurantListSerializer,
+    RestaurantDetailSerializer,
+    model_columns,
     RestaurantAddressSerializer,
     CommentSerializer,
     ReplySerializer,
 )
-from .models import Restaurant, Comment, Reply
+from .models import GRADES, Restaurant, RestaurantFacet, Comment, Reply
 from django_filters.rest_framework import DjangoFilterBackend
+from _api.mixins import SparseQuerysetMixin
+from _api.pagination import PageOrKeysetPagination
+from rest_framework.decorators import action
 from rest_framework.response import Response
 from rest_framework.views import APIView
-from django.http import HttpResponse
+from django.core.handlers.asgi import ASGIRequest
+from django.http import (
+    Http404,
+    HttpResponse,
+    HttpResponseNotModified,
+    StreamingHttpResponse,
+)
 from django.views import View
 from django.conf import settings
 from django.http import JsonResponse
-from django.contrib.gis.geos import Point
+from django.contrib.gis.geos import Point, Polygon
 from django.contrib.gis.measure import D
-from django.db.models import Q
+from django.db.models import (
+    BinaryField,
+    BooleanField,
+    Count,
+    ExpressionWrapper,
+    FloatField,
+    Func,
+    IntegerField,
+    Q,
+    Sum,
+)
+from django.db.models.functions import Left, Substr
+from django.contrib.gis.db.models import Collect
+from django.contrib.gis.db.models.functions import (
+    Centroid,
+    SnapToGrid,
+)
+from django.core.cache import cache
+from .functions import DWithin, GeographyDistance
+from .search import TrigramSearchFilter, contains, search_filter
+from .caching import (
+    accepts_gzip,
+    cached_body,
+    etag_for,
+    etag_matches,
+    normalized_params,
+    response_key,
+    tee_to_cache,
+)
+from .tiles import get_tile
+
+# Feature property -> Restaurant column served by the GeoJSON endpoint
+GEOJSON_PROPERTIES = {
+    "id": "id",
+    "name": "name",
+    "hygiene_rating": "hygiene_rating",
+    "grade": "grade",
+    "cuisine": "cuisine_description",
+    "street": "street",
+    "zipcode": "zipcode",
+    "building": "building",
+}
+# Rows fetched per round trip, and features per streamed chunk
+GEOJSON_CHUNK_SIZE = 2000
+_geojson_encoder = json.JSONEncoder(ensure_ascii=False, separators=(",", ":"))
+
+# Nearest-restaurant results per request
+NEAREST_DEFAULT_RESULTS = 20
+NEAREST_MAX_RESULTS = 100
+
+# Cluster grid: each tile at zoom z is 360 / 2**z degrees wide and split
+# into CLUSTER_CELLS_PER_TILE cells per side, i.e. about 32px per cell.
+CLUSTER_CELLS_PER_TILE = 8
+# Cluster tiles are only computed inside NYC_EXTENT (lon/lat, with a margin
+# around the five boroughs), and a viewport needing more than
+# CLUSTER_MAX_TILES of them is refused rather than clustered
+NYC_EXTENT = (-74.30, 40.45, -73.65, 40.95)
+CLUSTER_MAX_TILES = 1024
+
+# Facet name -> Restaurant field counted, and the map filter on that field
+FACETS = {"cuisine": "cuisine_description", "borough": "borough", "grade": "grade"}
+FACET_FILTERS = {"cuisine": "cuisine", "grade": "rating"}
+# Filters the RestaurantFacet table can't answer; when one is set the facets
+# are counted over the matching restaurants instead
+LIVE_FACET_FILTERS = ("name", "distance")
+
+
+# Characters of violation_description sent with each row of a list page
+VIOLATION_SUMMARY_LENGTH = 200
+# Restaurants in the recent violations feed
+RECENT_VIOLATIONS_LIMIT = 50
+# violation_description values that mean nothing was cited: ingest's
+# clean_record() stores "No Violation" when the feed has no violation column
+# and "Unknown" when it is blank
+NO_VIOLATION_PLACEHOLDERS = ("", "No Violation", "Unknown")
+# Bytes of a menu read from the database per streamed chunk
+MENU_CHUNK_SIZE = 256 * 1024
+# Leading bytes -> content type, for menus uploaded without one
+MENU_SIGNATURES = {
+    b"%PDF": "application/pdf",
+    b"\x89PNG": "image/png",
+    b"\xff\xd8\xff": "image/jpeg",
+}
+
+
+def lean_restaurants(queryset):
+    """
+    `queryset` narrowed to the list profile: only RestaurantListSerializer's
+    columns are loaded, so list pages never read the menu blob or the full
+    violation text.
+    """
+    return queryset.only(*model_columns(RestaurantListSerializer)).annotate(
+        violation_summary=Left("violation_description", VIOLATION_SUMMARY_LENGTH)
+    )
+
+
+def menu_chunks(pk, size):
+    """Yield restaurant `pk`'s menu, MENU_CHUNK_SIZE bytes per query."""
+    restaurant = Restaurant.objects.filter(pk=pk)
+    for offset in range(0, size, MENU_CHUNK_SIZE):
+        chunk = restaurant.values_list(
+            Substr("menu", offset + 1, MENU_CHUNK_SIZE, output_field=BinaryField()),
+            flat=True,
+        ).get()
+        yield bytes(chunk)
 
 
 # Create your views here.
-class RestaurantViewSet(viewsets.ModelViewSet):
+class RestaurantViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
+    """
+    Restaurants, with a lean serializer profile for lists and a detail one
+    for single restaurants. Writes still use the full RestaurantSerializer.
+    The menu is only ever read by the `menu` download.
+    """
+
     queryset = Restaurant.objects.all()
     serializer_class = RestaurantSerializer
+    pagination_class = PageOrKeysetPagination
+    serializer_classes = {
+        "list": RestaurantListSerializer,
+        "retrieve": RestaurantDetailSerializer,
+    }
     filter_backends = [
         DjangoFilterBackend,
-        filters.SearchFilter,
+        TrigramSearchFilter,
         filters.OrderingFilter,
     ]
 
     # Filters: allow ?borough=1 or ?cuisine_description=Pizza
-    filterset_fields = ["borough", "cuisine_description", "hygiene_rating"]
+    filterset_fields = ["borough", "cuisine_description", "hygiene_rating", "grade"]
 
-    # Search: allow ?search=Joe's Diner (search in name and street)
-    search_fields = ["name", "street"]
+    # Search: allow ?search=Joe's Diner (fuzzy, in name, street and cuisine)
+    search_fields = ["name", "street", "cuisine_description"]
 
     # Ordering: allow ?ordering=inspection_date (or ?ordering=-inspection_date for descending)
     ordering_fields = ["inspection_date", "hygiene_rating"]
+    ordering = ["id"]
+
+    def get_serializer_class(self):
+        return self.serializer_classes.get(self.action, self.serializer_class)
+
+    def get_queryset(self):
+        queryset = super().get_queryset()
+        if self.action == "list":
+            return lean_restaurants(queryset)
+        if self.action == "retrieve":
+            return queryset.defer("menu").annotate(
+                has_menu=ExpressionWrapper(
+                    Q(menu__isnull=False), output_field=BooleanField()
+                )
+            )
+        return queryset
+
+    @action(detail=True, methods=["get"])
+    def menu(self, request, pk=None):
+        """Stream the restaurant's menu file straight from the database."""
+        size = (
+            Restaurant.objects.filter(pk=pk)
+            .values_list(
+                Func("menu", function="octet_length", output_field=IntegerField()),
+                flat=True,
+            )
+            .first()
+        )
+        if not size:
+            raise Http404("No menu for this restaurant")
+
+        chunks = menu_chunks(pk, size)
+        first = next(chunks)
+        content_type = next(
+            (
+                kind
+                for signature, kind in MENU_SIGNATURES.items()
+                if first.startswith(signature)
+            ),
+            "application/octet-stream",
+        )
+        response = stream_response(
+            request, itertools.chain([first], chunks), content_type
+        )
+        response["Content-Length"] = size
+        response["Content-Disposition"] = f'inline; filename="menu-{pk}"'
+        return response
 
 
 class RestaurantListView(generics.ListAPIView):
     queryset = Restaurant.objects.all()
-    serializer_class = RestaurantSerializer
+    serializer_class = RestaurantListSerializer
+
+    def get_queryset(self):
+        return lean_restaurants(super().get_queryset())
 
 
 class RestaurantAddressListView(generics.ListAPIView):
@@ -49,79 +230,538 @@ class RestaurantAddressListView(generics.ListAPIView):
     serializer_class = RestaurantAddressSerializer
 
 
+def parse_grades(value):
+    """The map grades named in a `rating=A,B` parameter, ignoring the rest."""
+    grades = (grade.strip() for grade in value.upper().split(","))
+    return [grade for grade in grades if grade in GRADES]
+
+
+def filter_restaurants(params, queryset=None):
+    """
+    Apply the map's search filters (name, rating, cuisine and lat/lng/distance)
+    from a QueryDict to the active restaurants. Invalid values are ignored.
+    """
+    name = params.get("name", "").strip()
+    rating = params.get("rating", "").strip()
+    cuisine = params.get("cuisine", "").strip()
+    distance_km = params.get("distance", "").strip()
+    lat = params.get("lat", "").strip()
+    lng = params.get("lng", "").strip()
+
+    # Start with all restaurants
+    if queryset is None:
+        queryset = Restaurant.objects.all()
+    queryset = queryset.filter(is_activated=True)
+
+    # Filter by name
+    if name:
+        queryset = queryset.filter(search_filter(name, fields=("name",)))
+
+    # Filter by hygiene rating
+    if rating:
+        grades = parse_grades(rating)
+        if grades:  # Ignore invalid ratings
+            queryset = queryset.filter(grade__in=grades)
+
+    # Filter by cuisine type
+    if cuisine:
+        queryset = queryset.filter(contains("cuisine_description", cuisine))
+
+    # Filter by distance if lat/lng provided
+    if lat and lng and distance_km:
+        try:
+            lat, lng, distance_km = float(lat), float(lng), float(distance_km)
+            user_location = Point(lng, lat, srid=4326)  # Ensure correct SRID
+            queryset = queryset.filter(
+                DWithin("geo_coords", user_location, D(km=distance_km).m)
+            )
+        except ValueError:
+            pass  # Ignore invalid coordinates
+
+    return queryset
+
+
+def parse_bbox(value):
+    """
+    Parse `minx,miny,maxx,maxy` (lon/lat) into a Polygon, or None if the value
+    is missing or malformed.
+    """
+    try:
+        minx, miny, maxx, maxy = (float(part) for part in value.split(","))
+    except ValueError:
+        return None
+    if not (-180 <= minx < maxx <= 180 and -90 <= miny < maxy <= 90):
+        return None
+    bbox = Polygon.from_bbox((minx, miny, maxx, maxy))
+    bbox.srid = 4326
+    return bbox
+
+
+def parse_zoom(value):
+    """Parse a web map zoom level (0-22), or None if missing or malformed."""
+    try:
+        zoom = int(value)
+    except (TypeError, ValueError):
+        return None
+    return zoom if 0 <= zoom <= 22 else None
+
+
+def geojson_chunks(rows, limit, trailer):
+    """
+    Encode (properties..., lon, lat) rows as a GeoJSON FeatureCollection,
+    yielding it in pieces of GEOJSON_CHUNK_SIZE features so memory stays flat
+    however many rows there are. At most `limit` features are written; the
+    collection ends with `"truncated"` and the members in `trailer`.
+    """
+    encode = _geojson_encoder.encode
+    names = list(GEOJSON_PROPERTIES)
+    truncated = False
+    parts = ['{"type":"FeatureCollection","features":[']
+    separator = ""
+
+    for count, row in enumerate(rows):
+        if count == limit:
+            truncated = True
+            break
+        parts.append(
+            f'{separator}{{"type":"Feature","geometry":{{"type":"Point",'
+            f'"coordinates":[{row[-2]!r},{row[-1]!r}]}},'
+            f'"properties":{encode(dict(zip(names, row)))}}}'
+        )
+        separator = ","
+        if len(parts) >= GEOJSON_CHUNK_SIZE:
+            yield "".join(parts).encode("utf-8")
+            parts = []
+
+    parts.append(f'],{encode({"truncated": truncated, **trailer})[1:]}')
+    yield "".join(parts).encode("utf-8")
+
+
+def stream_response(request, chunks, content_type):
+    """
+    A StreamingHttpResponse for a synchronous generator of byte chunks.
+
+    Under ASGI, Django buffers synchronous iterators in full before sending,
+    so there the chunks are pulled one at a time on the sync thread (which
+    owns the database connection) and handed to the server asynchronously.
+    """
+    # DRF wraps the HttpRequest
+    if isinstance(getattr(request, "_request", request), ASGIRequest):
+        chunks = _async_chunks(chunks)
+    return StreamingHttpResponse(chunks, content_type=content_type)
+
+
+async def _async_chunks(chunks):
+    next_chunk = sync_to_async(next, thread_sensitive=True)
+    while (chunk := await next_chunk(chunks, None)) is not None:
+        yield chunk
+
+
+def tile_size(zoom):
+    """Width in degrees of a cluster tile at `zoom`."""
+    return 360.0 / 2**zoom
+
+
+def tile_ranges(bbox, zoom):
+    """
+    The x and y ranges of the cluster tiles at `zoom` that cover the part of
+    `bbox` inside NYC_EXTENT (empty ranges if none of it is).
+    """
+    size = tile_size(zoom)
+    west, south, east, north = NYC_EXTENT
+    minx, miny, maxx, maxy = bbox.extent
+    minx, miny, maxx, maxy = (
+        max(minx, west),
+        max(miny, south),
+        min(maxx, east),
+        min(maxy, north),
+    )
+    if minx > maxx or miny > maxy:
+        return range(0), range(0)
+    return (
+        range(math.floor((minx + 180) / size), math.floor((maxx + 180) / size) + 1),
+        range(math.floor((miny + 90) / size), math.floor((maxy + 90) / size) + 1),
+    )
+
+
+def tile_count(bbox, zoom):
+    xs, ys = tile_ranges(bbox, zoom)
+    return len(xs) * len(ys)
+
+
+def tiles_for_bbox(bbox, zoom):
+    """The (x, y) cluster tiles at `zoom` that cover `bbox` within NYC."""
+    xs, ys = tile_ranges(bbox, zoom)
+    return [(x, y) for x in xs for y in ys]
+
+
+def cluster_restaurants(queryset, zoom, tiles):
+    """
+    Group the restaurants in `tiles` into grid cells with ST_SnapToGrid and
+    return {tile: [cluster feature, ...]}. Each cluster carries its count,
+    centroid and A/B/C grade breakdown. Cells never straddle tiles, so every
+    tile can be cached on its own.
+    """
+    size = tile_size(zoom)
+    cell = size / CLUSTER_CELLS_PER_TILE
+    xs = [x for x, _ in tiles]
+    ys = [y for _, y in tiles]
+    envelope = Polygon.from_bbox(
+        (
+            min(xs) * size - 180,
+            min(ys) * size - 90,
+            (max(xs) + 1) * size - 180,
+            (max(ys) + 1) * size - 90,
+        )
+    )
+    envelope.srid = 4326
+
+    cells = (
+        queryset.filter(geo_coords__within=envelope)
+        .order_by()
+        # Origin at half a cell, so cells are aligned with the tile edges
+        .annotate(cell=SnapToGrid("geo_coords", cell, cell, cell / 2, cell / 2))
+        .values("cell")
+        .annotate(
+            count=Count("id"),
+            center=Centroid(Collect("geo_coords")),
+            grade_a=Count("id", filter=Q(grade="A")),
+            grade_b=Count("id", filter=Q(grade="B")),
+            grade_c=Count("id", filter=Q(grade="C")),
+        )
+    )
+
+    clusters = {tile: [] for tile in tiles}
+    for row in cells:
+        tile = (
+            math.floor((row["cell"].x + 180) / size),
+            math.floor((row["cell"].y + 90) / size),
+        )
+        if tile not in clusters:
+            continue
+        clusters[tile].append(
+            {
+                "type": "Feature",
+                "geometry": {
+                    "type": "Point",
+                    "coordinates": [row["center"].x, row["center"].y],
+                },
+                "properties": {
+                    "cluster": True,
+                    "count": row["count"],
+                    "grades": {
+                        "A": row["grade_a"],
+                        "B": row["grade_b"],
+                        "C": row["grade_c"],
+                    },
+                },
+            }
+        )
+    return clusters
+
+
+def snap_bbox(bbox, zoom):
+    """
+    Grow `bbox` outwards to the cluster cell grid at `zoom` (about 32px), so
+    nearly identical viewports share one cached response.
+    """
+    cell = tile_size(zoom) / CLUSTER_CELLS_PER_TILE
+    minx, miny, maxx, maxy = bbox.extent
+    snapped = Polygon.from_bbox(
+        (
+            max(math.floor((minx + 180) / cell) * cell - 180, -180),
+            max(math.floor((miny + 90) / cell) * cell - 90, -90),
+            min(math.ceil((maxx + 180) / cell) * cell - 180, 180),
+            min(math.ceil((maxy + 90) / cell) * cell - 90, 90),
+        )
+    )
+    snapped.srid = 4326
+    return snapped
+
+
+def cached_clusters(request, queryset, bbox, zoom):
+    """
+    Cluster features for the viewport, cached per (filters, zoom, tile) so
+    panning only computes the tiles that were not seen before.
+    """
+    filters = normalized_params(request.GET, ignore=("bbox", "zoom"))
+    prefix = response_key("geojson-clusters", filters)
+    keys = {f"{prefix}:{zoom}:{x}:{y}": (x, y) for x, y in tiles_for_bbox(bbox, zoom)}
+
+    cached = cache.get_many(list(keys))
+    missing = [tile for key, tile in keys.items() if key not in cached]
+    if missing:
+        computed = cluster_restaurants(queryset, zoom, missing)
+        fresh = {key: computed[tile] for key, tile in keys.items() if tile in computed}
+        cache.set_many(fresh, settings.MAP_CLUSTER_CACHE_SECONDS)
+        cached.update(fresh)
+
+    return [feature for key in keys for feature in cached[key]]
+
+
 class RestaurantGeoJSONView(APIView):
+    """
+    Restaurants matching the map filters as a GeoJSON FeatureCollection.
+
+    `bbox=minx,miny,maxx,maxy` limits the result to the visible map, using
+    the spatial index on geo_coords, and `zoom` is the map's zoom level. At
+    most settings.GEOJSON_MAX_FEATURES features are returned; the collection
+    has `"truncated": true` when more matched.
+
+    With both `bbox` and a `zoom` below settings.MAP_CLUSTER_MAX_ZOOM, the
+    features are clusters instead (see cluster_restaurants) and the
+    collection has `"clustered": true`.
+
+    Responses are cached gzipped, keyed by the normalized parameters and the
+    dataset version (see caching.py), and carry a strong ETag, so a repeat
+    request is a cache read or a bodiless 304.
+    """
+
     def get(self, request):
-        # Get query parameters
-        name = request.GET.get("name", "").strip()
-        rating = request.GET.get("rating", "").strip()
-        cuisine = request.GET.get("cuisine", "").strip()
-        distance_km = request.GET.get("distance", "").strip()
-        lat = request.GET.get("lat", "").strip()
-        lng = request.GET.get("lng", "").strip()
-
-        # Start with all restaurants
-        queryset = Restaurant.objects.filter(is_activated=True)
-
-        # Filter by name
-        if name:
-            queryset = queryset.filter(name__icontains=name)
-
-        # Filter by hygiene rating
-        if rating:
-            try:
-                ratings = rating.split(",")
-                # Q allows you to build OR conditions
-                rating_filter = Q()
-                if "A" in ratings:
-                    rating_filter |= Q(hygiene_rating__lte=13)
-                if "B" in ratings:
-                    rating_filter |= Q(hygiene_rating__gte=14, hygiene_rating__lte=27)
-                if "C" in ratings:
-                    rating_filter |= Q(hygiene_rating__gte=28)
-                queryset = queryset.filter(rating_filter)
-
-            except ValueError:
-                pass  # Ignore invalid ratings
-
-        # Filter by cuisine type
-        if cuisine:
-            queryset = queryset.filter(cuisine_description__icontains=cuisine)
-
-        # Filter by distance if lat/lng provided
-        if lat and lng and distance_km:
-            try:
-                lat, lng, distance_km = float(lat), float(lng), float(distance_km)
-                user_location = Point(lng, lat, srid=4326)  # Ensure correct SRID
-                queryset = queryset.filter(
-                    geo_coords__distance_lte=(user_location, D(km=distance_km))
+        bbox = parse_bbox(request.GET.get("bbox", ""))
+        zoom = parse_zoom(request.GET.get("zoom"))
+        if bbox is not None and zoom is not None:
+            bbox = snap_bbox(bbox, zoom)
+            clustered = zoom < settings.MAP_CLUSTER_MAX_ZOOM
+            if clustered and tile_count(bbox, zoom) > CLUSTER_MAX_TILES:
+                return JsonResponse(
+                    {"error": "bbox covers too many cluster tiles for this zoom"},
+                    status=400,
                 )
-            except ValueError:
-                pass  # Ignore invalid coordinates
 
-        # Convert queryset to GeoJSON format
+        params = normalized_params(request.GET, ignore=("bbox",))
+        key = response_key("geojson", params + (("bbox", bbox and bbox.extent),))
+        gzipped = accepts_gzip(request)
+        etag = etag_for(key, gzipped)
+
+        if etag_matches(request, etag):
+            response = HttpResponseNotModified()
+        else:
+            body = cached_body(key, gzipped)
+            if body is not None:
+                response = HttpResponse(body, content_type="application/json")
+            else:
+                response = stream_response(
+                    request,
+                    tee_to_cache(
+                        key,
+                        self.render(request, bbox, zoom),
+                        gzipped,
+                        settings.GEOJSON_CACHE_SECONDS,
+                        settings.GEOJSON_CACHE_MAX_BYTES,
+                    ),
+                    content_type="application/json",
+                )
+            if gzipped:
+                response["Content-Encoding"] = "gzip"
+
+        response["ETag"] = etag
+        response["Vary"] = "Accept-Encoding"
+        response["Cache-Control"] = "no-cache"  # Always revalidate the ETag
+        return response
+
+    def render(self, request, bbox, zoom):
+        """The response body for the request, as an iterable of bytes."""
+        queryset = filter_restaurants(request.GET)
+        if bbox is not None:
+            # ST_Within starts with an && search on the geo_coords GiST index
+            queryset = queryset.filter(geo_coords__within=bbox)
+
+        if (
+            bbox is not None
+            and zoom is not None
+            and zoom < settings.MAP_CLUSTER_MAX_ZOOM
+        ):
+            collection = {
+                "type": "FeatureCollection",
+                "features": cached_clusters(request, queryset, bbox, zoom),
+                "clustered": True,
+                "bbox": list(bbox.extent),
+                "zoom": zoom,
+            }
+            return [_geojson_encoder.encode(collection).encode("utf-8")]
+
+        # Plain tuples straight from the cursor: no model instances, no GEOS
+        # points and none of the wide columns such as menu
+        limit = settings.GEOJSON_MAX_FEATURES
+        rows = (
+            queryset.order_by("id")
+            .annotate(
+                lon=Func("geo_coords", function="ST_X", output_field=FloatField()),
+                lat=Func("geo_coords", function="ST_Y", output_field=FloatField()),
+            )
+            .values_list(*GEOJSON_PROPERTIES.values(), "lon", "lat")[: limit + 1]
+            .iterator(chunk_size=GEOJSON_CHUNK_SIZE)
+        )
+
+        trailer = {}
+        if bbox is not None:
+            trailer["bbox"] = list(bbox.extent)
+        if zoom is not None:
+            trailer["zoom"] = zoom
+
+        return geojson_chunks(rows, limit, trailer)
+
+
+class RestaurantNearestView(APIView):
+    """
+    The `limit` (default 20, at most NEAREST_MAX_RESULTS) restaurants closest
+    to `lat`/`lng`, nearest first, as GeoJSON with `distance_m` on each
+    feature. Takes the same name/rating/cuisine/distance filters as the map.
+
+    Ordering by GeographyDistance is the PostGIS `<->` operator on
+    geo_coords::geography, which the restaurant_geo_coords_geog GiST index
+    answers as a nearest-neighbour scan in metres, so the cost depends on
+    `limit` rather than on the number of restaurants.
+    """
+
+    def get(self, request):
+        try:
+            origin = Point(
+                float(request.GET["lng"]), float(request.GET["lat"]), srid=4326
+            )
+            limit = int(request.GET.get("limit", NEAREST_DEFAULT_RESULTS))
+        except (KeyError, ValueError):
+            return JsonResponse(
+                {"error": "lat and lng are required numbers, limit an integer"},
+                status=400,
+            )
+        limit = max(1, min(limit, NEAREST_MAX_RESULTS))
+
+        rows = (
+            filter_restaurants(request.GET)
+            .order_by(GeographyDistance("geo_coords", origin))
+            .annotate(
+                lon=Func("geo_coords", function="ST_X", output_field=FloatField()),
+                lat=Func("geo_coords", function="ST_Y", output_field=FloatField()),
+                distance=GeographyDistance("geo_coords", origin),
+            )
+            .values_list(*GEOJSON_PROPERTIES.values(), "distance", "lon", "lat")[:limit]
+        )
+
+        names = list(GEOJSON_PROPERTIES)
         features = [
             {
                 "type": "Feature",
-                "geometry": {
-                    "type": "Point",
-                    "coordinates": [restaurant.geo_coords.x, restaurant.geo_coords.y],
-                },
+                "geometry": {"type": "Point", "coordinates": [row[-2], row[-1]]},
                 "properties": {
-                    "id": restaurant.id,
-                    "name": restaurant.name,
-                    "hygiene_rating": restaurant.hygiene_rating,
-                    "cuisine": restaurant.cuisine_description,
-                    "street": restaurant.street,
-                    "zipcode": restaurant.zipcode,
-                    "building": restaurant.building,
+                    **dict(zip(names, row)),
+                    "distance_m": round(row[-3], 1),
                 },
             }
-            for restaurant in queryset
+            for row in rows
         ]
+        return JsonResponse({"type": "FeatureCollection", "features": features})
+
+
+def facet_counts(params):
+    """
+    Counts per cuisine, borough and grade for the map filters in `params`.
+    Each facet ignores its own filter, so it still lists the alternatives:
+    with rating=A the grade facet counts B and C too. Cuisine and rating
+    filters are answered from the RestaurantFacet table; name and distance
+    searches fall back to counting the matching restaurants.
+    """
+    live = any(params.get(key, "").strip() for key in LIVE_FACET_FILTERS)
+    facets = {}
+    for facet, field in FACETS.items():
+        facet_params = {
+            key: value
+            for key, value in params.items()
+            if key != FACET_FILTERS.get(facet)
+        }
+        if live:
+            rows = filter_restaurants(facet_params).values(field)
+            rows = rows.annotate(total=Count("id"))
+        else:
+            rows = RestaurantFacet.objects.all()
+            cuisine = facet_params.get("cuisine", "").strip()
+            grades = parse_grades(facet_params.get("rating", ""))
+            if cuisine:
+                rows = rows.filter(cuisine_description__icontains=cuisine)
+            if grades:
+                rows = rows.filter(grade__in=grades)
+            rows = rows.values(field).annotate(total=Sum("count"))
+        facets[facet] = [
+            {"value": row[field], "count": row["total"]}
+            for row in rows.order_by("-total", field)
+        ]
+    return facets
+
+
+class RestaurantFacetsView(APIView):
+    """
+    Restaurant counts per cuisine, borough and grade for the sidebar, for the
+    same filters the map takes. Cached until restaurant data changes.
+    """
+
+    def get(self, request):
+        # Without a distance the user's position doesn't change the counts
+        ignore = () if request.GET.get("distance", "").strip() else ("lat", "lng")
+        key = response_key("facets", normalized_params(request.GET, ignore))
+        facets = cache.get(key)
+        if facets is None:
+            facets = facet_counts(request.GET)
+            cache.set(key, facets, settings.FACETS_CACHE_SECONDS)
+        return JsonResponse(facets)
+
+
+def recent_violations(limit=RECENT_VIOLATIONS_LIMIT):
+    """
+    The `limit` most recently inspected active restaurants that have a
+    violation on record, newest first, as compact dicts. inspection_date is
+    each restaurant's latest inspection, as ingest stores it. Read in index
+    order from restaurant_active_recent, so no sort is needed.
+    """
+    rows = (
+        Restaurant.objects.filter(is_activated=True)
+        .exclude(violation_description__in=NO_VIOLATION_PLACEHOLDERS)
+        .order_by("-inspection_date", "-id")
+        .values("id", "name", "hygiene_rating", "grade", "inspection_date")
+        .annotate(
+            violation_summary=Left("violation_description", VIOLATION_SUMMARY_LENGTH)
+        )
+    )
+    return rows[:limit]
+
+
+class RestaurantRecentViolationsView(View):
+    """
+    The recent violations feed shown on the home page. It is the same for
+    every visitor, so it is cached briefly and until restaurant data changes.
+    """
+
+    def get(self, request):
+        key = response_key("recent-violations", ())
+        rows = cache.get(key)
+        if rows is None:
+            rows = list(recent_violations())
+            cache.set(key, rows, settings.RECENT_VIOLATIONS_CACHE_SECONDS)
+        response = JsonResponse({"results": rows})
+        response["Cache-Control"] = (
+            f"public, max-age={settings.RECENT_VIOLATIONS_CACHE_SECONDS}"
+        )
+        return response
+
+
+class RestaurantTileView(View):
+    """
+    Restaurants as a Mapbox Vector Tile (layer "restaurants") for XYZ tile
+    z/x/y, with id, name, hygiene_rating and cuisine on every feature.
+    Tiles are cached under the dataset version (see caching.py), so any
+    change to restaurant data retires every cached tile at once, not just
+    the tiles around the changed restaurants.
+    """
 
-        geojson_data = {"type": "FeatureCollection", "features": features}
+    def get(self, request, z, x, y):
+        if not (0 <= z <= settings.MAP_TILE_MAX_ZOOM and x < 2**z and y < 2**z):
+            raise Http404("No such tile")
 
-        return JsonResponse(geojson_data)
+        response = HttpResponse(
+            get_tile(z, x, y), content_type="application/vnd.mapbox-vector-tile"
+        )
+        response["Cache-Control"] = "public, max-age=300"
+        return response
 
 
 class DynamicNYCMapView(View):
@@ -129,9 +769,10 @@ class DynamicNYCMapView(View):
         return HttpResponse("<h1>🚧 Under Maintenance 🚧</h1>")
 
 
-class CommentViewSet(viewsets.ModelViewSet):
+class CommentViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Comment.objects.all()
     serializer_class = CommentSerializer
+    pagination_class = PageOrKeysetPagination
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
@@ -141,11 +782,13 @@ class CommentViewSet(viewsets.ModelViewSet):
     filterset_fields = ["restaurant", "commenter", "flagged"]
     search_fields = ["comment"]
     ordering_fields = ["posted_at", "karma"]
+    ordering = ["-id"]  # Newest first, on the primary key index
 
 
-class ReplyViewSet(viewsets.ModelViewSet):
+class ReplyViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     queryset = Reply.objects.all()
     serializer_class = ReplySerializer
+    pagination_class = PageOrKeysetPagination
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
@@ -155,3 +798,4 @@ class ReplyViewSet(viewsets.ModelViewSet):
     filterset_fields = ["comment", "commenter", "flagged"]
     search_fields = ["reply"]
     ordering_fields = ["posted_at", "karma"]
+    ordering = ["-id"]  # Newest first, on the primary key index
@@ -1,23 +1,26 @@
 from rest_framework import serializers
+from _api.mixins import SparseFieldsMixin
 from .models import Customer, Moderator, DM, FavoriteRestaurant
 
 
-class CustomerSerializer(serializers.ModelSerializer):
+class CustomerSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Customer
         fields = "__all__"  # Includes all fields in the Customer model
 
 
-class ModeratorSerializer(serializers.ModelSerializer):
+class ModeratorSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     class Meta:
         model = Moderator
         fields = "__all__"  # Includes all fields in the Moderator model
 
 
-class DMSerializer(serializers.ModelSerializer):
+class DMSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     sender_name = serializers.CharField(source="sender.first_name", read_only=True)
     receiver_name = serializers.CharField(source="receiver.first_name", read_only=True)
     message_text = serializers.SerializerMethodField()
+    # A customer or a moderator, through a generic relation
+    flagged_by = serializers.StringRelatedField()
 
     class Meta:
         model = DM
@@ -32,6 +35,11 @@ class DMSerializer(serializers.ModelSerializer):
             "flagged_by",
             "sent_at",
         ]
+        expandable_fields = {
+            "sender": CustomerSerializer,
+            "receiver": CustomerSerializer,
+        }
+        sparse_sources = {"message_text": ["message"]}
 
     def get_message_text(self, obj):
         try:
@@ -40,10 +48,14 @@ class DMSerializer(serializers.ModelSerializer):
             return "[Unreadable message]"
 
 
-class FavoriteRestaurantSerializer(serializers.ModelSerializer):
+class FavoriteRestaurantSerializer(SparseFieldsMixin, serializers.ModelSerializer):
     customer_name = serializers.CharField(source="customer.first_name", read_only=True)
     restaurant_name = serializers.CharField(source="restaurant.name", read_only=True)
 
     class Meta:
         model = FavoriteRestaurant
         fields = ["customer", "customer_name", "restaurant", "restaurant_name"]
+        expandable_fields = {
+            "customer": CustomerSerializer,
+            "restaurant": "_api._restaurants.serializers.RestaurantAddressSerializer",
+        }
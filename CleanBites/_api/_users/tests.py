@@ -1,5 +1,8 @@
 from django.test import TestCase
-from django.db import transaction
+from django.test.utils import CaptureQueriesContext
+from django.db import connection, transaction
+from django.urls import reverse
+from rest_framework.test import APITestCase
 from .models import Customer, Moderator, DM, FavoriteRestaurant
 from _api._restaurants.models import Restaurant
 
@@ -113,3 +116,71 @@ class FavoriteRestaurantModelTests(TestCase):
                 FavoriteRestaurant.objects.create(
                     customer=self.customer, restaurant=self.restaurant
                 )
+
+
+class QueryBudgetTests(APITestCase):
+    """A page of DMs or favorites costs the same queries at any size."""
+
+    def setUp(self):
+        self.moderator = Moderator.objects.create(
+            email="mod@example.com", username="mod"
+        )
+        self.customers = [
+            Customer.objects.create(
+                first_name=f"Budget {i}",
+                last_name="User",
+                email=f"budget{i}@example.com",
+                username=f"budget{i}",
+            )
+            for i in range(7)
+        ]
+
+    def add_rows(self, start, stop):
+        for i in range(start, stop):
+            sender, receiver = self.customers[i], self.customers[i + 1]
+            DM.objects.create(
+                sender=sender,
+                receiver=receiver,
+                message=b"Hello",
+                flagged=True,
+                flagged_by=self.moderator,
+            )
+            restaurant = Restaurant.objects.create(
+                name=f"Budget Restaurant {i}",
+                email=f"restaurant{i}@example.com",
+                phone="1234567890",
+                building=123,
+                street="Test St",
+                zipcode="10001",
+                hygiene_rating=10,
+                inspection_date="2025-01-01",
+                borough=1,
+                cuisine_description="Test",
+                violation_description="None",
+            )
+            FavoriteRestaurant.objects.create(customer=sender, restaurant=restaurant)
+
+    def count_queries(self, url):
+        self.client.get(url)  # Warm the content type cache
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        return len(queries)
+
+    def assertQueryBudget(self, url, budget):
+        self.add_rows(0, 1)
+        small = self.count_queries(url)
+        self.add_rows(1, 6)
+        large = self.count_queries(url)
+        self.assertEqual(small, large)
+        self.assertLessEqual(large, budget)
+
+    def test_dm_pages(self):
+        self.assertQueryBudget(reverse("dm-list"), 2)  # Page, moderators
+
+    def test_expanded_dm_pages(self):
+        # Page, moderators, blocked customers of the senders
+        self.assertQueryBudget(reverse("dm-list") + "?expand=sender", 3)
+
+    def test_favorite_pages(self):
+        self.assertQueryBudget(reverse("favorite-restaurant-list"), 2)  # Count, page
@@ -1,6 +1,8 @@
 from django.shortcuts import render
 from rest_framework import viewsets, filters
 from django_filters.rest_framework import DjangoFilterBackend
+from _api.mixins import SparseQuerysetMixin
+from _api.pagination import PageOrKeysetPagination
 from rest_framework.response import Response
 from rest_framework.views import APIView
 from django.contrib.auth import login, get_user_model
@@ -23,7 +25,7 @@ import logging
 logger = logging.getLogger(__name__)
 
 
-class UserViewSet(viewsets.ModelViewSet):
+class UserViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows users to be viewed or edited.
     """
@@ -46,7 +48,7 @@ class UserViewSet(viewsets.ModelViewSet):
     ordering_fields = ["first_name", "last_name", "email"]
 
 
-class ModeratorViewSet(viewsets.ModelViewSet):
+class ModeratorViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows moderators to be viewed or edited.
     """
@@ -69,13 +71,14 @@ class ModeratorViewSet(viewsets.ModelViewSet):
     ordering_fields = ["first_name", "last_name", "email"]
 
 
-class DMViewSet(viewsets.ModelViewSet):
+class DMViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows direct messages (DMs) to be viewed or edited.
     """
 
     queryset = DM.objects.all()
     serializer_class = DMSerializer
+    pagination_class = PageOrKeysetPagination
     filter_backends = [
         DjangoFilterBackend,
         filters.SearchFilter,
@@ -87,9 +90,10 @@ class DMViewSet(viewsets.ModelViewSet):
     search_fields = []
     # Ordering: allow ?ordering=sent_at
     ordering_fields = ["sent_at"]
+    ordering = ["-id"]  # Newest first, on the primary key index
 
 
-class FavoriteRestaurantViewSet(viewsets.ModelViewSet):
+class FavoriteRestaurantViewSet(SparseQuerysetMixin, viewsets.ModelViewSet):
     """
     API endpoint that allows favorite restaurants to be managed.
     """
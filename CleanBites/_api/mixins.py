@@ -0,0 +1,134 @@
+from django.core.exceptions import FieldDoesNotExist
+from django.utils.module_loading import import_string
+from rest_framework import serializers
+from rest_framework.permissions import SAFE_METHODS
+
+
+def _param_list(params, name):
+    return {item.strip() for item in params.get(name, "").split(",") if item.strip()}
+
+
+class SparseFieldsMixin:
+    """
+    Serializer mixin for sparse fieldsets and expansion, driven by the query
+    string of the request in the serializer context:
+
+    - ?fields=id,name keeps only the listed fields
+    - ?exclude=menu_url drops the listed fields
+    - ?expand=restaurant swaps a related id for the nested object, for the
+      fields named in Meta.expandable_fields (field -> serializer class or
+      dotted path to one)
+
+    Unknown names are ignored. Meta.sparse_sources lists the model fields a
+    SerializerMethodField reads (field -> list of dotted paths), so that
+    SparseQuerysetMixin can still narrow the query when it is selected.
+    Only the top-level serializer reads the query string; expanded ones
+    are built with sparse=False.
+    """
+
+    def __init__(self, *args, sparse=True, **kwargs):
+        super().__init__(*args, **kwargs)
+        request = self.context.get("request")
+        if not sparse or request is None:
+            return
+        params = getattr(request, "query_params", request.GET)
+
+        expandable = getattr(self.Meta, "expandable_fields", {})
+        for name in (
+            _param_list(params, "expand") & expandable.keys() & set(self.fields)
+        ):
+            serializer_class = expandable[name]
+            if isinstance(serializer_class, str):
+                serializer_class = import_string(serializer_class)
+            self.fields[name] = serializer_class(read_only=True, sparse=False)
+
+        keep = _param_list(params, "fields")
+        drop = _param_list(params, "exclude")
+        for name in list(self.fields):
+            if (keep and name not in keep) or name in drop:
+                self.fields.pop(name)
+
+
+def _add_source(model, parts, prefix, plan):
+    """
+    Record in `plan` what loading the dotted source `parts` of `model` takes:
+    its columns for only(), and the relations to select or prefetch.
+    """
+    try:
+        field = model._meta.get_field(parts[0])
+    except FieldDoesNotExist:
+        return  # A property or an annotation
+    path = prefix + field.name
+
+    if hasattr(field, "ct_field"):  # GenericForeignKey: its two columns
+        plan["columns"].update([prefix + field.ct_field, prefix + field.fk_field])
+        plan["prefetch"].add(path)
+    elif field.many_to_many:
+        plan["prefetch"].add(path)
+    elif not field.concrete:
+        return  # Reverse relations are left to the serializer
+    elif field.is_relation and len(parts) > 1:
+        plan["columns"].add(path)
+        plan["related"].add(path)
+        _add_source(field.related_model, parts[1:], path + "__", plan)
+    else:
+        plan["columns"].add(path)
+
+
+def _add_fields(serializer, model, prefix, plan):
+    """Add the sources of every field of `serializer` to `plan`."""
+    method_sources = getattr(getattr(serializer, "Meta", None), "sparse_sources", {})
+    for name, field in serializer.fields.items():
+        if isinstance(field, serializers.BaseSerializer):  # An expanded relation
+            related = model._meta.get_field(field.source)
+            plan["columns"].add(prefix + related.name)
+            plan["related"].add(prefix + related.name)
+            _add_fields(field, related.related_model, f"{prefix}{related.name}__", plan)
+        elif name in method_sources:
+            for source in method_sources[name]:
+                _add_source(model, source.split("."), prefix, plan)
+        elif field.source_attrs:
+            _add_source(model, field.source_attrs, prefix, plan)
+        else:
+            plan["complete"] = False  # source="*": can't tell what it reads
+
+
+def sparse_queryset(queryset, serializer, columns=True):
+    """
+    Narrow `queryset` to what `serializer` reads: select_related and
+    prefetch_related for the relations it follows, so a page costs the same
+    number of queries whatever its size, and (with `columns`) only() the
+    columns it outputs. If some field's needs are unknown, all columns are
+    loaded but relations are still joined.
+    """
+    model = queryset.model
+    plan = {"columns": {model._meta.pk.name}, "related": set(), "prefetch": set()}
+    plan["complete"] = True
+    _add_fields(serializer, model, "", plan)
+
+    # The paginator reads the ordering columns off the last row of a page
+    for ordering in queryset.query.order_by:
+        if isinstance(ordering, str):
+            _add_source(model, [ordering.lstrip("-")], "", plan)
+
+    if plan["related"]:
+        queryset = queryset.select_related(*sorted(plan["related"]))
+    if plan["prefetch"]:
+        queryset = queryset.prefetch_related(*sorted(plan["prefetch"]))
+    if columns and plan["complete"]:
+        queryset = queryset.only(*sorted(plan["columns"]))
+    return queryset
+
+
+class SparseQuerysetMixin:
+    """
+    View mixin that loads what the (sparse) serializer will output, see
+    sparse_queryset(). The serializer's sources are the one declaration of a
+    view's related-object needs. Applied after filtering; writes join the
+    same relations but load complete instances.
+    """
+
+    def filter_queryset(self, queryset):
+        queryset = super().filter_queryset(queryset)
+        reading = self.request.method in SAFE_METHODS
+        return sparse_queryset(queryset, self.get_serializer(), columns=reading)
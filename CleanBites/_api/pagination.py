@@ -0,0 +1,106 @@
+import json
+from django.db import connections
+from rest_framework.pagination import CursorPagination, PageNumberPagination
+from rest_framework.response import Response
+from rest_framework.settings import api_settings
+
+
+def approximate_count(queryset):
+    """
+    Estimated number of rows in `queryset`, without a COUNT(*): the table's
+    pg_class.reltuples (kept current by autovacuum) when the queryset is
+    unfiltered, otherwise the planner's row estimate for the query.
+    """
+    with connections[queryset.db].cursor() as cursor:
+        if not queryset.query.where:
+            cursor.execute(
+                "SELECT reltuples FROM pg_class WHERE oid = %s::regclass",
+                [queryset.model._meta.db_table],
+            )
+            row = cursor.fetchone()
+            estimate = row[0] if row else 0
+        else:
+            sql, params = queryset.order_by().query.sql_with_params()
+            cursor.execute(f"EXPLAIN (FORMAT JSON) {sql}", params)
+            plan = cursor.fetchone()[0]
+            if isinstance(plan, str):
+                plan = json.loads(plan)
+            estimate = plan[0]["Plan"]["Plan Rows"]
+    # reltuples is -1 for a table that has never been analyzed
+    return max(int(estimate), 0)
+
+
+class KeysetPagination(CursorPagination):
+    """
+    Cursor (keyset) pagination for the large list endpoints. Each page is
+    `WHERE key < last seen ORDER BY key LIMIT n`, so deep pages cost the same
+    as the first and no page runs COUNT(*).
+
+    The order is the view's `ordering` (or the client's ?ordering=) with the
+    primary key appended as a tie-breaker, so it is total and stable. Views
+    should default to an indexed ordering. Searched querysets that carry a
+    `search_rank` stay in rank order unless the client picks another one.
+
+    ?limit= sets the page size. ?count=approx adds an estimated `count`, see
+    approximate_count().
+    """
+
+    page_size = api_settings.PAGE_SIZE
+    page_size_query_param = "limit"
+    max_page_size = 200
+    ordering = "-id"
+    count_query_param = "count"
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.count = None
+        if request.query_params.get(self.count_query_param) == "approx":
+            self.count = approximate_count(queryset)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_ordering(self, request, queryset, view):
+        ordering = super().get_ordering(request, queryset, view)
+        default = getattr(view, "ordering", None) or self.ordering
+        if isinstance(default, str):
+            default = (default,)
+        if "search_rank" in queryset.query.annotations and ordering == tuple(default):
+            ordering = ("-search_rank", *ordering)
+        if not any(field.lstrip("-") in ("id", "pk") for field in ordering):
+            ordering = (*ordering, "-id" if ordering[0].startswith("-") else "id")
+        return ordering
+
+    def get_paginated_response(self, data):
+        page = {
+            "next": self.get_next_link(),
+            "previous": self.get_previous_link(),
+            "results": data,
+        }
+        if self.count is not None:
+            page = {"count": self.count, **page}
+        return Response(page)
+
+
+class PageOrKeysetPagination(PageNumberPagination):
+    """
+    The API's usual page number pagination (`count`, `next`, `previous`,
+    ?page=) unless the client opts into KeysetPagination with ?cursor=, left
+    empty for the first page. Clients walking deep into a large list should
+    opt in; the frontend and existing clients keep their page numbers.
+
+    ?limit= sets the page size in both modes.
+    """
+
+    page_size_query_param = "limit"
+    max_page_size = KeysetPagination.max_page_size
+    keyset_class = KeysetPagination
+
+    def paginate_queryset(self, queryset, request, view=None):
+        self.keyset = None
+        if self.keyset_class.cursor_query_param in request.query_params:
+            self.keyset = self.keyset_class()
+            return self.keyset.paginate_queryset(queryset, request, view)
+        return super().paginate_queryset(queryset, request, view)
+
+    def get_paginated_response(self, data):
+        if self.keyset is not None:
+            return self.keyset.get_paginated_response(data)
+        return super().get_paginated_response(data)
@@ -15,6 +15,7 @@ from _frontend.utils import has_unread_messages
 from django.contrib.gis.geos import Point
 from django.test import RequestFactory
 import json
+from unittest.mock import patch
 
 User = get_user_model()
 
@@ -1247,6 +1248,12 @@ class SearchTests(TestCase):
             or any("🍽️ Pizza Palace" in r["label"] for r in data)
         )
 
+    def test_search_restaurant_name_with_typo(self):
+        response = self.client.get(reverse("global_search"), {"q": "piza palce"})
+        self.assertEqual(response.status_code, 200)
+        data = response.json()["results"]
+        self.assertTrue(any("🍽️ Pizza Palace" in r["label"] for r in data))
+
     def test_search_no_results(self):
         response = self.client.get(reverse("global_search"), {"q": "Zebra"})
         self.assertEqual(response.status_code, 200)
@@ -1691,7 +1698,8 @@ class UpdateRestaurantProfileTests(TestCase):
             borough=0,  # ✅ NEW required field
         )
 
-    def test_update_profile_success(self):
+    @patch("_api._restaurants.fetch_data.nominatim_geocode")
+    def test_update_profile_success(self, mock_geocode):
         self.client.login(username="restouser", password="testpass")
         data = {
             "name": "New Name",
@@ -1707,6 +1715,62 @@ class UpdateRestaurantProfileTests(TestCase):
         self.assertRedirects(
             response, reverse("restaurant_detail", kwargs={"id": self.restaurant.id})
         )
+        # The request never waits on the geocoder; the new address is flagged
+        mock_geocode.assert_not_called()
+        self.assertTrue(self.restaurant.needs_geocoding)
+
+    def test_unchanged_address_is_not_flagged(self):
+        self.client.login(username="restouser", password="testpass")
+        self.client.post(reverse("update-profile"), {"name": "New Name"})
+        self.restaurant.refresh_from_db()
+        self.assertFalse(self.restaurant.needs_geocoding)
+
+    def test_geocode_batch_picks_up_flagged_address(self):
+        from _api._restaurants.fetch_data import IngestStats, geocode_restaurants
+
+        def geocoder(building, street, boro, zipcode):
+            return Point(-73.95, 40.75)
+
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(needs_geocoding=True)
+        stats = geocode_restaurants(IngestStats(), geocoder=geocoder, rate=None)
+
+        self.restaurant.refresh_from_db()
+        self.assertEqual(stats.geocoded, 1)
+        self.assertEqual(self.restaurant.geo_coords.coords, (-73.95, 40.75))
+        self.assertFalse(self.restaurant.needs_geocoding)
+
+    def test_geocode_batch_keeps_failed_lookups_flagged(self):
+        from _api._restaurants.fetch_data import IngestStats, geocode_restaurants
+
+        def not_found(building, street, boro, zipcode):
+            return None
+
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(needs_geocoding=True)
+        stats = geocode_restaurants(IngestStats(), geocoder=not_found, rate=None)
+
+        self.restaurant.refresh_from_db()
+        self.assertEqual(stats.geocoded, 0)
+        self.assertTrue(self.restaurant.needs_geocoding)
+
+    def test_geocode_batch_skips_a_superseded_address(self):
+        from _api._restaurants.fetch_data import IngestStats, geocode_restaurants
+        from _api._restaurants.geocoding import normalize_address
+
+        def edited_meanwhile(addresses, geocoder, **kwargs):
+            addresses = list(addresses)
+            Restaurant.objects.filter(pk=self.restaurant.pk).update(
+                street="Newer Street"
+            )
+            return {normalize_address(*a): Point(-73.95, 40.75) for a in addresses}
+
+        Restaurant.objects.filter(pk=self.restaurant.pk).update(needs_geocoding=True)
+        with patch("_api._restaurants.fetch_data.geocode_addresses", edited_meanwhile):
+            geocode_restaurants(IngestStats(), rate=None)
+
+        # The old address's position is not stored; the new one waits its turn
+        self.restaurant.refresh_from_db()
+        self.assertEqual(self.restaurant.geo_coords.coords, (0.0, 0.0))
+        self.assertTrue(self.restaurant.needs_geocoding)
 
     def test_update_profile_no_restaurant(self):
         self.restaurant.delete()
@@ -1,5 +1,6 @@
 from django.shortcuts import get_object_or_404, render, redirect
 from _api._restaurants.models import Restaurant, Comment
+from _api._restaurants.search import search_restaurants
 from django.contrib.auth.decorators import login_required
 from django.contrib import messages
 from django.contrib.auth import login, authenticate, logout, update_session_auth_hash
@@ -196,6 +197,7 @@ def update_restaurant_profile_view(request):
         return redirect("home")
 
     if request.method == "POST":
+        address_before = (restaurant.building, restaurant.street, restaurant.zipcode)
         try:
             if "name" in request.POST:
                 restaurant.name = request.POST.get("name")
@@ -210,6 +212,13 @@ def update_restaurant_profile_view(request):
             if "cuisine_description" in request.POST:
                 restaurant.cuisine_description = request.POST.get("cuisine_description")
 
+            if address_before != (
+                restaurant.building,
+                restaurant.street,
+                restaurant.zipcode,
+            ):
+                # Left to the geocode_restaurants batch; the map catches up then
+                restaurant.needs_geocoding = True
             restaurant.save()
             messages.success(request, "Restaurant profile updated successfully!")
             return redirect("restaurant_detail", id=restaurant.id)
@@ -602,8 +611,8 @@ def global_search(request):
     customers = Customer.objects.filter(
         username__icontains=query, is_activated=True
     ).values("username")[:5]
-    restaurants = Restaurant.objects.filter(
-        name__icontains=query, is_activated=True
+    restaurants = search_restaurants(
+        Restaurant.objects.filter(is_activated=True), query, fields=("name",)
     ).values("id", "name", "username")[:5]
 
     results = []